@@ -1,43 +1,87 @@
 """
 Civic Remediation AgentOS Configuration.
 Serves the autonomous agent team via the Agno AgentOS platform.
+
+Nothing is built at import time: the team, the individual agents and the
+AgentOS app are created on first access to `app`, `agent_os`, `civic_team`
+or one of the agents (uvicorn reads `app` when it starts serving).
 """
-from agno.os import AgentOS
-from agno.tools.parallel import ParallelTools
-from dotenv import load_dotenv
+import threading
+from typing import Any, Dict, Optional
 
-# Import the Team Factory and Agent Factory
-from app.team import create_civic_team
-from app.agents.base import create_agent
+from dotenv import load_dotenv
 
 load_dotenv()
 
-# Instantiate the full team
-civic_team = create_civic_team()
-
-# Instantiate individual agents for granular access
-sentinel = create_agent(name="Sentinel", slug="sentinel", tools=[ParallelTools(enable_search=True)])
-investigator = create_agent(name="Investigator", slug="investigator", tools=[ParallelTools(enable_search=True, enable_extract=True)])
-bureaucrat = create_agent(name="Bureaucrat", slug="bureaucrat")
-auditor = create_agent(name="Auditor", slug="auditor", tools=[ParallelTools(enable_search=True)])
-engineer = create_agent(name="Engineer", slug="engineer", tools=[ParallelTools(enable_search=True, enable_extract=True)])
-coordinator = create_agent(name="Coordinator", slug="coordinator")
-liaison = create_agent(name="Liaison", slug="liaison")
-
-# Create the AgentOS instance
-agent_os = AgentOS(
-    name="Civic Remediation System",
-    description="Autonomous multi-agent system for identifying and remediating civic infrastructure failures in India.",
-    # The primary interface is the coordinated team
-    teams=[civic_team],
-    # Also expose individual specialists
-    agents=[sentinel, investigator, bureaucrat, auditor, engineer, coordinator, liaison],
-)
-
-# Get the FastAPI app
-app = agent_os.get_app()
+# (attribute, display name, prompt slug, tools: None, "search" or "search+extract")
+AGENTS = [
+    ("sentinel", "Sentinel", "sentinel", "search"),
+    ("investigator", "Investigator", "investigator", "search+extract"),
+    ("bureaucrat", "Bureaucrat", "bureaucrat", None),
+    ("auditor", "Auditor", "auditor", "search"),
+    ("engineer", "Engineer", "engineer", "search+extract"),
+    ("coordinator", "Coordinator", "coordinator", None),
+    ("liaison", "Liaison", "liaison", None),
+]
+
+_built: Optional[Dict[str, Any]] = None
+_build_lock = threading.Lock()
+
+
+def _build() -> Dict[str, Any]:
+    from agno.os import AgentOS
+
+    from app.agents.base import create_agent, parallel_tools
+    from app.team import create_civic_team
+    from app.utils import warm_prompts
+
+    # Load all prompts once before building the team and agents
+    warm_prompts()
+
+    # Instantiate the full team
+    civic_team = create_civic_team()
+
+    # Instantiate individual agents for granular access
+    agents = {
+        attribute: create_agent(
+            name=name,
+            slug=slug,
+            tools=[parallel_tools(extract=tools == "search+extract")] if tools else None,
+        )
+        for attribute, name, slug, tools in AGENTS
+    }
+
+    # Create the AgentOS instance
+    agent_os = AgentOS(
+        name="Civic Remediation System",
+        description="Autonomous multi-agent system for identifying and remediating civic infrastructure failures in India.",
+        # The primary interface is the coordinated team
+        teams=[civic_team],
+        # Also expose individual specialists
+        agents=list(agents.values()),
+    )
+
+    # Get the FastAPI app
+    return {**agents, "civic_team": civic_team, "agent_os": agent_os, "app": agent_os.get_app()}
+
+
+def get_agent_os() -> Dict[str, Any]:
+    """The AgentOS app, team and agents, built once per process."""
+    global _built
+    if _built is None:
+        with _build_lock:
+            if _built is None:
+                _built = _build()
+    return _built
+
+
+def __getattr__(name: str) -> Any:
+    if name in ("app", "agent_os", "civic_team") or any(name == attribute for attribute, *_ in AGENTS):
+        return get_agent_os()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     # Serve the application
     # Note: 'app.agent_os:app' must match the filename and app variable
-    agent_os.serve(app="app.agent_os:app", reload=True, port=7777)
+    get_agent_os()["agent_os"].serve(app="app.agent_os:app", reload=True, port=7777)
@@ -1,5 +1,4 @@
-from app.agents.base import SimpleAgent
-from agno.tools.parallel import ParallelTools
+from app.agents.base import SimpleAgent, parallel_tools
 from pydantic import BaseModel, Field
 from typing import List
 
@@ -19,7 +18,7 @@ class AuditorAgent(SimpleAgent):
             "Auditor",
             "auditor",
             FinancialAudit,
-            tools=[ParallelTools(enable_search=True)],
+            tools=[parallel_tools()],
             user_id=user_id
         )
     
@@ -1,21 +1,44 @@
-from typing import List, Optional, Any
-from os import getenv
+from typing import Any, Iterator, List, Optional
+from uuid import uuid4
 from agno.agent import Agent
-from agno.models.openai.like import OpenAILike
 from agno.tools.reasoning import ReasoningTools
 
-from app.knowledge import get_shared_db
+from app.knowledge import create_memory_manager, get_shared_db
+from app.llm import create_routed_model, POLLINATIONS_BASE_URL, DEFAULT_MODEL
+from app.telemetry import span, telemetry_tool_hook
 from app.utils import get_agent_prompt
+from app.utils.ratelimit import rate_limit_tool_hook
+from app.utils.tool_cache import tool_cache_hook
+
+class CivicAgent(Agent):
+    """Agent whose runs are recorded as "agent" telemetry spans (app.telemetry)."""
+
+    def run(self, *args: Any, **kwargs: Any) -> Any:
+        if kwargs.get("stream", self.stream):
+            return _traced_stream(self.name or "agent", super().run(*args, **kwargs))
+        with span("agent", self.name or "agent"):
+            return super().run(*args, **kwargs)
+
+
+def _traced_stream(name: str, events: Iterator[Any]) -> Iterator[Any]:
+    # A streamed run lasts until its last event is consumed
+    with span("agent", name, streamed=True):
+        yield from events
+
+
+def parallel_tools(extract: bool = False) -> Any:
+    """
+    ParallelTools web search (and page extraction with `extract`).
+    The toolkit is imported here, on first use, rather than with the agent modules.
+    """
+    from agno.tools.parallel import ParallelTools
+    return ParallelTools(enable_search=True, enable_extract=extract)
 
-# Pollinations.ai OpenAI-compatible endpoint
-POLLINATIONS_BASE_URL = "https://gen.pollinations.ai/v1"
-# Default model - can be: openai, openai-fast, qwen-coder, mistral, deepseek, grok, claude, nova-fast, etc.
-DEFAULT_MODEL = "perplexity-reasoning"
 
 def create_agent(
     name: str,
     slug: str,
-    model_id: str = DEFAULT_MODEL,
+    model_id: Optional[str] = None,
     tools: Optional[List[Any]] = None,
     output_schema: Optional[Any] = None,
     user_id: str = "civic-system",
@@ -28,7 +51,8 @@ def create_agent(
     Uses Pollinations.ai as the LLM provider via OpenAI-compatible API.
     
     Args:
-        model_id: Pollinations.ai model name (openai, mistral, deepseek, claude, etc.)
+        model_id: Pollinations.ai model name (openai, mistral, deepseek, claude, etc.) or
+                  model tier; by default the stage's routed model (see app.llm.routing)
         enable_reasoning_tools: If True, adds ReasoningTools (think/analyze) that agents
                                can use selectively. If False, no reasoning capabilities.
     """
@@ -54,19 +78,20 @@ def create_agent(
         # Add reasoning tools so agent can choose when to think/analyze
         agent_tools = [ReasoningTools()] + agent_tools
     
-    # Create Agent with Pollinations.ai
-    return Agent(
+    # Create Agent with Pollinations.ai (model routed and responses cached per stage)
+    return CivicAgent(
         name=name,
-        model=OpenAILike(
-            id=model_id,
-            base_url=POLLINATIONS_BASE_URL,
-            api_key=getenv("POLLINATIONS_API_KEY", "not-provided"),  # Optional for Pollinations.ai
-        ),
+        model=create_routed_model(slug, model_id),
         instructions=instructions,  # Give agent its specialized identity
         tools=agent_tools,
         output_schema=output_schema,
+        # Tool calls are timed; repeated ones (ParallelTools search/extract) are served
+        # from the tool cache and the rest draw from shared rate limits
+        tool_hooks=[telemetry_tool_hook, tool_cache_hook, rate_limit_tool_hook],
         db=get_shared_db(),
         update_memory_on_run=True,
+        # Reads only the run's owner's most recent memories (app.knowledge.memory)
+        memory_manager=create_memory_manager(),
         user_id=user_id,
         # Provide current datetime context to prevent knowledge cutoff hallucinations
         add_datetime_to_context=True,
@@ -81,9 +106,12 @@ class SimpleAgent:
     Handles common patterns:
     - Agent initialization with prompt loading
     - Message formatting and execution
+    
+    The underlying Agent comes from the process-wide agent pool; user and
+    session are passed on every run so instances never share state.
     """
     
-    def __init__(self, name: str, slug: str, output_schema, tools=None, user_id="civic-system"):
+    def __init__(self, name: str, slug: str, output_schema, tools=None, user_id="civic-system", session_id: Optional[str] = None):
         """
         Initialize a simple agent.
         
@@ -93,15 +121,18 @@ class SimpleAgent:
             output_schema: Pydantic model for structured output
             tools: Optional list of tools for the agent
             user_id: User ID for memory/session management
+            session_id: Session for this instance's runs (a fresh one if omitted)
         """
+        from app.agents.pool import get_pooled_agent
+        
         self.prompt = get_agent_prompt(slug)
         self.user_id = user_id
-        self.agent = create_agent(
+        self.session_id = session_id or str(uuid4())
+        self.agent = get_pooled_agent(
             name=name,
             slug=slug,
             tools=tools or [],
             output_schema=output_schema,
-            user_id=user_id
         )
     
     def _run(self, **format_kwargs):
@@ -116,5 +147,5 @@ class SimpleAgent:
         """
         messages = self.prompt.format(**format_kwargs)
         formatted_messages = [{"role": m.role, "content": m.content} for m in messages]
-        response = self.agent.run(formatted_messages)
+        response = self.agent.run(formatted_messages, user_id=self.user_id, session_id=self.session_id)
         return response.content
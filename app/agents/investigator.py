@@ -1,5 +1,4 @@
-from app.agents.base import SimpleAgent
-from agno.tools.parallel import ParallelTools
+from app.agents.base import SimpleAgent, parallel_tools
 from app.models import SelectedCause
 
 
@@ -11,7 +10,7 @@ class InvestigatorAgent(SimpleAgent):
             "Investigator",
             "investigator",
             SelectedCause,
-            tools=[ParallelTools(enable_search=True, enable_extract=True)],
+            tools=[parallel_tools(extract=True)],
             user_id=user_id
         )
 
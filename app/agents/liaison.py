@@ -1,8 +1,7 @@
 from typing import List, Optional
-from agno.tools.parallel import ParallelTools
 from pydantic import BaseModel, Field
 
-from app.agents.base import SimpleAgent
+from app.agents.base import SimpleAgent, parallel_tools
 
 
 class FundingSource(BaseModel):
@@ -34,7 +33,7 @@ class LiaisonAgent(SimpleAgent):
             "Liaison",
             "liaison",
             FundingPlan,
-            tools=[ParallelTools(enable_search=True, enable_extract=True)],
+            tools=[parallel_tools(extract=True)],
             user_id=user_id
         )
 
@@ -0,0 +1,104 @@
+"""
+Agent Pool - long-lived agents shared across pipeline runs.
+
+Building an Agent wires up a model client, a database handle and the prompt
+instructions, so agents are built once per process and reused. Per-run state
+is isolated by passing `session_id` / `user_id` to `Agent.run` instead of
+baking them into the agent (a pooled agent must never fall back to its own
+sticky session).
+"""
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from agno.agent import Agent
+
+from app.agents.base import create_agent
+
+
+def _tool_key(tool: Any) -> Hashable:
+    """Identify a tool by its class, toolkit name and exposed functions."""
+    functions = tuple(sorted(
+        getattr(fn, "name", None) or getattr(fn, "__name__", repr(fn))
+        for fn in (getattr(tool, "tools", None) or [])
+    ))
+    return (type(tool).__module__, type(tool).__qualname__, getattr(tool, "name", None), functions)
+
+
+class AgentPool:
+    """
+    Process-wide pool of agents keyed by (name, slug, model_id, output_schema, tools).
+
+    The first request for a key builds the agent with `create_agent`; later
+    requests return the same instance.
+    """
+
+    def __init__(self):
+        self._agents: Dict[Tuple, Agent] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        name: str,
+        slug: str,
+        model_id: Optional[str] = None,
+        tools: Optional[List[Any]] = None,
+        output_schema: Optional[Any] = None,
+        enable_reasoning_tools: bool = False,
+    ) -> Tuple:
+        return (
+            name,
+            slug,
+            model_id,
+            output_schema,
+            tuple(_tool_key(tool) for tool in (tools or [])),
+            enable_reasoning_tools,
+        )
+
+    def get(
+        self,
+        name: str,
+        slug: str,
+        model_id: Optional[str] = None,
+        tools: Optional[List[Any]] = None,
+        output_schema: Optional[Any] = None,
+        enable_reasoning_tools: bool = False,
+    ) -> Agent:
+        """Return the pooled agent for this configuration, building it on first use."""
+        key = self.key(name, slug, model_id, tools, output_schema, enable_reasoning_tools)
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = create_agent(
+                    name=name,
+                    slug=slug,
+                    model_id=model_id,
+                    tools=tools,
+                    output_schema=output_schema,
+                    enable_reasoning_tools=enable_reasoning_tools,
+                )
+                self._agents[key] = agent
+            return agent
+
+    def clear(self) -> None:
+        """Drop every pooled agent (e.g. after prompts or models change)."""
+        with self._lock:
+            self._agents.clear()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+# Shared by the pipeline, the team and the API
+agent_pool = AgentPool()
+
+
+def get_pooled_agent(
+    name: str,
+    slug: str,
+    model_id: Optional[str] = None,
+    tools: Optional[List[Any]] = None,
+    output_schema: Optional[Any] = None,
+    enable_reasoning_tools: bool = False,
+) -> Agent:
+    """Convenience wrapper around the process-wide `agent_pool`."""
+    return agent_pool.get(name, slug, model_id, tools, output_schema, enable_reasoning_tools)
@@ -1,6 +1,4 @@
-from app.agents.base import SimpleAgent
-from agno.tools.parallel import ParallelTools
-from app.knowledge import persist_agent_findings
+from app.agents.base import SimpleAgent, parallel_tools
 from app.models import SelectedProblem
 
 
@@ -12,7 +10,7 @@ class SentinelAgent(SimpleAgent):
             "Sentinel",
             "sentinel",
             SelectedProblem,
-            tools=[ParallelTools(enable_search=True)],
+            tools=[parallel_tools()],
             user_id=user_id
         )
 
@@ -29,6 +27,7 @@ class SentinelAgent(SimpleAgent):
         # Auto-persist to KB so other agents can reference these findings
         if persist_to_kb and result:
             try:
+                from app.knowledge import persist_agent_findings
                 persist_agent_findings(result, "Sentinel", query)
             except Exception as e:
                 print(f"[KB] Warning: Failed to persist findings: {e}")
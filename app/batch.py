@@ -0,0 +1,176 @@
+"""
+Batch mode for the Singleton Pipeline.
+
+Runs many queries (JSONL or CSV) through the pipeline with bounded
+concurrency and appends one JSON line per finished query to the output file.
+The output doubles as the checkpoint: on restart, queries already recorded
+as "ok" are skipped, so completed LLM work is never repeated.
+
+Usage:
+    uv run python -m app.batch queries.jsonl --output results.jsonl --concurrency 4
+
+Input rows need a `query` field and may carry an `id`, `tenant`, `project`
+and `user_id` (JSONL objects or CSV columns); rows without them use the
+--tenant / --project / --user options. A plain-text JSONL line is taken as
+the query.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from app.models import RemediationBlueprint
+from app.tenancy import Scope, add_scope_arguments
+
+load_dotenv()
+
+
+def query_id(query: str) -> str:
+    """Stable id for rows without one, so checkpoints survive reordering."""
+    return hashlib.sha1(query.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def _jsonl_row(line: str) -> Dict[str, Any]:
+    value = json.loads(line)
+    return value if isinstance(value, dict) else {"query": str(value)}
+
+
+def read_queries(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield {"id", "query", ...} rows from a JSONL or CSV file."""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows: Iterator[Dict[str, Any]] = csv.DictReader(f)
+        else:
+            rows = (_jsonl_row(line) for line in f if line.strip())
+        for row in rows:
+            query = (row.get("query") or "").strip()
+            if not query:
+                continue
+            yield {**row, "query": query, "id": str(row.get("id") or query_id(query))}
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Ids already completed successfully in a previous (possibly crashed) run."""
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partial line from a crash mid-write
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _terminate_partial_line(output_path: str) -> None:
+    """End a half-written last line left by a crash so new records start clean."""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def run_query(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one query through the shared pipeline and build its output record."""
+    from app.main import run_singleton_pipeline
+    from app.utils.ratelimit import PRIORITY_LOW, request_priority
+
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"id": row["id"], "query": row["query"]}
+    try:
+        default = Scope()
+        scope = Scope(
+            row.get("tenant") or default.tenant,
+            row.get("project") or default.project,
+            row.get("user_id") or default.user,
+        )
+        # Batch work yields the shared rate limits to interactive runs
+        with request_priority(PRIORITY_LOW):
+            response = run_singleton_pipeline(
+                row["query"],
+                user_id=scope.user_id,
+                session_id=scope.session_id(f"batch-{row['id']}"),
+            )
+        content = getattr(response, "content", response)
+        if isinstance(content, RemediationBlueprint):
+            record.update(status="ok", blueprint=content.model_dump())
+        else:
+            record.update(status="error", error=str(content))
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["duration_s"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 4,
+    runner: Callable[[Dict[str, Any]], Dict[str, Any]] = run_query,
+    scope: Optional[Scope] = None,
+) -> Dict[str, int]:
+    """
+    Run every pending query in `input_path`, appending results to `output_path`
+    as each one finishes. Rows that name no tenant, project or user get
+    those of `scope`. Returns counts of ok/error/skipped rows.
+    """
+    scope = scope or Scope()
+    defaults = {"tenant": scope.tenant, "project": scope.project, "user_id": scope.user}
+    done = load_checkpoint(output_path)
+    pending: List[Dict[str, Any]] = []
+    seen: Set[str] = set()
+    for row in read_queries(input_path):
+        if row["id"] in done or row["id"] in seen:
+            continue
+        seen.add(row["id"])
+        pending.append({**row, **{key: row.get(key) or value for key, value in defaults.items()}})
+
+    counts = {"ok": 0, "error": 0, "skipped": len(done)}
+    print(f"[Batch] {len(pending)} queries pending, {len(done)} already done (concurrency={concurrency})")
+
+    _terminate_partial_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(runner, row) for row in pending]
+        # Results are written from this thread only, one fsynced line per query
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            counts["ok" if record.get("status") == "ok" else "error"] += 1
+            print(f"[Batch] {record['status']}: {record['query'][:60]} ({counts['ok'] + counts['error']}/{len(pending)})")
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the Singleton Pipeline over a file of queries.")
+    parser.add_argument("input", help="JSONL or CSV file of queries")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL output (also the resume checkpoint)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Pipelines to run at once")
+    add_scope_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from app.utils import warm_prompts
+    warm_prompts()
+
+    scope = Scope(args.tenant, args.project, args.user)
+    counts = run_batch(args.input, args.output, concurrency=args.concurrency, scope=scope)
+    print(f"\n--- Batch complete: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Per-run checkpoints for the Singleton Pipeline.
+
+After every stage the pipeline stores its `PipelineContext` under the run id,
+so a run can later be resumed from any stage without repeating the earlier
+(web-search heavy) ones, e.g. to try a different funding match.
+
+Checkpoints live in the local cache directory (CIVIC_CACHE_DIR) and expire
+after PIPELINE_CHECKPOINT_TTL seconds (default 7 days, 0 = never).
+"""
+import os
+import threading
+from typing import Any, Optional
+
+from app.models import PipelineContext
+from app.utils.cache import TieredCache
+
+PIPELINE_CHECKPOINT_TTL = float(os.getenv("PIPELINE_CHECKPOINT_TTL", str(7 * 24 * 3600))) or None
+
+
+class CheckpointStore:
+    """Load and update the `PipelineContext` saved for each pipeline run."""
+
+    def __init__(self, cache: Optional[TieredCache] = None):
+        self.cache = cache or TieredCache("pipeline_checkpoints", max_memory_items=64, default_ttl=PIPELINE_CHECKPOINT_TTL)
+        self._lock = threading.Lock()
+
+    def load(self, run_id: str) -> Optional[PipelineContext]:
+        data = self.cache.get(run_id)
+        return PipelineContext.model_validate(data) if data is not None else None
+
+    def save(self, context: PipelineContext) -> None:
+        if not context.run_id:
+            raise ValueError("PipelineContext.run_id is required to save a checkpoint")
+        self.cache.set(context.run_id, context.model_dump(mode="json"))
+
+    def record_stage(self, run_id: str, original_query: str, field: str, value: Any) -> PipelineContext:
+        """Set one stage's selection on the run's context and persist it."""
+        with self._lock:
+            context = self.load(run_id) or PipelineContext(original_query=original_query, run_id=run_id)
+            setattr(context, field, value)
+            self.save(context)
+            return context
+
+    def delete(self, run_id: str) -> None:
+        self.cache.delete(run_id)
+
+
+checkpoints = CheckpointStore()
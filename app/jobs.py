@@ -0,0 +1,281 @@
+"""
+Background job queue for the Civic Remediation API.
+
+Pipeline runs take minutes, so the API accepts a query, returns a job id and
+executes the run on a small pool of asyncio workers, each handing the blocking
+pipeline to a thread, so at most JOB_WORKERS runs are in flight. Their model
+and tool requests draw from the shared per-provider rate limits
+(app.utils.ratelimit), which cap the load on each backend however its stages
+are routed. Stage progress is recorded on the job and can be followed as
+server-sent events; partial model output ("token" events) is only passed to
+the followers connected at the time, never kept on the job.
+
+Configuration (environment):
+    JOB_QUEUE_SIZE          max queued jobs before POST /run returns 503 (default 100)
+    JOB_WORKERS             concurrent pipeline runs (default 4)
+    JOB_RETENTION           seconds finished jobs stay queryable (default 3600)
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Set
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from app.tenancy import DEFAULT_PROJECT, DEFAULT_TENANT, DEFAULT_USER, Scope
+
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+
+# What a job runs: the singleton pipeline or the Deep Team (delegating or parallel)
+JobMode = Literal["singleton", "team", "team-parallel"]
+
+# Events sent to live followers only: kept, they would grow with every token streamed
+TRANSIENT_EVENTS = ("token",)
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+@dataclass
+class Job:
+    """A queued pipeline run and everything observed about it so far."""
+    query: str
+    mode: JobMode = "singleton"
+    user_id: str = DEFAULT_USER
+    tenant: str = DEFAULT_TENANT
+    project: str = DEFAULT_PROJECT
+    id: str = field(default_factory=lambda: str(uuid4()))
+    run_id: Optional[str] = None  # Pipeline run (checkpoint) id; defaults to the job id
+    from_stage: Optional[int] = None  # Resume `run_id` from this stage instead of starting fresh
+    tokens: bool = False  # Emit partial model output as "token" events (streamed runs)
+    priority: Optional[int] = None  # Place in the shared rate-limit queues (app.utils.ratelimit)
+    status: JobStatus = JobStatus.queued
+    stage: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def __post_init__(self):
+        self.run_id = self.run_id or self.id
+
+    @property
+    def scope(self) -> Scope:
+        return Scope(self.tenant, self.project, self.user_id)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.succeeded, JobStatus.failed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = self.result
+        if isinstance(result, BaseModel):
+            result = result.model_dump()
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "mode": self.mode,
+            "tenant": self.tenant,
+            "project": self.project,
+            "user_id": self.user_id,
+            "run_id": self.run_id,
+            "from_stage": self.from_stage,
+            "status": self.status.value,
+            "stage": self.stage,
+            "result": result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# A runner executes one job synchronously and reports progress through `emit`
+JobRunner = Callable[[Job, Callable[[Dict[str, Any]], None]], Any]
+
+
+def run_pipeline_job(job: Job, emit: Callable[[Dict[str, Any]], None]) -> Any:
+    """
+    Default runner: stream the singleton pipeline (or run the Deep Team) and
+    emit an event whenever a stage starts or completes, the latter carrying the
+    stage's selection, and (for `job.tokens`) each partial model output. Pipeline runs are checkpointed under `job.run_id`; jobs
+    with `from_stage` resume that run. Memories and sessions are scoped to the
+    job's tenant, project and user.
+    """
+    scope = job.scope
+    if job.mode in ("team", "team-parallel"):
+        from app.main import run_team
+        from app.team import TEAM_MODE
+        team_mode = "parallel" if job.mode == "team-parallel" else TEAM_MODE
+        return run_team(job.query, user_id=scope.user_id, session_id=scope.session_id(job.id), team_mode=team_mode)
+
+    from app.streaming import stream_pipeline
+
+    result = None
+    for event in stream_pipeline(
+        job.query,
+        user_id=scope.user_id,
+        session_id=scope.session_id(job.id),
+        run_id=job.run_id,
+        from_stage=job.from_stage,
+        tokens=job.tokens,
+        priority=job.priority,
+    ):
+        if event["event"] in ("stage_started", "token"):
+            emit(event)
+        elif event["event"] == "stage_completed":
+            selection = event["selection"]
+            if isinstance(selection, BaseModel):
+                selection = selection.model_dump(mode="json")
+            emit({**event, "selection": selection})
+        elif event["event"] == "run_failed":
+            raise RuntimeError(event["error"])
+        elif event["event"] == "run_completed":
+            result = event["result"]
+    return result
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """Bounded in-process job queue served by a fixed pool of async workers."""
+
+    def __init__(
+        self,
+        runner: JobRunner = run_pipeline_job,
+        max_queue: int = JOB_QUEUE_SIZE,
+        workers: int = JOB_WORKERS,
+        retention: float = JOB_RETENTION,
+    ):
+        self.runner = runner
+        self.retention = retention
+        self.max_queue = max_queue
+        self.workers = workers
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._followers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; running threads finish on their own."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: Job) -> Job:
+        """Enqueue a job or raise QueueFullError if the queue is at capacity."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() must be awaited before submitting jobs")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_queue} pending)")
+        self._prune()
+        self.jobs[job.id] = job
+        self._followers[job.id] = set()
+        self._record(job, {"event": "queued"})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self.jobs.values():
+            counts[job.status.value] += 1
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "jobs": counts,
+        }
+
+    def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        A job's recorded events from the start, then its new ones (transient
+        ones included) until it finishes. Following starts with this call, not
+        with the first iteration, so nothing is missed in between.
+        """
+        job = self.jobs[job_id]
+        updates: asyncio.Queue = asyncio.Queue()
+        for event in job.events:
+            updates.put_nowait(event)
+        if not job.done:
+            self._followers[job_id].add(updates)
+        return self._follow(job_id, updates)
+
+    async def _follow(self, job_id: str, updates: asyncio.Queue) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            while True:
+                event = await updates.get()
+                yield event
+                if event["event"] in (JobStatus.succeeded.value, JobStatus.failed.value):
+                    return
+        finally:
+            self._followers.get(job_id, set()).discard(updates)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window."""
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self.jobs.values() if j.done and j.finished_at < cutoff]:
+            self.jobs.pop(job_id, None)
+            self._followers.pop(job_id, None)
+
+    def _record(self, job: Job, event: Dict[str, Any]) -> None:
+        """Append an event (unless transient) and pass it to followers (must run on the event loop)."""
+        event = {"job_id": job.id, "time": time.time(), **event}
+        if event["event"] == "stage_started":
+            job.stage = event.get("stage")
+        if event["event"] not in TRANSIENT_EVENTS:
+            job.events.append(event)
+        for updates in self._followers.get(job.id, ()):
+            updates.put_nowait(event)
+        if job.done:
+            self._followers.pop(job.id, None)
+
+    def _emit_threadsafe(self, job: Job) -> Callable[[Dict[str, Any]], None]:
+        loop = self._loop
+
+        def emit(event: Dict[str, Any]) -> None:
+            loop.call_soon_threadsafe(self._record, job, event)
+
+        return emit
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                job.status = JobStatus.running
+                job.started_at = time.time()
+                self._record(job, {"event": "started"})
+                try:
+                    job.result = await asyncio.to_thread(self.runner, job, self._emit_threadsafe(job))
+                    job.status = JobStatus.succeeded
+                except Exception as e:
+                    job.error = str(e)
+                    job.status = JobStatus.failed
+                job.finished_at = time.time()
+                self._record(job, {"event": job.status.value, "error": job.error})
+            finally:
+                self._queue.task_done()
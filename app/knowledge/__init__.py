@@ -1,8 +1,43 @@
 """
 Knowledge module for Civic Remediation System.
 Provides RAG capabilities and shared database configuration.
+
+Names are imported on first use, so PgVector, the embedders and psycopg are
+only loaded once something touches the knowledge base.
 """
-from app.knowledge.base import get_civic_knowledge, load_documents, persist_agent_findings
-from app.knowledge.memory import get_shared_db
+from app.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "get_civic_knowledge": "app.knowledge.base",
+    "load_documents": "app.knowledge.base",
+    "get_shared_db": "app.knowledge.memory",
+    "CivicMemoryManager": "app.knowledge.memory",
+    "create_memory_manager": "app.knowledge.memory",
+    "create_memory_indexes": "app.knowledge.memory",
+    "apply_memory_retention": "app.knowledge.memory",
+    "memory_owners": "app.knowledge.memory",
+    "persist_agent_findings": "app.knowledge.base",
+    "findings_hash": "app.knowledge.base",
+    "compact_findings": "app.knowledge.compaction",
+    "create_vector_index": "app.knowledge.admin",
+    "create_filter_indexes": "app.knowledge.admin",
+    "index_status": "app.knowledge.admin",
+    "search_knowledge": "app.knowledge.admin",
+    "create_embedder": "app.knowledge.embedder",
+    "CachedEmbedder": "app.knowledge.embedder",
+    "HashingEmbedder": "app.knowledge.embedder",
+    "LocalEmbedder": "app.knowledge.embedder",
+    "embedding_cache": "app.knowledge.embedder",
+    "BulkIngestor": "app.knowledge.ingest",
+    "IngestReport": "app.knowledge.ingest",
+    "ingest_sources": "app.knowledge.ingest",
+    "get_engine": "app.knowledge.engine",
+    "get_pool_metrics": "app.knowledge.engine",
+    "dispose_engine": "app.knowledge.engine",
+    "findings_writer": "app.knowledge.writer",
+    "flush_findings": "app.knowledge.writer",
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ["get_civic_knowledge", "load_documents", "get_shared_db", "persist_agent_findings"]
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,346 @@
+"""
+Knowledge-base administration: ANN indexes and tuned retrieval.
+
+Builds and rebuilds the HNSW or IVFFlat index on `civic_knowledge`, adds the
+expression/full-text indexes used by filtered hybrid search, and runs searches
+with a per-query `ef_search` (HNSW) or `probes` (IVFFlat) setting.
+
+Rebuilds never leave the table unindexed: the new index is built
+CONCURRENTLY under a temporary name, then swapped in within one transaction.
+
+Usage:
+    uv run python -m app.knowledge.admin status
+    uv run python -m app.knowledge.admin create-index --type hnsw
+    uv run python -m app.knowledge.admin rebuild-index --type ivfflat
+    uv run python -m app.knowledge.admin search "Ganga sewage" --agent Sentinel --since 2026-01-01
+
+Configuration (environment):
+    KB_INDEX_TYPE            hnsw or ivfflat (default hnsw)
+    KB_HNSW_M                HNSW graph degree (default 16)
+    KB_HNSW_EF_CONSTRUCTION  HNSW build-time candidate list (default 200)
+    KB_HNSW_EF_SEARCH        HNSW query-time candidate list (default 40)
+    KB_IVFFLAT_LISTS         IVFFlat lists (default: rows/1000, or sqrt(rows) above 1M)
+    KB_IVFFLAT_PROBES        IVFFlat lists probed per query (default 10)
+    KB_HYBRID_CANDIDATES     nearest rows reranked per hybrid result (default 4)
+    KB_SEARCH_TYPE           search used by agents: vector, keyword or hybrid (default vector)
+"""
+import argparse
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+from agno.vectordb.pgvector import HNSW, Ivfflat, PgVector
+from agno.vectordb.search import SearchType
+from sqlalchemy import func, not_, select, text
+from sqlalchemy.sql import Select
+
+from app.telemetry import traced
+
+KB_INDEX_TYPE = os.getenv("KB_INDEX_TYPE", "hnsw")
+KB_HNSW_M = int(os.getenv("KB_HNSW_M", "16"))
+KB_HNSW_EF_CONSTRUCTION = int(os.getenv("KB_HNSW_EF_CONSTRUCTION", "200"))
+KB_HNSW_EF_SEARCH = int(os.getenv("KB_HNSW_EF_SEARCH", "40"))
+KB_IVFFLAT_LISTS = int(os.getenv("KB_IVFFLAT_LISTS", "0"))
+KB_IVFFLAT_PROBES = int(os.getenv("KB_IVFFLAT_PROBES", "10"))
+KB_HYBRID_CANDIDATES = int(os.getenv("KB_HYBRID_CANDIDATES", "4"))
+KB_SEARCH_TYPE = SearchType(os.getenv("KB_SEARCH_TYPE", "vector"))
+
+# Metadata fields written by persist_agent_findings that searches filter on
+FILTER_FIELDS = ("agent", "type", "timestamp")
+
+
+def vector_index(kind: str = KB_INDEX_TYPE) -> Union[HNSW, Ivfflat]:
+    """The configured index definition (also used by PgVector's own searches)."""
+    if kind == "hnsw":
+        return HNSW(m=KB_HNSW_M, ef_construction=KB_HNSW_EF_CONSTRUCTION, ef_search=KB_HNSW_EF_SEARCH)
+    if kind == "ivfflat":
+        return Ivfflat(
+            lists=KB_IVFFLAT_LISTS or 100,
+            dynamic_lists=not KB_IVFFLAT_LISTS,
+            probes=KB_IVFFLAT_PROBES,
+        )
+    raise ValueError(f"Unknown index type '{kind}' (expected 'hnsw' or 'ivfflat')")
+
+
+def index_name(vector_db: PgVector, kind: str) -> str:
+    return f"{vector_db.table_name}_{kind}_index"
+
+
+def _ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows/1000 lists up to 1M rows, sqrt(rows) beyond."""
+    return max(int(rows / 1000) if rows < 1_000_000 else int(math.sqrt(rows)), 1)
+
+
+# Per distance metric: the index operator class and the pgvector comparator that
+# orders by it, so searches are always served by the index the table has
+DISTANCE_METRICS = {
+    "cosine": ("vector_cosine_ops", "cosine_distance"),
+    "l2": ("vector_l2_ops", "l2_distance"),
+    "max_inner_product": ("vector_ip_ops", "max_inner_product"),
+}
+
+
+def _metric(vector_db: PgVector) -> Tuple[str, str]:
+    return DISTANCE_METRICS.get(vector_db.distance.value, DISTANCE_METRICS["cosine"])
+
+
+def vector_index_sql(vector_db: PgVector, kind: str, name: str, rows: int = 0) -> str:
+    """CREATE INDEX CONCURRENTLY statement for the vector column."""
+    opclass, _ = _metric(vector_db)
+    if kind == "hnsw":
+        params = f"m = {KB_HNSW_M}, ef_construction = {KB_HNSW_EF_CONSTRUCTION}"
+    elif kind == "ivfflat":
+        params = f"lists = {KB_IVFFLAT_LISTS or _ivfflat_lists(rows)}"
+    else:
+        raise ValueError(f"Unknown index type '{kind}' (expected 'hnsw' or 'ivfflat')")
+    return (
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON {vector_db.table.fullname} '
+        f"USING {kind} (embedding {opclass}) WITH ({params})"
+    )
+
+
+def filter_index_sql(vector_db: PgVector) -> List[str]:
+    """Expression indexes for the metadata filters plus the full-text index for hybrid search."""
+    table = vector_db.table.fullname
+    statements = [
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{vector_db.table_name}_meta_{field}_idx" '
+        f"ON {table} ((meta_data->>'{field}'))"
+        for field in FILTER_FIELDS
+    ]
+    statements.append(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{vector_db.table_name}_content_fts_idx" '
+        f"ON {table} USING gin (to_tsvector('{vector_db.content_language}', content))"
+    )
+    return statements
+
+
+def _vector_db(knowledge: Optional[Knowledge]) -> PgVector:
+    if knowledge is None:
+        from app.knowledge.base import get_civic_knowledge
+        knowledge = get_civic_knowledge()
+    return knowledge.vector_db
+
+
+def _autocommit(vector_db: PgVector):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    return vector_db.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def create_vector_index(kind: str = KB_INDEX_TYPE, rebuild: bool = False, knowledge: Optional[Knowledge] = None) -> str:
+    """
+    Create the `kind` ANN index if missing; with `rebuild`, build a fresh one
+    and swap it in. An index of the other kind is dropped once the new one is
+    in place. Returns the index name.
+    """
+    vector_db = _vector_db(knowledge)
+    vector_db.create()
+    name = index_name(vector_db, kind)
+    other = index_name(vector_db, "ivfflat" if kind == "hnsw" else "hnsw")
+    schema = vector_db.schema
+
+    with _autocommit(vector_db) as conn:
+        for key, value in vector_index(kind).configuration.items():
+            conn.execute(text(f"SET {key} = '{value}'"))
+        exists = name in _index_names(conn, vector_db)
+        if exists and not rebuild:
+            return name
+
+        rows = conn.execute(select(func.count()).select_from(vector_db.table)).scalar() or 0
+        target = f"{name}_new" if exists else name
+        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}"."{name}_new"'))
+        print(f"[KB] Building {kind} index '{target}' over {rows} rows...")
+        conn.execute(text(vector_index_sql(vector_db, kind, target, rows)))
+        if exists:
+            # Swap in one transaction so searches always find an index
+            with vector_db.db_engine.begin() as tx:
+                tx.execute(text(f'DROP INDEX "{schema}"."{name}"'))
+                tx.execute(text(f'ALTER INDEX "{schema}"."{target}" RENAME TO "{name}"'))
+        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}"."{other}"'))
+
+    vector_db.vector_index = vector_index(kind)
+    vector_db.vector_index.name = name
+    return name
+
+
+def create_filter_indexes(knowledge: Optional[Knowledge] = None) -> None:
+    """Create the metadata expression indexes and the full-text index (idempotent)."""
+    vector_db = _vector_db(knowledge)
+    vector_db.create()
+    with _autocommit(vector_db) as conn:
+        for statement in filter_index_sql(vector_db):
+            conn.execute(text(statement))
+
+
+def _index_names(conn, vector_db: PgVector) -> List[str]:
+    return list(conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE schemaname = :schema AND tablename = :table"),
+        {"schema": vector_db.schema, "table": vector_db.table_name},
+    ).scalars())
+
+
+def index_status(knowledge: Optional[Knowledge] = None) -> Dict[str, Any]:
+    """Row count and the indexes (with definitions) on the knowledge table."""
+    vector_db = _vector_db(knowledge)
+    with vector_db.db_engine.connect() as conn:
+        indexes = conn.execute(
+            text("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = :schema AND tablename = :table"),
+            {"schema": vector_db.schema, "table": vector_db.table_name},
+        ).all()
+        rows = conn.execute(select(func.count()).select_from(vector_db.table)).scalar()
+    return {"table": vector_db.table.fullname, "rows": rows, "indexes": {name: sql for name, sql in indexes}}
+
+
+def search_statement(
+    vector_db: PgVector,
+    query_embedding: List[float],
+    query: Optional[str] = None,
+    limit: int = 5,
+    agent: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    vector_weight: float = 0.5,
+) -> Select:
+    """
+    Nearest-neighbour query over the knowledge table, filtered on metadata.
+
+    Without `query` text results are ranked by vector distance. With it, the
+    `limit * KB_HYBRID_CANDIDATES` nearest rows are reranked by a hybrid score
+    (weighted vector similarity plus full-text rank, as in PgVector.hybrid_search),
+    so both forms are served by the ANN index instead of a sequential scan.
+    `since`/`until` compare ISO timestamps as strings. Chunks of a bulk ingest
+    still in flight (marked `pending`) are left out.
+    """
+    table = vector_db.table
+    meta = table.c.meta_data
+    conditions = [not_(meta.has_key("pending"))]
+    if agent:
+        conditions.append(meta["agent"].astext == agent)
+    if doc_type:
+        conditions.append(meta["type"].astext == doc_type)
+    if since:
+        conditions.append(meta["timestamp"].astext >= since)
+    if until:
+        conditions.append(meta["timestamp"].astext < until)
+
+    # The configured metric's operator, the one the vector index is built for
+    distance = getattr(table.c.embedding, _metric(vector_db)[1])(query_embedding)
+    columns = [table.c.id, table.c.name, table.c.meta_data, table.c.content, distance.label("distance")]
+    if not query:
+        return select(*columns).where(*conditions).order_by(distance).limit(limit)
+
+    # Hybrid: rerank the nearest candidates (served by the ANN index) by vector + text score
+    candidates = (
+        select(*columns)
+        .where(*conditions)
+        .order_by(distance)
+        .limit(limit * KB_HYBRID_CANDIDATES)
+        .subquery()
+    )
+    ts_vector = func.to_tsvector(vector_db.content_language, candidates.c.content)
+    ts_query = func.websearch_to_tsquery(vector_db.content_language, query)
+    if vector_db.distance.value == "max_inner_product":
+        # pgvector's <#> is the negated inner product; map [-1, 1] similarity to [0, 1]
+        similarity = (1 - candidates.c.distance) / 2
+    else:
+        similarity = 1 / (1 + candidates.c.distance)
+    score = vector_weight * similarity + (1 - vector_weight) * func.ts_rank_cd(ts_vector, ts_query)
+    return select(candidates, score.label("score")).order_by(score.desc()).limit(limit)
+
+
+@traced("kb")
+def search_knowledge(
+    query: str,
+    limit: int = 5,
+    agent: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    hybrid: bool = True,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    knowledge: Optional[Knowledge] = None,
+) -> List[Document]:
+    """
+    Search the knowledge base with metadata filters and per-query index tuning.
+
+    `ef_search` (HNSW) and `probes` (IVFFlat) trade recall for latency on this
+    query only; they default to the configured KB_HNSW_EF_SEARCH/KB_IVFFLAT_PROBES.
+    """
+    vector_db = _vector_db(knowledge)
+    stmt = search_statement(
+        vector_db,
+        vector_db.embedder.get_embedding(query),
+        query=query if hybrid else None,
+        limit=limit,
+        agent=agent,
+        doc_type=doc_type,
+        since=since,
+        until=until,
+        vector_weight=vector_db.vector_score_weight,
+    )
+    with vector_db.Session() as session, session.begin():
+        # SET LOCAL only lasts for this transaction, so concurrent searches keep their own settings
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search or KB_HNSW_EF_SEARCH)}"))
+        session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes or KB_IVFFLAT_PROBES)}"))
+        rows = session.execute(stmt).all()
+
+    return [
+        Document(
+            id=row.id,
+            name=row.name,
+            meta_data={**(row.meta_data or {}), "distance": row.distance},
+            content=row.content,
+        )
+        for row in rows
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the civic knowledge indexes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show row count and indexes")
+    for command in ("create-index", "rebuild-index"):
+        sub = commands.add_parser(command, help=f"{command.split('-')[0].title()} the ANN and filter indexes")
+        sub.add_argument("--type", choices=["hnsw", "ivfflat"], default=KB_INDEX_TYPE)
+    search = commands.add_parser("search", help="Filtered hybrid search")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=5)
+    search.add_argument("--agent")
+    search.add_argument("--type", dest="doc_type")
+    search.add_argument("--since", help="ISO date/time, inclusive")
+    search.add_argument("--until", help="ISO date/time, exclusive")
+    search.add_argument("--vector-only", action="store_true", help="Rank by vector distance only")
+    search.add_argument("--ef-search", type=int)
+    search.add_argument("--probes", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        status = index_status()
+        print(f"{status['table']}: {status['rows']} rows")
+        for name, definition in status["indexes"].items():
+            print(f"  {name}: {definition}")
+    elif args.command in ("create-index", "rebuild-index"):
+        name = create_vector_index(args.type, rebuild=args.command == "rebuild-index")
+        create_filter_indexes()
+        print(f"[KB] Index '{name}' ready")
+    else:
+        docs = search_knowledge(
+            args.query,
+            limit=args.limit,
+            agent=args.agent,
+            doc_type=args.doc_type,
+            since=args.since,
+            until=args.until,
+            hybrid=not args.vector_only,
+            ef_search=args.ef_search,
+            probes=args.probes,
+        )
+        for doc in docs:
+            print(f"[{doc.meta_data.get('distance'):.4f}] {doc.name} ({doc.meta_data.get('agent')}, {doc.meta_data.get('timestamp')})")
+
+
+if __name__ == "__main__":
+    main()
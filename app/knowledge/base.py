@@ -2,57 +2,96 @@
 Knowledge Base for Civic Remediation System.
 Provides RAG capabilities using PgVector.
 """
-import os
 import json
+import threading
 from datetime import datetime
+from typing import Optional
 from agno.knowledge.knowledge import Knowledge
 from agno.vectordb.pgvector import PgVector
-from agno.knowledge.embedder.google import GeminiEmbedder
 from agno.knowledge.document import Document
 
-# Database URL from environment or default
-DB_URL = os.getenv(
-    "DATABASE_URL",
-    "postgresql+psycopg://ai:ai@localhost:5532/ai"
-)
+from app.knowledge.engine import DB_URL, get_engine
+from app.knowledge.admin import KB_SEARCH_TYPE, vector_index
+from app.knowledge.embedder import create_embedder, knowledge_table_name
+from app.knowledge.ingest import IngestReport, ingest_sources
+from app.knowledge.writer import findings_writer
+from app.telemetry import span, traced
+from app.utils.cache import cache_key
+
+class CivicPgVector(PgVector):
+    """PgVector whose searches (agent knowledge lookups included) are recorded as "kb" spans."""
+
+    def search(self, *args, **kwargs):
+        with span("kb", "vector_search"):
+            return super().search(*args, **kwargs)
+
+
+_civic_knowledge: Optional[Knowledge] = None
+_civic_knowledge_lock = threading.Lock()
+
 
 def get_civic_knowledge() -> Knowledge:
     """
     Get the civic infrastructure knowledge base.
+    
+    Built once per process on the shared engine, so knowledge search and
+    persistence reuse the same connection pool as agent memory. Index type,
+    search type and ef_search/probes come from the knowledge-admin settings;
+    the embedder (cached, Gemini or local) from KB_EMBEDDER.
     """
-    return Knowledge(
-        name="Civic Infrastructure Knowledge Base",
-        description="Documents about civic infrastructure, remediation techniques, and vendor solutions.",
-        vector_db=PgVector(
-            table_name="civic_knowledge",
-            db_url=DB_URL,
-            embedder=GeminiEmbedder(),
-        ),
-    )
+    global _civic_knowledge
+    with _civic_knowledge_lock:
+        if _civic_knowledge is None:
+            _civic_knowledge = Knowledge(
+                name="Civic Infrastructure Knowledge Base",
+                description="Documents about civic infrastructure, remediation techniques, and vendor solutions.",
+                vector_db=CivicPgVector(
+                    table_name=knowledge_table_name(),
+                    db_engine=get_engine(),
+                    embedder=create_embedder(),
+                    search_type=KB_SEARCH_TYPE,
+                    vector_index=vector_index(),
+                ),
+            )
+        return _civic_knowledge
 
 
-def load_documents(urls: list[str]) -> None:
+def load_documents(urls: list[str], force: bool = False) -> IngestReport:
     """
     Load documents into the knowledge base.
+
+    Runs the bulk ingestion pipeline: sources are fetched and parsed in
+    parallel, chunked as they stream in, embedded in batches and written in
+    bulk. Sources whose content is unchanged since the last load are skipped
+    unless `force` is set.
     """
-    kb = get_civic_knowledge()
-    for url in urls:
-        print(f"Loading: {url}")
-        kb.insert(url=url)
-    print("Knowledge base updated.")
+    return ingest_sources(urls, force=force, knowledge=get_civic_knowledge())
+
 
+def findings_hash(agent_name: str, query: str, data) -> str:
+    """
+    Content hash of a set of findings: agent, whitespace/case-normalized query
+    and canonical (key-sorted) findings JSON. Identical findings always hash
+    the same, whenever and however often they are produced.
+    """
+    return cache_key(agent_name, " ".join(query.split()).lower(), data)
 
+
+@traced("kb")
 def persist_agent_findings(findings: dict | list | object, agent_name: str, query: str) -> None:
     """
     Persist agent findings to the knowledge base for future reference.
     
+    The document is queued for the write-behind writer, which embeds and
+    inserts findings in batches; call `flush_findings()` to wait for it.
+    Findings are keyed by `findings_hash`, so repeats are never re-embedded:
+    the stored document just has its `timestamp` and `seen_count` updated.
+    
     Args:
         findings: The structured output from an agent (Pydantic model or dict)
         agent_name: Name of the agent that produced the findings
         query: The original query that triggered the findings
     """
-    kb = get_civic_knowledge()
-    
     # Convert Pydantic model to dict if needed
     if hasattr(findings, 'model_dump'):
         data = findings.model_dump()
@@ -61,28 +100,32 @@ def persist_agent_findings(findings: dict | list | object, agent_name: str, quer
     else:
         data = findings
     
-    # Create a searchable text representation
+    # Create a searchable text representation (no timestamp, so repeats hash the same)
     timestamp = datetime.now().isoformat()
+    content_hash = findings_hash(agent_name, query, data)
     content = f"""
 Agent: {agent_name}
 Query: {query}
-Timestamp: {timestamp}
 
 Findings:
 {json.dumps(data, indent=2, ensure_ascii=False)}
 """
     
-    # Create a Document and insert
+    # Create a Document and queue it for the next batch
     doc = Document(
-        name=f"{agent_name}_findings_{timestamp[:10]}",
+        id=content_hash,
+        name=f"{agent_name}_findings_{content_hash[:16]}",
         content=content,
         meta_data={
             "agent": agent_name,
             "query": query,
             "timestamp": timestamp,
+            "first_seen": timestamp,
+            "seen_count": 1,
+            "content_hash": content_hash,
             "type": "agent_findings"
         }
     )
     
-    kb.load_documents([doc])
-    print(f"[KB] Persisted {agent_name} findings for: {query[:50]}...")
+    findings_writer.submit(doc)
+    print(f"[KB] Queued {agent_name} findings for: {query[:50]}...")
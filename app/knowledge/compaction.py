@@ -0,0 +1,137 @@
+"""
+Compaction job for agent findings in the civic knowledge base.
+
+Exact repeats are already deduplicated on write (by content hash). This job
+merges *near*-duplicates: findings from the same agent whose embeddings are
+within FINDINGS_MERGE_DISTANCE (cosine distance) of each other. The most
+recently seen document of each group is kept; it inherits the group's total
+`seen_count` and earliest `first_seen`, and the others are deleted. Their ids
+(a finding's id is its content hash) are kept in the survivor's `merged_ids`,
+so the writer counts later repeats of them against the survivor.
+
+Usage:
+    uv run python -m app.knowledge.compaction --distance 0.03 --dry-run
+
+Configuration (environment):
+    FINDINGS_MERGE_DISTANCE   max cosine distance between merged findings (default 0.03)
+"""
+import argparse
+import os
+from typing import Any, Dict, List, Optional
+
+from agno.knowledge.knowledge import Knowledge
+from sqlalchemy import delete, select, update
+
+FINDINGS_MERGE_DISTANCE = float(os.getenv("FINDINGS_MERGE_DISTANCE", "0.03"))
+
+
+def merge_group(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Pick the survivor of a near-duplicate group and its merged metadata.
+
+    `rows` are {"id", "meta_data"} dicts. Returns {"keep", "meta_data", "delete"}.
+    """
+    def last_seen(row):
+        return row["meta_data"].get("timestamp") or ""
+
+    keep = max(rows, key=last_seen)
+    first_seen = [row["meta_data"].get("first_seen") or last_seen(row) for row in rows]
+    meta_data = {
+        **keep["meta_data"],
+        "seen_count": sum(int(row["meta_data"].get("seen_count", 1)) for row in rows),
+        "first_seen": min(seen for seen in first_seen if seen) if any(first_seen) else None,
+        "merged_ids": sorted(
+            {row["id"] for row in rows if row is not keep}
+            | {merged for row in rows for merged in row["meta_data"].get("merged_ids", [])}
+        ),
+    }
+    return {"keep": keep["id"], "meta_data": meta_data, "delete": [row["id"] for row in rows if row is not keep]}
+
+
+def compact_findings(
+    max_distance: float = FINDINGS_MERGE_DISTANCE,
+    neighbours: int = 10,
+    page_size: int = 500,
+    dry_run: bool = False,
+    knowledge: Optional[Knowledge] = None,
+) -> Dict[str, int]:
+    """
+    Merge near-duplicate agent findings.
+
+    Walks the findings in id order (a page at a time) and, for each one still
+    present, looks up its `neighbours` nearest findings from the same agent
+    through the vector index. Returns counts of groups merged and rows removed.
+    """
+    if knowledge is None:
+        from app.knowledge.base import get_civic_knowledge
+        knowledge = get_civic_knowledge()
+    vector_db = knowledge.vector_db
+    table = vector_db.table
+    is_finding = table.c.meta_data["type"].astext == "agent_findings"
+
+    counts = {"scanned": 0, "groups": 0, "removed": 0}
+    removed: set = set()
+    merged: Dict[str, Dict[str, Any]] = {}  # Survivors' metadata, fresher than the page we read
+    last_id = ""
+    with vector_db.Session() as session:
+        while True:
+            page = session.execute(
+                select(table.c.id, table.c.meta_data, table.c.embedding)
+                .where(is_finding, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(page_size)
+            ).all()
+            if not page:
+                break
+            last_id = page[-1].id
+
+            for row in page:
+                if row.id in removed:
+                    continue
+                counts["scanned"] += 1
+                distance = table.c.embedding.cosine_distance(row.embedding)
+                similar = session.execute(
+                    select(table.c.id, table.c.meta_data)
+                    .where(
+                        is_finding,
+                        table.c.id != row.id,
+                        table.c.meta_data["agent"].astext == row.meta_data.get("agent"),
+                        distance <= max_distance,
+                    )
+                    .order_by(distance)
+                    .limit(neighbours)
+                ).all()
+                similar = [r for r in similar if r.id not in removed]
+                if not similar:
+                    continue
+
+                plan = merge_group(
+                    [{"id": row.id, "meta_data": merged.get(row.id, row.meta_data)}]
+                    + [{"id": r.id, "meta_data": merged.get(r.id, r.meta_data)} for r in similar]
+                )
+                merged[plan["keep"]] = plan["meta_data"]
+                counts["groups"] += 1
+                counts["removed"] += len(plan["delete"])
+                removed.update(plan["delete"])
+                if not dry_run:
+                    session.execute(update(table).where(table.c.id == plan["keep"]).values(meta_data=plan["meta_data"]))
+                    session.execute(delete(table).where(table.c.id.in_(plan["delete"])))
+                    session.commit()
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Merge near-duplicate agent findings in the knowledge base.")
+    parser.add_argument("--distance", type=float, default=FINDINGS_MERGE_DISTANCE, help="Max cosine distance to merge")
+    parser.add_argument("--neighbours", type=int, default=10, help="Nearest findings checked per document")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be merged without changing anything")
+    args = parser.parse_args(argv)
+
+    counts = compact_findings(args.distance, neighbours=args.neighbours, dry_run=args.dry_run)
+    action = "would remove" if args.dry_run else "removed"
+    print(f"[KB] Scanned {counts['scanned']} findings, merged {counts['groups']} groups, {action} {counts['removed']} documents")
+
+
+if __name__ == "__main__":
+    main()
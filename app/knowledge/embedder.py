@@ -0,0 +1,219 @@
+"""
+Embedders for the civic knowledge base.
+
+Every embedder is wrapped in a persistent cache keyed by (model, dimensions,
+text hash), so text that was embedded once - a repeated query, a re-ingested
+document - never costs another API call.
+
+The backend is chosen with KB_EMBEDDER:
+    gemini      GeminiEmbedder (default, needs GOOGLE_API_KEY)
+    local       FastEmbed ONNX model on CPU, loaded once and batched (pip install fastembed)
+    hashing     dependency-free feature-hashing embedder; works offline and in tests
+
+Other settings (environment):
+    KB_EMBEDDER_MODEL       model for the local backend (default BAAI/bge-small-en-v1.5)
+    KB_EMBEDDER_DIMENSIONS  vector size of the local and hashing backends (default 384)
+    KB_EMBEDDING_CACHE      set to false to disable the embedding cache (default true)
+"""
+import asyncio
+import hashlib
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.knowledge.embedder.base import Embedder
+
+from app.utils.cache import TieredCache, cache_key
+
+KB_EMBEDDER = os.getenv("KB_EMBEDDER", "gemini")
+KB_EMBEDDER_MODEL = os.getenv("KB_EMBEDDER_MODEL", "BAAI/bge-small-en-v1.5")
+KB_EMBEDDER_DIMENSIONS = int(os.getenv("KB_EMBEDDER_DIMENSIONS", "384"))
+KB_EMBEDDING_CACHE = os.getenv("KB_EMBEDDING_CACHE", "true").lower() in ("1", "true", "yes")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+embedding_cache = TieredCache("embeddings", max_memory_items=2048)
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """
+    Feature-hashing bag-of-words embedder (unigrams and bigrams, signed, L2-normalized).
+
+    Pure Python and deterministic: no model download, no network. Retrieval
+    quality is lexical only, so it is meant for offline use, tests and
+    benchmarks rather than production search.
+    """
+
+    id: str = "hashing-v1"
+    dimensions: int = KB_EMBEDDER_DIMENSIONS
+    enable_batch: bool = True
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        tokens = _TOKEN.findall(text.lower())
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self._embed(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self._embed(text), None
+
+    async def async_get_embeddings_batch_and_usage(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        return [self._embed(text) for text in texts], [None] * len(texts)
+
+
+# Loading a FastEmbed model takes seconds; concurrent first calls load it once
+_model_lock = threading.Lock()
+
+
+@dataclass
+class LocalEmbedder(Embedder):
+    """
+    FastEmbed (ONNX) model running on CPU. The model is loaded once and texts
+    are embedded in batches of `batch_size`. Needs `pip install fastembed`.
+    """
+
+    id: str = KB_EMBEDDER_MODEL
+    dimensions: int = KB_EMBEDDER_DIMENSIONS
+    enable_batch: bool = True
+    batch_size: int = 64
+    _model: Any = field(default=None, init=False, repr=False)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if self._model is None:
+            with _model_lock:
+                if self._model is None:
+                    try:
+                        from fastembed import TextEmbedding
+                    except ImportError as e:
+                        raise RuntimeError("KB_EMBEDDER=local needs the fastembed package: pip install fastembed") from e
+                    self._model = TextEmbedding(model_name=self.id)
+        return [[float(v) for v in vector] for vector in self._model.embed(texts, batch_size=self.batch_size)]
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embeddings_batch_and_usage([text]))[0][0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return await self.async_get_embedding(text), None
+
+    async def async_get_embeddings_batch_and_usage(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        # CPU-bound: keep the event loop free while the model runs
+        embeddings = await asyncio.to_thread(self._embed_batch, texts)
+        return embeddings, [None] * len(texts)
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """
+    Wraps another embedder with the persistent embedding cache.
+
+    Batch calls only send the texts that are not cached yet to the wrapped
+    embedder, in one batch.
+    """
+
+    embedder: Embedder = field(default_factory=HashingEmbedder)
+    cache: TieredCache = field(default_factory=lambda: embedding_cache)
+    hits: int = 0
+    misses: int = 0
+
+    def __post_init__(self):
+        self.dimensions = self.embedder.dimensions
+        self.enable_batch = self.embedder.enable_batch
+        self.batch_size = self.embedder.batch_size
+
+    @property
+    def model_id(self) -> str:
+        return f"{type(self.embedder).__name__}:{getattr(self.embedder, 'id', '')}"
+
+    def _key(self, text: str) -> str:
+        return cache_key(self.model_id, self.dimensions, hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+    def _lookup(self, text: str) -> Optional[List[float]]:
+        embedding = self.cache.get(self._key(text))
+        if embedding is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return embedding
+
+    def _store(self, text: str, embedding: List[float]) -> None:
+        # Never cache a failed (empty) embedding
+        if embedding:
+            self.cache.set(self._key(text), list(embedding))
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        cached = self._lookup(text)
+        if cached is not None:
+            return cached, None
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        self._store(text, embedding)
+        return embedding, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embedding_and_usage(text))[0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        cached = self._lookup(text)
+        if cached is not None:
+            return cached, None
+        embedding, usage = await self.embedder.async_get_embedding_and_usage(text)
+        self._store(text, embedding)
+        return embedding, usage
+
+    async def async_get_embeddings_batch_and_usage(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        embeddings: List[Optional[List[float]]] = [self._lookup(text) for text in texts]
+        usage: List[Optional[Dict]] = [None] * len(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fresh, fresh_usage = await self.embedder.async_get_embeddings_batch_and_usage([texts[i] for i in missing])
+            for i, embedding, item_usage in zip(missing, fresh, fresh_usage):
+                embeddings[i], usage[i] = embedding, item_usage
+                self._store(texts[i], embedding)
+        return embeddings, usage  # type: ignore[return-value]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model_id, "hits": self.hits, "misses": self.misses, **self.cache.stats()}
+
+
+def create_embedder(backend: str = KB_EMBEDDER, cached: bool = KB_EMBEDDING_CACHE) -> Embedder:
+    """Build the configured embedding backend, wrapped in the embedding cache."""
+    if backend == "gemini":
+        from agno.knowledge.embedder.google import GeminiEmbedder
+        embedder: Embedder = GeminiEmbedder()
+    elif backend == "local":
+        embedder = LocalEmbedder()
+    elif backend == "hashing":
+        embedder = HashingEmbedder()
+    else:
+        raise ValueError(f"Unknown KB_EMBEDDER '{backend}' (expected gemini, local or hashing)")
+    return CachedEmbedder(embedder=embedder) if cached else embedder
+
+
+def knowledge_table_name(backend: str = KB_EMBEDDER) -> str:
+    """Vector table for a backend; non-default backends get their own table since dimensions differ."""
+    return "civic_knowledge" if backend == "gemini" else f"civic_knowledge_{backend}"
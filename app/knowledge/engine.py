@@ -0,0 +1,140 @@
+"""
+Process-wide SQLAlchemy engine for the Civic Remediation database.
+
+Memory (PostgresDb) and knowledge (PgVector) share one engine and therefore
+one connection pool. Pool sizing is configured through the environment:
+
+    DB_POOL_SIZE       persistent connections kept open (default 5)
+    DB_MAX_OVERFLOW    extra connections allowed under burst (default 10)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE    seconds before a connection is recycled (default 1800)
+    DB_POOL_PRE_PING   test connections before use (default true)
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Database URL from environment or default
+DB_URL = os.getenv(
+    "DATABASE_URL",
+    "postgresql+psycopg://ai:ai@localhost:5532/ai"
+)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Counters for connection checkouts and time spent waiting on the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: Optional[QueuePool] = None) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+        if pool is not None:
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "idle": pool.checkedin(),
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Get the shared database engine, creating it (and its pool) on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                DB_URL,
+                poolclass=InstrumentedQueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING,
+            )
+            event.listen(_engine, "connect", lambda *_: pool_metrics.incr("connects"))
+            event.listen(_engine, "checkout", lambda *_: pool_metrics.incr("checkouts"))
+            event.listen(_engine, "checkin", lambda *_: pool_metrics.incr("checkins"))
+        return _engine
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Checkout/wait metrics plus the live state of the shared pool."""
+    pool = _engine.pool if _engine is not None else None
+    return pool_metrics.snapshot(pool if isinstance(pool, QueuePool) else None)
+
+
+def dispose_engine() -> None:
+    """
+    Close every pooled connection (e.g. on shutdown or after fork).
+    The engine stays usable and opens fresh connections on demand.
+    """
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
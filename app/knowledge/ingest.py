@@ -0,0 +1,506 @@
+"""
+Bulk ingestion of documents (reports, PDFs, web pages) into the civic knowledge base.
+
+Sources are fetched and parsed by a pool of workers. Each download is
+streamed to a spooled temporary file (in memory up to KB_INGEST_SPOOL_BYTES,
+on disk beyond), hashed on the way, and parsed a page/block at a time into
+fixed-size chunks. Chunks go through a bounded queue to writer threads that
+embed them in batches and store each batch with one multi-row upsert
+(`write_documents`), so memory stays bounded however large the document.
+
+A source whose content hash matches the stored one is skipped without being
+parsed or embedded. A new or changed source is written as pending chunks
+next to its stored ones; once every chunk is written it is committed (the
+old chunks are deleted and the new hash becomes the stored one). If parsing
+or any write fails, the pending chunks are deleted and the stored version
+stays, so the source is retried on the next run. `--force` re-parses
+unchanged sources too: their pending chunks get fresh ids for the run, so
+they replace the stored ones the same way. Chunks whose text did not change
+are served from the embedding cache rather than re-embedded.
+
+Pending chunks are left out of `search_knowledge` (app.knowledge.admin), but
+agno's own knowledge search can return them while their source is in flight.
+
+Usage:
+    uv run python -m app.knowledge.ingest urls.txt
+    uv run python -m app.knowledge.ingest https://example.gov/report.pdf ./reports/budget.pdf --force
+
+Configuration (environment):
+    KB_INGEST_WORKERS         sources fetched and parsed at once (default 8)
+    KB_INGEST_WRITERS         batches embedded and written at once (default 2)
+    KB_INGEST_BATCH_SIZE      chunks per embed/write batch (default 64)
+    KB_INGEST_QUEUE_SIZE      parsed chunks waiting for a writer before parsers block (default 512)
+    KB_INGEST_CHUNK_SIZE      characters per chunk (default 2000)
+    KB_INGEST_CHUNK_OVERLAP   characters repeated between consecutive chunks (default 200)
+    KB_INGEST_SPOOL_BYTES     download size kept in memory before spilling to disk (default 8 MB)
+    KB_INGEST_TIMEOUT         seconds per HTTP request (default 60)
+    KB_INGEST_PROGRESS_EVERY  seconds between progress lines (default 10)
+"""
+import argparse
+import codecs
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+from sqlalchemy import String, and_, delete, literal, not_, select, update
+from sqlalchemy.dialects import postgresql
+
+from app.knowledge.writer import write_documents
+from app.utils.cache import cache_key
+
+KB_INGEST_WORKERS = int(os.getenv("KB_INGEST_WORKERS", "8"))
+KB_INGEST_WRITERS = int(os.getenv("KB_INGEST_WRITERS", "2"))
+KB_INGEST_BATCH_SIZE = int(os.getenv("KB_INGEST_BATCH_SIZE", "64"))
+KB_INGEST_QUEUE_SIZE = int(os.getenv("KB_INGEST_QUEUE_SIZE", "512"))
+KB_INGEST_CHUNK_SIZE = int(os.getenv("KB_INGEST_CHUNK_SIZE", "2000"))
+KB_INGEST_CHUNK_OVERLAP = int(os.getenv("KB_INGEST_CHUNK_OVERLAP", "200"))
+KB_INGEST_SPOOL_BYTES = int(os.getenv("KB_INGEST_SPOOL_BYTES", str(8 * 1024 * 1024)))
+KB_INGEST_TIMEOUT = float(os.getenv("KB_INGEST_TIMEOUT", "60"))
+KB_INGEST_PROGRESS_EVERY = float(os.getenv("KB_INGEST_PROGRESS_EVERY", "10"))
+
+_READ_BLOCK = 64 * 1024
+_STOP = object()
+
+
+def chunk_stream(pieces: Iterable[str], chunk_size: int = KB_INGEST_CHUNK_SIZE, overlap: int = KB_INGEST_CHUNK_OVERLAP) -> Iterator[str]:
+    """
+    Split a stream of text pieces into chunks of at most `chunk_size` characters.
+
+    Whitespace is collapsed and chunks end on a word boundary where possible.
+    Only the current chunk is held in memory, never the whole text.
+    """
+    if overlap >= chunk_size:
+        raise ValueError(f"Chunk overlap ({overlap}) must be less than chunk size ({chunk_size})")
+    buffer = ""
+    for piece in pieces:
+        words = " ".join(piece.split())
+        if not words:
+            continue
+        buffer = f"{buffer} {words}" if buffer else words
+        while len(buffer) > chunk_size:
+            end = buffer.rfind(" ", 0, chunk_size + 1)
+            if end <= overlap:
+                end = chunk_size  # One very long word: split it
+            yield buffer[:end].strip()
+            start = max(end - overlap, 1)
+            # Start the overlap on a word boundary too
+            boundary = buffer.find(" ", start, end)
+            buffer = buffer[boundary + 1 if overlap and boundary != -1 else end:].lstrip()
+    if buffer:
+        yield buffer
+
+
+class _HTMLText(HTMLParser):
+    """Collects the visible text of an HTML document as it is fed."""
+
+    _SKIP = {"script", "style", "noscript", "template", "svg"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def _text_blocks(file: IO[bytes], encoding: str) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while block := file.read(_READ_BLOCK):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def _html_blocks(file: IO[bytes], encoding: str) -> Iterator[str]:
+    parser = _HTMLText()
+    for text in _text_blocks(file, encoding):
+        parser.feed(text)
+        yield from parser.parts
+        parser.parts.clear()
+    parser.close()
+    yield from parser.parts
+
+
+def _pdf_pages(file: IO[bytes]) -> Iterator[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("PDF ingestion needs the pypdf package: uv sync --extra pdf") from e
+    # Pages are parsed lazily from the spooled file, one at a time
+    for page in PdfReader(file).pages:
+        yield page.extract_text() or ""
+
+
+def parse_blocks(file: IO[bytes], source: str, content_type: str = "") -> Iterator[str]:
+    """Text of a downloaded source, a page (PDF) or block (HTML, text) at a time."""
+    content_type = content_type.lower()
+    kind, _, params = content_type.partition(";")
+    encoding = params.split("charset=")[-1].strip() if "charset=" in params else "utf-8"
+    path = source.lower().split("?")[0]
+    if "pdf" in kind or path.endswith(".pdf"):
+        return _pdf_pages(file)
+    if "html" in kind or path.endswith((".html", ".htm")):
+        return _html_blocks(file, encoding)
+    return _text_blocks(file, encoding)
+
+
+@dataclass
+class IngestReport:
+    """Counters for one ingestion run; updated from worker threads."""
+
+    sources: int = 0
+    ingested: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    chunks: int = 0
+    failed_chunks: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+    errors: Dict[str, str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def seconds(self) -> float:
+        return time.monotonic() - self.started
+
+    def summary(self) -> str:
+        seconds = max(self.seconds, 1e-9)
+        done = self.ingested + self.unchanged + self.failed
+        return (
+            f"{done}/{self.sources} sources ({self.unchanged} unchanged, {self.failed} failed), "
+            f"{self.chunks} chunks ({self.failed_chunks} failed) in {self.seconds:.1f}s "
+            f"({self.chunks / seconds:.1f} chunks/s, {self.bytes / seconds / 1e6:.2f} MB/s)"
+        )
+
+
+class BulkIngestor:
+    """
+    Parallel fetch/parse -> streaming chunking -> batched embed and bulk write.
+
+    Args:
+        knowledge: Knowledge base to write to (default: the civic knowledge base)
+        workers: Sources fetched and parsed at once
+        writers: Batches embedded and written at once
+        batch_size: Chunks per embed/write batch
+        queue_size: Parsed chunks waiting for a writer before parsers block
+        chunk_size: Characters per chunk
+        overlap: Characters repeated between consecutive chunks
+        progress_every: Seconds between progress lines (0 = quiet)
+    """
+
+    def __init__(
+        self,
+        knowledge: Optional[Knowledge] = None,
+        workers: int = KB_INGEST_WORKERS,
+        writers: int = KB_INGEST_WRITERS,
+        batch_size: int = KB_INGEST_BATCH_SIZE,
+        queue_size: int = KB_INGEST_QUEUE_SIZE,
+        chunk_size: int = KB_INGEST_CHUNK_SIZE,
+        overlap: int = KB_INGEST_CHUNK_OVERLAP,
+        progress_every: float = KB_INGEST_PROGRESS_EVERY,
+    ):
+        self._knowledge = knowledge
+        self.workers = workers
+        self.writers = writers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.progress_every = progress_every
+
+    @property
+    def knowledge(self) -> Knowledge:
+        if self._knowledge is None:
+            from app.knowledge.base import get_civic_knowledge
+            self._knowledge = get_civic_knowledge()
+        return self._knowledge
+
+    # --- storage -----------------------------------------------------------
+
+    def stored_hashes(self, sources: List[str]) -> Dict[str, str]:
+        """Committed content hash of each source (one query for all of them)."""
+        vector_db = self.knowledge.vector_db
+        table = vector_db.table
+        if not vector_db.table_exists():
+            return {}
+        source = table.c.meta_data["source_url"].astext
+        with vector_db.Session() as session:
+            rows = session.execute(
+                select(source, table.c.meta_data["source_hash"].astext)
+                .where(source.in_(sources), not_(table.c.meta_data.has_key("pending")))
+                .distinct()
+            ).all()
+        return {url: source_hash for url, source_hash in rows}
+
+    def commit_source(self, source: str, source_hash: str) -> None:
+        """Replace the stored chunks of `source` with its pending `source_hash` chunks, in one transaction."""
+        vector_db = self.knowledge.vector_db
+        table = vector_db.table
+        meta = table.c.meta_data
+        of_source = meta["source_url"].astext == source
+        with vector_db.Session() as session:
+            session.execute(delete(table).where(of_source, not_(meta.has_key("pending"))))
+            session.execute(update(table).where(
+                of_source, meta["source_hash"].astext == source_hash, meta.has_key("pending"),
+            ).values(
+                meta_data=meta.op("-", return_type=postgresql.JSONB)(literal("pending", String)),
+            ))
+            session.commit()
+
+    def discard_source(self, source: str, source_hash: str) -> None:
+        """Delete the pending `source_hash` chunks of `source`, leaving its stored ones."""
+        vector_db = self.knowledge.vector_db
+        table = vector_db.table
+        meta = table.c.meta_data
+        with vector_db.Session() as session:
+            session.execute(delete(table).where(and_(
+                meta["source_url"].astext == source,
+                meta["source_hash"].astext == source_hash,
+                meta.has_key("pending"),
+            )))
+            session.commit()
+
+    def write(self, batch: List[Document]) -> None:
+        write_documents(batch, self.knowledge)
+
+    # --- fetching ----------------------------------------------------------
+
+    def fetch(self, source: str, client) -> Tuple[IO[bytes], str, str, int]:
+        """Stream `source` (URL or local path) into a spooled file; returns (file, sha256, content type, bytes)."""
+        spool = tempfile.SpooledTemporaryFile(max_size=KB_INGEST_SPOOL_BYTES)
+        digest = hashlib.sha256()
+        size = 0
+        content_type = ""
+        if source.startswith(("http://", "https://")):
+            with client.stream("GET", source) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                for block in response.iter_bytes(_READ_BLOCK):
+                    digest.update(block)
+                    spool.write(block)
+                    size += len(block)
+        else:
+            with open(source, "rb") as file:
+                while block := file.read(_READ_BLOCK):
+                    digest.update(block)
+                    spool.write(block)
+                    size += len(block)
+        spool.seek(0)
+        return spool, digest.hexdigest(), content_type, size
+
+    def _ingest_source(self, source: str, stored: Dict[str, str], force: bool, client, chunks: queue.Queue, report: IngestReport) -> None:
+        try:
+            spool, source_hash, content_type, size = self.fetch(source, client)
+        except Exception as e:
+            report.add(failed=1)
+            report.errors[source] = str(e)
+            print(f"[KB] Warning: Failed to fetch {source}: {e}")
+            return
+        with spool:
+            report.add(bytes=size)
+            if not force and stored.get(source) == source_hash:
+                report.add(unchanged=1)
+                return
+            pending = _PendingSource(source, source_hash)
+            # Forced: new ids for this run, so the chunks are written next to the stored ones
+            run = os.urandom(8).hex() if force else ""
+            try:
+                name = os.path.basename(source.split("?")[0].rstrip("/")) or source
+                for number, text in enumerate(chunk_stream(parse_blocks(spool, source, content_type), self.chunk_size, self.overlap), 1):
+                    # The hash is part of the key so new chunks never overwrite the stored version
+                    key = cache_key(source, source_hash, run, text) if run else cache_key(source, source_hash, text)
+                    pending.add()
+                    chunks.put((pending, Document(
+                        id=key,
+                        name=name,
+                        content=text,
+                        meta_data={
+                            "type": "document",
+                            "source_url": source,
+                            "source_hash": source_hash,
+                            "chunk": number,
+                            "content_hash": key,
+                            "pending": True,
+                        },
+                    )))
+            except Exception as e:
+                pending.error = f"parse failed: {e}"
+                print(f"[KB] Warning: Failed to parse {source}: {e}")
+            self._settle(pending, report, parsed=True)
+
+    def _settle(self, pending: "_PendingSource", report: IngestReport, parsed: bool = False, written: int = 0, failed: int = 0) -> None:
+        """Count chunks done; once all of a source's chunks are, commit it or discard what was written."""
+        if not pending.done(parsed, written, failed):
+            return
+        if pending.error is None:
+            try:
+                self.commit_source(pending.source, pending.source_hash)
+                report.add(ingested=1)
+                return
+            except Exception as e:
+                pending.error = f"commit failed: {e}"
+        report.add(failed=1)
+        report.errors[pending.source] = pending.error
+        try:
+            self.discard_source(pending.source, pending.source_hash)
+        except Exception as e:
+            print(f"[KB] Warning: Failed to discard partial chunks of {pending.source}: {e}")
+
+    # --- writing -----------------------------------------------------------
+
+    def _write_loop(self, chunks: queue.Queue, report: IngestReport, progress: "_Progress") -> None:
+        while True:
+            item = chunks.get()
+            if item is _STOP:
+                chunks.put(_STOP)  # Pass it on to the other writers
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = chunks.get(timeout=0.5)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    chunks.put(_STOP)  # Write this batch first, then stop
+                    break
+                batch.append(item)
+            sources: Dict[_PendingSource, int] = {}
+            for pending, _ in batch:
+                sources[pending] = sources.get(pending, 0) + 1
+            try:
+                self.write([doc for _, doc in batch])
+                report.add(chunks=len(batch))
+                outcome = "written"
+            except Exception as e:
+                report.add(failed_chunks=len(batch))
+                for pending in sources:
+                    pending.error = pending.error or f"write failed: {e}"
+                print(f"[KB] Warning: Failed to write {len(batch)} chunks: {e}")
+                outcome = "failed"
+            for pending, count in sources.items():
+                self._settle(pending, report, **{outcome: count})
+            progress.tick(report)
+
+    def run(self, sources: Iterable[str], force: bool = False) -> IngestReport:
+        """Ingest `sources` (URLs or file paths); `force` re-ingests unchanged ones too."""
+        import httpx
+
+        sources = list(dict.fromkeys(s.strip() for s in sources if s.strip()))
+        report = IngestReport(sources=len(sources))
+        if not sources:
+            return report
+        stored = {} if force else self.stored_hashes(sources)
+        chunks: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        progress = _Progress(self.progress_every)
+
+        writers = [
+            threading.Thread(target=self._write_loop, args=(chunks, report, progress), name=f"kb-ingest-writer-{i}", daemon=True)
+            for i in range(self.writers)
+        ]
+        for thread in writers:
+            thread.start()
+        with httpx.Client(follow_redirects=True, timeout=KB_INGEST_TIMEOUT) as client:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kb-ingest") as pool:
+                for source in sources:
+                    pool.submit(self._ingest_source, source, stored, force, client, chunks, report)
+        chunks.put(_STOP)
+        for thread in writers:
+            thread.join()
+        if self.progress_every:
+            print(f"[KB] Ingest done: {report.summary()}")
+        return report
+
+
+class _PendingSource:
+    """Chunks of one source queued and written so far; `done` is true exactly once, when all are accounted for."""
+
+    def __init__(self, source: str, source_hash: str):
+        self.source = source
+        self.source_hash = source_hash
+        self.error: Optional[str] = None
+        self._queued = self._finished = 0
+        self._parsed = self._settled = False
+        self._lock = threading.Lock()
+
+    def add(self) -> None:
+        with self._lock:
+            self._queued += 1
+
+    def done(self, parsed: bool = False, written: int = 0, failed: int = 0) -> bool:
+        with self._lock:
+            self._parsed = self._parsed or parsed
+            self._finished += written + failed
+            if self._settled or not self._parsed or self._finished < self._queued:
+                return False
+            self._settled = True
+            return True
+
+
+class _Progress:
+    """Prints the report at most every `every` seconds."""
+
+    def __init__(self, every: float):
+        self.every = every
+        self._next = time.monotonic() + every
+        self._lock = threading.Lock()
+
+    def tick(self, report: IngestReport) -> None:
+        if not self.every:
+            return
+        with self._lock:
+            if time.monotonic() < self._next:
+                return
+            self._next = time.monotonic() + self.every
+        print(f"[KB] Ingest: {report.summary()}")
+
+
+def ingest_sources(sources: Iterable[str], force: bool = False, knowledge: Optional[Knowledge] = None, **options) -> IngestReport:
+    """Bulk-ingest URLs or file paths into the knowledge base (see `BulkIngestor`)."""
+    return BulkIngestor(knowledge, **options).run(sources, force=force)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-load documents into the civic knowledge base.")
+    parser.add_argument("sources", nargs="+", help="URLs, file paths, or .txt files listing one source per line")
+    parser.add_argument("--force", action="store_true", help="Re-ingest sources whose content has not changed")
+    parser.add_argument("--workers", type=int, default=KB_INGEST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=KB_INGEST_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    sources: List[str] = []
+    for source in args.sources:
+        if source.endswith(".txt") and os.path.isfile(source):
+            with open(source) as listing:
+                sources.extend(line.strip() for line in listing if line.strip() and not line.startswith("#"))
+        else:
+            sources.append(source)
+    report = ingest_sources(sources, force=args.force, workers=args.workers, batch_size=args.batch_size)
+    for source, error in report.errors.items():
+        print(f"  {source}: {error}")
+
+
+if __name__ == "__main__":
+    main()
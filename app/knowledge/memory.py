@@ -1,22 +1,309 @@
 """
 Shared Database Configuration for Civic Remediation Agents.
 All agents connect to the same PostgreSQL database for persistent memory.
+
+Memories are owned per tenant, project and user (see app.tenancy), and what
+a run reads stays bounded however long an owner's history grows:
+
+- Agents and team leaders load only the owner's MEMORY_CONTEXT_LIMIT most
+  recently updated memories (`CivicMemoryManager`), through the
+  (owner, recency) index, both into their context and for memory updates.
+- Once an owner holds more than MEMORY_MAX_PER_OWNER memories, the oldest
+  are folded into one summary memory so MEMORY_CONTEXT_LIMIT remain.
+  Memories not updated for MEMORY_RETENTION_DAYS are deleted by the
+  `retention` command.
+
+Memories and sessions stored before scoping are owned by a bare user id
+(such as "civic-system"); `migrate-owners` moves them to that user in the
+default tenant and project, where scoped runs look for them.
+
+Usage:
+    uv run python -m app.knowledge.memory create-indexes
+    uv run python -m app.knowledge.memory migrate-owners --dry-run
+    uv run python -m app.knowledge.memory stats --tenant acme
+    uv run python -m app.knowledge.memory retention --tenant acme --project ganga --dry-run
+
+Configuration (environment):
+    MEMORY_CONTEXT_LIMIT    memories loaded per run for an owner (default 20)
+    MEMORY_MAX_PER_OWNER    memories stored per owner before the oldest are summarized (default 100)
+    MEMORY_RETENTION_DAYS   days a memory is kept without updates, 0 keeps them (default 0)
 """
+import argparse
 import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
 from agno.db.postgres import PostgresDb
+from agno.db.schemas import UserMemory
+from agno.memory import MemoryManager
+
+from app.knowledge.engine import DB_URL, get_engine
+
+MEMORY_CONTEXT_LIMIT = int(os.getenv("MEMORY_CONTEXT_LIMIT", "20"))
+MEMORY_MAX_PER_OWNER = int(os.getenv("MEMORY_MAX_PER_OWNER", "100"))
+MEMORY_RETENTION_DAYS = float(os.getenv("MEMORY_RETENTION_DAYS", "0"))
+
+_shared_db: Optional[PostgresDb] = None
+_shared_db_lock = threading.Lock()
+# Owners whose retention is being applied (summarizing calls the model)
+_retaining: set = set()
+_retaining_lock = threading.Lock()
 
-# Database URL from environment or default
-DB_URL = os.getenv(
-    "DATABASE_URL",
-    "postgresql+psycopg://ai:ai@localhost:5532/ai"
-)
 
 def get_shared_db() -> PostgresDb:
     """
     Get a shared database instance for agents.
     All agents using the same DB will share memories and sessions.
+
+    One PostgresDb is created per process on top of the shared engine,
+    so every agent and team draws from the same connection pool.
+    """
+    global _shared_db
+    with _shared_db_lock:
+        if _shared_db is None:
+            _shared_db = PostgresDb(
+                db_engine=get_engine(),
+                memory_table="civic_memories",
+            )
+        return _shared_db
+
+
+def recent_memories(db: Any, user_id: str, limit: int = MEMORY_CONTEXT_LIMIT) -> List[UserMemory]:
+    """The owner's `limit` most recently updated memories, oldest first."""
+    memories = db.get_user_memories(user_id=user_id, limit=limit or None, sort_by="updated_at", sort_order="desc")
+    return list(reversed(memories))
+
+
+def memory_count(db: Any, user_id: str) -> int:
+    _, total = db.get_user_memories(user_id=user_id, limit=1, deserialize=False)
+    return total
+
+
+def _last_updated(memory: UserMemory) -> int:
+    return memory.updated_at or memory.created_at or 0
+
+
+def apply_memory_retention(
+    db: Any,
+    user_id: str,
+    keep: int = MEMORY_CONTEXT_LIMIT,
+    max_memories: int = MEMORY_MAX_PER_OWNER,
+    max_age_days: float = MEMORY_RETENTION_DAYS,
+    summarize: Optional[Callable[[List[UserMemory]], UserMemory]] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Enforce the retention policy for one memory owner.
+
+    Memories not updated for `max_age_days` are deleted. If more than
+    `max_memories` remain, the oldest are replaced by `summarize(oldest)`
+    (or just deleted without a summarizer) so that `keep` memories are left.
+    Returns counts of memories expired, summarized and written.
+    """
+    memories = sorted(db.get_user_memories(user_id=user_id), key=_last_updated)
+    expired: List[UserMemory] = []
+    if max_age_days:
+        cutoff = time.time() - max_age_days * 86400
+        expired = [memory for memory in memories if _last_updated(memory) < cutoff]
+        memories = memories[len(expired):]
+
+    folded: List[UserMemory] = []
+    summary = None
+    if max_memories and len(memories) > max_memories:
+        folded = memories[:len(memories) - keep + (1 if summarize else 0)]
+        if summarize is not None and not dry_run:
+            summary = summarize(folded)
+
+    counts = {"expired": len(expired), "summarized": len(folded), "written": int(summary is not None)}
+    if dry_run or not (expired or folded):
+        return counts
+    if summary is not None:
+        db.upsert_user_memory(summary)
+    db.delete_user_memories([memory.memory_id for memory in expired + folded], user_id=user_id)
+    return counts
+
+
+class CivicMemoryManager(MemoryManager):
+    """
+    MemoryManager that reads only an owner's most recent memories and keeps
+    the owner's stored memories under MEMORY_MAX_PER_OWNER by summarizing
+    the oldest with the manager's model.
+    """
+
+    context_limit: int = MEMORY_CONTEXT_LIMIT
+    max_memories: int = MEMORY_MAX_PER_OWNER
+
+    def read_from_db(self, user_id: Optional[str] = None):
+        if self.db is None or user_id is None:
+            return super().read_from_db(user_id)
+        return {user_id: recent_memories(self.db, user_id, self.context_limit)}
+
+    async def aread_from_db(self, user_id: Optional[str] = None):
+        from agno.db.base import AsyncBaseDb
+
+        if isinstance(self.db, AsyncBaseDb):
+            return await super().aread_from_db(user_id)
+        return self.read_from_db(user_id)
+
+    def summarize(self, memories: List[UserMemory]) -> UserMemory:
+        from agno.memory.strategies.summarize import SummarizeStrategy
+
+        return SummarizeStrategy().optimize(memories=memories, model=self.get_model())[0]
+
+    def create_user_memories(self, *args: Any, user_id: Optional[str] = None, **kwargs: Any) -> str:
+        response = super().create_user_memories(*args, user_id=user_id, **kwargs)
+        if self.db is None or user_id is None or not self.max_memories:
+            return response
+        with _retaining_lock:
+            if user_id in _retaining:
+                return response  # Another write for this owner is applying it already
+            _retaining.add(user_id)
+        try:
+            if memory_count(self.db, user_id) > self.max_memories:
+                apply_memory_retention(
+                    self.db, user_id, self.context_limit, self.max_memories, 0, summarize=self.summarize,
+                )
+        except Exception as e:
+            print(f"Warning: Memory retention failed for '{user_id}': {e}")
+        finally:
+            with _retaining_lock:
+                _retaining.discard(user_id)
+        return response
+
+
+def create_memory_manager() -> CivicMemoryManager:
+    """A memory manager for one agent or team; the agent supplies its db and model."""
+    return CivicMemoryManager()
+
+
+def memory_index_sql(db: PostgresDb) -> List[str]:
+    """
+    Indexes behind scoped memory and session access: newest memories per owner
+    (the per-run read, ordered by `updated_at`), and owner/session prefixes
+    (per tenant or project).
+    """
+    memories = f'"{db.db_schema}"."{db.memory_table_name}"'
+    sessions = f'"{db.db_schema}"."{db.session_table_name}"'
+    return [
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{db.memory_table_name}_owner_recent_idx" '
+        f"ON {memories} (user_id, updated_at DESC)",
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{db.memory_table_name}_owner_prefix_idx" '
+        f"ON {memories} (user_id text_pattern_ops)",
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{db.session_table_name}_owner_prefix_idx" '
+        f"ON {sessions} (user_id text_pattern_ops)",
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{db.session_table_name}_session_prefix_idx" '
+        f"ON {sessions} (session_id text_pattern_ops)",
+    ]
+
+
+def create_memory_indexes(db: Optional[PostgresDb] = None) -> None:
+    """Create the memory and session tables if needed, then their scoping indexes."""
+    from sqlalchemy import text
+
+    db = db or get_shared_db()
+    db._get_table(table_type="memories", create_table_if_not_found=True)
+    db._get_table(table_type="sessions", create_table_if_not_found=True)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with db.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in memory_index_sql(db):
+            conn.execute(text(statement))
+
+
+def migrate_legacy_owners(dry_run: bool = False, db: Optional[PostgresDb] = None) -> Dict[str, int]:
+    """
+    Move memories and sessions of unscoped owners to the default tenant and
+    project (as `Scope.from_user_id` reads them). Returns rows moved per table.
     """
-    return PostgresDb(
-        db_url=DB_URL,
-        memory_table="civic_memories",
-    )
+    from sqlalchemy import func, literal, select, update
+
+    from app.tenancy import Scope
+
+    db = db or get_shared_db()
+    prefix = Scope().prefix
+    tables = {table_type: db._get_table(table_type=table_type) for table_type in ("memories", "sessions")}
+    moved: Dict[str, int] = {}
+    with db.Session() as session:
+        for table_type, table in tables.items():
+            if table is None:
+                moved[table_type] = 0
+                continue
+            unscoped = (table.c.user_id.is_not(None), ~table.c.user_id.contains(":", autoescape=True))
+            if dry_run:
+                moved[table_type] = session.execute(select(func.count()).select_from(table).where(*unscoped)).scalar()
+            else:
+                moved[table_type] = session.execute(
+                    update(table).where(*unscoped).values(user_id=literal(prefix) + table.c.user_id)
+                ).rowcount
+        session.commit()
+    return moved
+
+
+def memory_owners(prefix: str = "", min_count: int = 0, db: Optional[PostgresDb] = None) -> Dict[str, int]:
+    """Memory count per owner whose id starts with `prefix` (see app.tenancy.tenant_prefix)."""
+    from sqlalchemy import func, select
+
+    db = db or get_shared_db()
+    table = db._get_table(table_type="memories")
+    if table is None:
+        return {}
+    count = func.count()
+    stmt = select(table.c.user_id, count).where(table.c.user_id.startswith(prefix, autoescape=True))
+    stmt = stmt.group_by(table.c.user_id).having(count > min_count).order_by(table.c.user_id)
+    with db.Session() as session:
+        return {user_id: total for user_id, total in session.execute(stmt).all()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.tenancy import tenant_prefix
+
+    parser = argparse.ArgumentParser(description="Scoped agent memory administration.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create-indexes", help="Create the owner and session prefix indexes")
+    migrate = commands.add_parser("migrate-owners", help="Move unscoped owners to the default tenant and project")
+    migrate.add_argument("--dry-run", action="store_true", help="Count the rows without moving them")
+    for command in ("stats", "retention"):
+        sub = commands.add_parser(command, help="Memories per owner" if command == "stats" else "Apply the retention policy")
+        sub.add_argument("--tenant", help="Only owners of this tenant")
+        sub.add_argument("--project", help="Only owners of this project (needs --tenant)")
+    retention = commands.choices["retention"]
+    retention.add_argument("--max-age-days", type=float, default=MEMORY_RETENTION_DAYS)
+    retention.add_argument("--no-summary", action="store_true", help="Delete overflow instead of summarizing it")
+    retention.add_argument("--dry-run", action="store_true", help="Report what would change without changing anything")
+    args = parser.parse_args(argv)
+
+    if args.command == "create-indexes":
+        create_memory_indexes()
+        print("[Memory] Owner and session indexes ready")
+        return
+
+    if args.command == "migrate-owners":
+        moved = migrate_legacy_owners(dry_run=args.dry_run)
+        action = "would move" if args.dry_run else "moved"
+        print(f"[Memory] {action} {moved['memories']} memories and {moved['sessions']} sessions to the default scope")
+        return
+
+    prefix = tenant_prefix(args.tenant, args.project) if args.tenant else ""
+    if args.command == "stats":
+        for owner, total in memory_owners(prefix).items():
+            print(f"{owner}\t{total}")
+        return
+
+    from app.llm import create_routed_model
+
+    db = get_shared_db()
+    manager = CivicMemoryManager(model=create_routed_model("memory"), db=db)
+    min_count = 0 if args.max_age_days else MEMORY_MAX_PER_OWNER
+    for owner in memory_owners(prefix, min_count=min_count, db=db):
+        counts = apply_memory_retention(
+            db, owner,
+            max_age_days=args.max_age_days,
+            summarize=None if args.no_summary else manager.summarize,
+            dry_run=args.dry_run,
+        )
+        action = "would fold" if args.dry_run else "folded"
+        print(f"[Memory] {owner}: {counts['expired']} expired, {action} {counts['summarized']} into a summary")
+
+
+if __name__ == "__main__":
+    main()
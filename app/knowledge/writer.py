@@ -0,0 +1,305 @@
+"""
+Write-behind persistence for the civic knowledge base.
+
+`persist_agent_findings` only enqueues a Document and returns. A background
+thread groups queued documents into batches (by size or by age), drops the
+ones whose content hash is already stored, embeds the rest with one embedder
+call and upserts them with a single multi-row statement.
+Pending writes are flushed on shutdown (atexit and the API lifespan).
+
+Configuration (environment):
+    KB_WRITE_BATCH_SIZE   documents per batch (default 32)
+    KB_WRITE_MAX_DELAY    seconds a document waits for its batch to fill (default 2)
+    KB_WRITE_QUEUE_SIZE   pending documents before callers block (default 1000)
+"""
+import asyncio
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from hashlib import md5
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+from sqlalchemy import Integer, func, or_, select, update
+from sqlalchemy.dialects import postgresql
+
+from app.telemetry import traced
+
+KB_WRITE_BATCH_SIZE = int(os.getenv("KB_WRITE_BATCH_SIZE", "32"))
+KB_WRITE_MAX_DELAY = float(os.getenv("KB_WRITE_MAX_DELAY", "2"))
+KB_WRITE_QUEUE_SIZE = int(os.getenv("KB_WRITE_QUEUE_SIZE", "1000"))
+
+_STOP = object()
+_FLUSH = object()  # Wakes the writer so a partly filled batch is written now
+
+
+def embed_documents(embedder: Any, documents: List[Document]) -> None:
+    """Embed documents in place, with one batch call when the embedder supports it."""
+    texts = [doc.content for doc in documents]
+    try:
+        embeddings, usage = asyncio.run(embedder.async_get_embeddings_batch_and_usage(texts))
+    except (AttributeError, NotImplementedError):
+        embeddings, usage = zip(*(embedder.get_embedding_and_usage(text) for text in texts))
+    for doc, embedding, doc_usage in zip(documents, embeddings, usage):
+        doc.embedding, doc.usage = embedding, doc_usage
+
+
+def document_hash(doc: Document) -> str:
+    """The document's content hash: `meta_data["content_hash"]` if set, else md5 of its content."""
+    return (doc.meta_data or {}).get("content_hash") or md5(doc.content.encode()).hexdigest()
+
+
+def dedupe_documents(documents: List[Document]) -> Dict[str, Tuple[Document, int]]:
+    """Latest document and number of occurrences per content hash, in first-seen order."""
+    unique: Dict[str, Tuple[Document, int]] = {}
+    for doc in documents:
+        key = document_hash(doc)
+        count = unique[key][1] if key in unique else 0
+        unique[key] = (doc, count + 1)
+    return unique
+
+
+def _counted(doc: Document) -> bool:
+    """Repeats are counted for findings; ingested document chunks are just already stored."""
+    return (doc.meta_data or {}).get("type") != "document"
+
+
+@traced("db")
+def write_documents(documents: List[Document], knowledge: Optional[Knowledge] = None) -> None:
+    """
+    Store a batch of documents, deduplicated by content hash.
+
+    Hashes already in the table are not embedded again; their `timestamp` and
+    `seen_count` metadata are bumped instead (not for ingested `document`
+    chunks, which are left as they are). So are hashes that compaction
+    merged into another document (listed in its `merged_ids`): the bump goes
+    to that survivor. New documents are embedded in bulk and upserted (keyed
+    by hash) with one multi-row statement.
+    """
+    if knowledge is None:
+        from app.knowledge.base import get_civic_knowledge
+        knowledge = get_civic_knowledge()
+    vector_db = knowledge.vector_db
+    table = vector_db.table
+    _ensure_table(vector_db)
+
+    unique = dedupe_documents(documents)
+    with vector_db.Session() as session:
+        # Incoming hash -> hash of the stored document it is a repeat of
+        merged_ids = table.c.meta_data["merged_ids"]
+        survivors: Dict[str, str] = {}
+        for stored, merged in session.execute(
+            select(table.c.content_hash, merged_ids).where(or_(
+                table.c.content_hash.in_(list(unique)),
+                merged_ids.has_any(postgresql.array(list(unique))),
+            ))
+        ).all():
+            for key in merged or []:
+                if key in unique:
+                    survivors.setdefault(key, stored)
+            if stored in unique:
+                survivors[stored] = stored
+        existing = set(survivors)
+
+        new_docs = [doc for key, (doc, _) in unique.items() if key not in existing]
+        if new_docs:
+            embed_documents(vector_db.embedder, new_docs)
+            records = []
+            for key, (doc, count) in unique.items():
+                if key in existing:
+                    continue
+                meta_data = dict(doc.meta_data or {})
+                if count > 1 and _counted(doc):
+                    meta_data["seen_count"] = meta_data.get("seen_count", 1) + count - 1
+                records.append({
+                    "id": doc.id or key,
+                    "name": doc.name,
+                    "meta_data": meta_data,
+                    "filters": None,
+                    "content": vector_db._clean_content(doc.content),
+                    "embedding": doc.embedding,
+                    "usage": doc.usage,
+                    "content_hash": key,
+                    "content_id": doc.content_id,
+                })
+            insert = postgresql.insert(table).values(records)
+            # Another process may have stored the same hash since the lookup: merge into
+            # its metadata, keeping its first_seen and adding up the counts (as below)
+            stored_count = func.coalesce(table.c.meta_data["seen_count"].astext.cast(Integer), 1)
+            new_count = func.coalesce(insert.excluded.meta_data["seen_count"].astext.cast(Integer), 1)
+            session.execute(insert.on_conflict_do_update(
+                index_elements=[table.c.id],
+                set_={
+                    "meta_data": table.c.meta_data.op("||")(insert.excluded.meta_data).op("||")(
+                        func.jsonb_strip_nulls(func.jsonb_build_object(
+                            "seen_count", stored_count + new_count,
+                            "first_seen", func.coalesce(
+                                table.c.meta_data["first_seen"], insert.excluded.meta_data["first_seen"],
+                            ),
+                        ))
+                    ),
+                    "updated_at": func.now(),
+                },
+            ))
+
+        # One UPDATE per distinct repeat count (usually just one)
+        counts: Dict[str, int] = {}
+        for key, stored in survivors.items():
+            if _counted(unique[key][0]):
+                counts[stored] = counts.get(stored, 0) + unique[key][1]
+        repeats: Dict[int, List[str]] = {}
+        for stored, count in counts.items():
+            repeats.setdefault(count, []).append(stored)
+        timestamp = datetime.now().isoformat()
+        for count, keys in repeats.items():
+            seen_count = func.coalesce(table.c.meta_data["seen_count"].astext.cast(Integer), 1) + count
+            session.execute(
+                update(table)
+                .where(table.c.content_hash.in_(keys))
+                .values(meta_data=table.c.meta_data.op("||")(
+                    func.jsonb_build_object("timestamp", timestamp, "seen_count", seen_count)
+                ))
+            )
+        session.commit()
+
+
+_created_tables = set()
+_created_tables_lock = threading.Lock()
+
+
+def _ensure_table(vector_db: Any) -> None:
+    with _created_tables_lock:
+        if vector_db.table_name not in _created_tables:
+            vector_db.create()
+            _created_tables.add(vector_db.table_name)
+
+
+class WriteBehindQueue:
+    """
+    Hands items to `sink` in batches from a background thread.
+
+    A batch is written once it has `batch_size` items or its oldest item has
+    waited `max_delay` seconds, whichever comes first. A failed batch is
+    reported and dropped so one bad write never blocks the queue.
+
+    Args:
+        sink: Called with each batch (a list of items)
+        batch_size: Maximum items per batch
+        max_delay: Seconds the first item of a batch waits for more to arrive
+        max_pending: Queue capacity; `submit` blocks while it is full
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[Any]], None],
+        batch_size: int = KB_WRITE_BATCH_SIZE,
+        max_delay: float = KB_WRITE_MAX_DELAY,
+        max_pending: int = KB_WRITE_QUEUE_SIZE,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._flush_now = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches_written = 0
+        self.items_written = 0
+        self.items_failed = 0
+
+    def submit(self, item: Any) -> None:
+        """Queue an item for the next batch (starts the writer thread on first use)."""
+        self._start()
+        with self._idle:
+            self._pending += 1
+        self._queue.put(item)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; returns False if `timeout` ran out first."""
+        with self._idle:
+            if self._pending == 0:
+                return True
+            self._flush_now.set()
+        # Outside the lock: a full queue must not block the writer's bookkeeping
+        self._queue.put(_FLUSH)
+        with self._idle:
+            done = self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+            self._flush_now.clear()
+            return done
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        """Flush pending writes and stop the writer thread."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending,
+            "batches_written": self.batches_written,
+            "items_written": self.items_written,
+            "items_failed": self.items_failed,
+        }
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kb-write-behind", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> Optional[List[Any]]:
+        """Block for the first item, then gather more until the batch is full or due."""
+        item = self._queue.get()
+        while item is _FLUSH:
+            item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._flush_now.is_set() else deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FLUSH:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # Stop after this batch is written
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.sink(batch)
+                self.batches_written += 1
+                self.items_written += len(batch)
+            except Exception as e:
+                self.items_failed += len(batch)
+                print(f"[KB] Warning: Failed to write {len(batch)} documents: {e}")
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+
+findings_writer = WriteBehindQueue(write_documents)
+atexit.register(findings_writer.close)
+
+
+def flush_findings(timeout: Optional[float] = None) -> bool:
+    """Block until every queued finding has been written (or `timeout` runs out)."""
+    return findings_writer.flush(timeout)
@@ -0,0 +1,34 @@
+"""
+LLM module for Civic Remediation System.
+Provides the model client shared by agents and the team, with response caching,
+per-stage model routing, a context budget and live token streaming.
+
+Names are imported on first use (the OpenAI client stack is only loaded when
+a model is built or called).
+"""
+from app.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "CivicModel": "app.llm.model",
+    "create_model": "app.llm.model",
+    "create_routed_model": "app.llm.model",
+    "ModelRoute": "app.llm.routing",
+    "route_model": "app.llm.routing",
+    "POLLINATIONS_BASE_URL": "app.llm.model",
+    "DEFAULT_MODEL": "app.llm.model",
+    "response_cache": "app.llm.cache",
+    "no_response_cache": "app.llm.cache",
+    "stage_cache_ttl": "app.llm.cache",
+    "llm_stats": "app.llm.resilience",
+    "call_with_resilience": "app.llm.resilience",
+    "CircuitOpenError": "app.llm.resilience",
+    "DeadlineExceeded": "app.llm.resilience",
+    "apply_context_budget": "app.llm.budget",
+    "context_budget_stats": "app.llm.budget",
+    "listen_tokens": "app.llm.stream",
+    "token_listener": "app.llm.stream",
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,385 @@
+"""
+Context budget for model calls.
+
+Agno adds four kinds of context to team and member prompts on its own: the
+team's earlier runs (<team_history_context>), what other members already
+reported (<member_interaction_context>), the owner's memories
+(<memories_from_previous_interactions>) and knowledge-base documents
+(<references>, and search_knowledge_base tool results). None of them is
+bounded, so a long team run can spend most of every member call on them.
+Every `CivicModel` call passes its messages through `apply_context_budget`:
+    - the tokens of each source are counted (estimated at CONTEXT_TOKEN_CHARS
+      characters per token; the rest of the prompt is counted as "prompt")
+    - when the sources together exceed CONTEXT_BUDGET_TOKENS, each gets its
+      share of the budget (CONTEXT_BUDGET_SHARE_<SOURCE>); what a source does
+      not need is divided among the others
+    - a source over its share keeps its items most relevant first: term
+      overlap with the call's task plus a bonus for the newest runs, replies
+      and memories (or the best-ranked documents). An item that no longer
+      fits is cut down to its most relevant sentences; the rest are dropped
+      with a note saying how many were left out
+Kept items stay in their original order. Only the request is trimmed: the
+run keeps the full messages and the response cache keys on them.
+
+Tokens in and kept per stage and source are reported by
+`context_budget_stats()` (served at GET /context) and on each call's span.
+
+Configuration (environment):
+    CONTEXT_BUDGET                  "off" sends context untrimmed (default on)
+    CONTEXT_BUDGET_TOKENS           tokens of history, memories and documents per call (default 6000)
+    CONTEXT_BUDGET_SHARE_<SOURCE>   weight of HISTORY, INTERACTIONS, MEMORIES or KNOWLEDGE
+                                    (defaults 0.3, 0.35, 0.1, 0.25)
+    CONTEXT_TOKEN_CHARS             characters per estimated token (default 4)
+"""
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+CONTEXT_BUDGET = os.getenv("CONTEXT_BUDGET", "on").lower() not in ("0", "off", "false", "no")
+CONTEXT_BUDGET_TOKENS = int(os.getenv("CONTEXT_BUDGET_TOKENS", "6000"))
+CONTEXT_TOKEN_CHARS = max(1, int(os.getenv("CONTEXT_TOKEN_CHARS", "4")))
+
+# Weight of an item's position (newest run/reply/memory, best-ranked document) against its relevance
+RANK_WEIGHT = 0.25
+# An overflowing item is only cut down if at least this many tokens are left for it
+MIN_EXCERPT_TOKENS = 40
+
+_WORD = re.compile(r"[a-z0-9]{3,}")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_STOPWORDS = frozenset(
+    "the and for are was were with that this from have has had not but all any can its into our out "
+    "their them they there these those which what when where who will would should could about been "
+    "more most other some such than then very also only over under each per".split()
+)
+
+
+class ContextSource(NamedTuple):
+    name: str
+    # What the omission note calls the items
+    items: str
+    open_tag: str
+    close_tag: str
+    # Each item starts at a match; None means the body is a JSON list of documents
+    item_start: Optional[Pattern]
+    # Later items are newer (history, replies, memories) rather than ranked best first (documents)
+    newest_last: bool
+    share: float
+
+
+def _share(name: str, default: float) -> float:
+    return float(os.getenv(f"CONTEXT_BUDGET_SHARE_{name.upper()}", str(default)))
+
+
+SOURCES: Tuple[ContextSource, ...] = (
+    ContextSource("history", "runs", "<team_history_context>", "</team_history_context>",
+                  re.compile(r"^\[run-\d+\]$", re.M), True, _share("history", 0.3)),
+    ContextSource("interactions", "member replies", "<member_interaction_context>", "</member_interaction_context>",
+                  re.compile(r"^Member: ", re.M), True, _share("interactions", 0.35)),
+    ContextSource("memories", "memories", "<memories_from_previous_interactions>", "</memories_from_previous_interactions>",
+                  re.compile(r"^- ", re.M), True, _share("memories", 0.1)),
+    ContextSource("knowledge", "documents", "<references>", "</references>", None, False, _share("knowledge", 0.25)),
+)
+_BY_NAME = {source.name: source for source in SOURCES}
+_KNOWLEDGE_TOOL = "search_knowledge_base"
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CONTEXT_TOKEN_CHARS - 1) // CONTEXT_TOKEN_CHARS
+
+
+def _terms(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def _relevance(text: str, task_terms: Set[str]) -> float:
+    """Share of the task's terms the text mentions."""
+    if not task_terms:
+        return 0.0
+    return len(_terms(text) & task_terms) / len(task_terms)
+
+
+class _Section:
+    """One source's block within one message: text before the items, the items, text after."""
+
+    def __init__(self, source: ContextSource, message: int, start: int, end: int, body: str):
+        self.source = source
+        self.message = message
+        self.start, self.end = start, end
+        self.documents: Optional[List[Any]] = None
+        self.lead = body[:len(body) - len(body.lstrip("\n"))]
+        self.trail = body[len(body.rstrip("\n")):]
+        body = body.strip("\n")
+        if source.item_start is None:
+            documents = _json_list(body)
+            if documents is None:
+                # Not a document list (e.g. YAML references): one item
+                self.preamble, self.items = "", [body]
+            else:
+                self.preamble, self.documents = "", documents
+                self.items = [json.dumps(doc, indent=2) for doc in documents]
+        else:
+            starts = [match.start() for match in source.item_start.finditer(body)]
+            if not starts:
+                self.preamble, self.items = body, []
+            else:
+                self.preamble = body[:starts[0]]
+                self.items = [body[a:b] for a, b in zip(starts, starts[1:] + [len(body)])]
+        # Item index -> text (or document) sent in its place
+        self.kept: Dict[int, Any] = {}
+
+    def keep(self, index: int) -> int:
+        self.kept[index] = self.items[index] if self.documents is None else self.documents[index]
+        return estimate_tokens(self.items[index])
+
+    def cut(self, index: int, tokens: int, task_terms: Set[str]) -> int:
+        """Keep an excerpt of the item in about `tokens`; returns the tokens used (0 if it cannot be cut)."""
+        if self.documents is None:
+            self.kept[index] = excerpt(self.items[index], tokens, task_terms)
+            return estimate_tokens(self.kept[index])
+        document = self.documents[index]
+        if not isinstance(document, dict) or not isinstance(document.get("content"), str):
+            return 0
+        tokens -= estimate_tokens(self.items[index]) - estimate_tokens(document["content"])
+        if tokens < MIN_EXCERPT_TOKENS:
+            return 0
+        self.kept[index] = {**document, "content": excerpt(document["content"], tokens, task_terms).strip()}
+        return estimate_tokens(json.dumps(self.kept[index], indent=2))
+
+    def kept_tokens(self) -> int:
+        if self.documents is None:
+            return sum(estimate_tokens(text) for text in self.kept.values())
+        return sum(estimate_tokens(json.dumps(doc, indent=2)) for doc in self.kept.values())
+
+    def render(self) -> str:
+        dropped = len(self.items) - len(self.kept)
+        if self.documents is not None:
+            body = json.dumps([self.kept[i] for i in sorted(self.kept)], indent=2)
+        else:
+            body = self.preamble + "".join(self.kept[i] for i in sorted(self.kept))
+        if dropped:
+            separator = "\n" if body and not body.endswith("\n") else ""
+            body += f"{separator}({dropped} of {len(self.items)} {self.source.items} omitted to fit the context budget)"
+        return self.lead + body.rstrip("\n") + self.trail
+
+
+def _json_list(text: str) -> Optional[List[Any]]:
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+    return value if isinstance(value, list) else None
+
+
+def _find_sections(messages: List[Any]) -> List[_Section]:
+    sections: List[_Section] = []
+    for index, message in enumerate(messages):
+        content = getattr(message, "content", None)
+        if not isinstance(content, str):
+            continue
+        if message.role == "tool" and getattr(message, "tool_name", None) == _KNOWLEDGE_TOOL:
+            if _json_list(content):
+                sections.append(_Section(_BY_NAME["knowledge"], index, 0, len(content), content))
+            continue
+        for source in SOURCES:
+            position = 0
+            while True:
+                start = content.find(source.open_tag, position)
+                if start < 0:
+                    break
+                start += len(source.open_tag)
+                end = content.find(source.close_tag, start)
+                if end < 0:
+                    break
+                sections.append(_Section(source, index, start, end, content[start:end]))
+                position = end + len(source.close_tag)
+    return sections
+
+
+def _task(messages: List[Any], sections: List[_Section]) -> str:
+    """The latest user message without its injected context: what the call is about."""
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if message.role != "user" or not isinstance(message.content, str):
+            continue
+        text = message.content
+        for section in sorted((s for s in sections if s.message == index), key=lambda s: -s.start):
+            text = text[:section.start] + text[section.end:]
+        return text
+    return ""
+
+
+def allocate(demand: Dict[str, int], budget: int, shares: Dict[str, float]) -> Dict[str, int]:
+    """
+    Tokens each source may keep: everything if the total fits, otherwise the
+    budget split by share, with what a source does not need redistributed.
+    """
+    if sum(demand.values()) <= budget:
+        return dict(demand)
+    allowed: Dict[str, int] = {}
+    pending = {name: tokens for name, tokens in demand.items() if tokens}
+    remaining = budget
+    while pending:
+        weight = sum(shares[name] for name in pending)
+        if weight <= 0:
+            allowed.update({name: 0 for name in pending})
+            break
+        fair = {name: remaining * shares[name] / weight for name in pending}
+        satisfied = [name for name, tokens in pending.items() if tokens <= fair[name]]
+        if not satisfied:
+            allowed.update({name: int(fair[name]) for name in pending})
+            break
+        for name in satisfied:
+            allowed[name] = pending.pop(name)
+            remaining -= allowed[name]
+    return {name: allowed.get(name, 0) for name in demand}
+
+
+def excerpt(text: str, tokens: int, task_terms: Set[str]) -> str:
+    """
+    The text cut to about `tokens`: its first line (the item's heading, e.g.
+    "[run-2]" or "Member: X") and its most relevant sentences, in order.
+    """
+    limit = tokens * CONTEXT_TOKEN_CHARS
+    heading, _, rest = text.partition("\n") if "\n" in text.strip() else ("", "", text)
+    if heading:
+        heading += "\n"
+    sentences = [s for s in _SENTENCE.split(rest) if s.strip()]
+    ranked = sorted(range(len(sentences)), key=lambda i: (-_relevance(sentences[i], task_terms), i))
+    chosen: List[int] = []
+    used = len(heading)
+    for i in ranked:
+        if used + len(sentences[i]) + 1 > limit:
+            continue
+        chosen.append(i)
+        used += len(sentences[i]) + 1
+    if not chosen:
+        return (heading + rest)[:max(0, limit - 1)].rstrip() + "…\n"
+    return heading + " ".join(sentences[i] for i in sorted(chosen)) + " […]\n"
+
+
+def _fit(items: List[Tuple[_Section, int]], allowed: int, task_terms: Set[str], newest_last: bool) -> int:
+    """Keep the best items of one source within `allowed` tokens; returns how many were cut down."""
+    count = len(items)
+
+    def score(n: int) -> float:
+        section, i = items[n]
+        position = n / (count - 1) if count > 1 else 1.0
+        rank = position if newest_last else 1.0 - position
+        return _relevance(section.items[i], task_terms) + RANK_WEIGHT * rank
+
+    remaining, excerpted = allowed, 0
+    for n in sorted(range(count), key=score, reverse=True):
+        section, i = items[n]
+        if estimate_tokens(section.items[i]) <= remaining:
+            remaining -= section.keep(i)
+        elif remaining >= MIN_EXCERPT_TOKENS:
+            used = section.cut(i, remaining, task_terms)
+            remaining -= used
+            excerpted += bool(used)
+    return excerpted
+
+
+def apply_context_budget(
+    messages: List[Any],
+    stage: Optional[str] = None,
+    budget: Optional[int] = None,
+) -> Tuple[List[Any], Dict[str, Dict[str, int]]]:
+    """
+    Fit the history, member replies, memories and documents in `messages`
+    into `budget` tokens (CONTEXT_BUDGET_TOKENS by default).
+
+    Returns the messages to send (changed ones are copies, the originals are
+    untouched) and {source: {"tokens", "kept", "items", "dropped", "excerpted"}},
+    with "prompt" counting everything else. The report is also recorded
+    against `stage` for `context_budget_stats()`.
+    """
+    budget = CONTEXT_BUDGET_TOKENS if budget is None else budget
+    sections = _find_sections(messages)
+    total = sum(estimate_tokens(m.content) for m in messages if isinstance(getattr(m, "content", None), str))
+
+    by_source: Dict[str, List[Tuple[_Section, int]]] = {}
+    for section in sections:
+        by_source.setdefault(section.source.name, []).extend((section, i) for i in range(len(section.items)))
+    demand = {
+        name: sum(estimate_tokens(section.items[i]) for section, i in items)
+        for name, items in by_source.items()
+    }
+    report: Dict[str, Dict[str, int]] = {}
+    allowed = allocate(demand, budget, {source.name: source.share for source in SOURCES})
+    task_terms = _terms(_task(messages, sections)) if allowed != demand else set()
+    over = {name for name, tokens in demand.items() if allowed[name] < tokens}
+    for name, items in by_source.items():
+        kept, dropped, excerpted = demand[name], 0, 0
+        if name in over:
+            excerpted = _fit(items, allowed[name], task_terms, _BY_NAME[name].newest_last)
+            kept = sum(section.kept_tokens() for section in sections if section.source.name == name)
+            dropped = sum(1 for section, i in items if i not in section.kept)
+        report[name] = {"tokens": demand[name], "kept": kept, "items": len(items), "dropped": dropped, "excerpted": excerpted}
+    prompt = total - sum(demand.values())
+    report["prompt"] = {"tokens": prompt, "kept": prompt, "items": 0, "dropped": 0, "excerpted": 0}
+    _record(stage, report)
+
+    trimmed = [section for section in sections if section.source.name in over]
+    if not trimmed:
+        return messages, report
+    sent = list(messages)
+    for index in sorted({section.message for section in trimmed}):
+        content = messages[index].content
+        for section in sorted((s for s in trimmed if s.message == index), key=lambda s: -s.start):
+            content = content[:section.start] + section.render() + content[section.end:]
+        sent[index] = messages[index].model_copy(update={"content": content})
+    return sent, report
+
+
+class _SourceStats:
+    __slots__ = ("calls", "trimmed", "tokens", "kept", "items", "dropped", "excerpted")
+
+    def __init__(self):
+        self.calls = self.trimmed = self.tokens = self.kept = self.items = self.dropped = self.excerpted = 0
+
+    def add(self, counts: Dict[str, int]) -> None:
+        self.calls += 1
+        self.trimmed += int(counts["kept"] < counts["tokens"])
+        for name in ("tokens", "kept", "items", "dropped", "excerpted"):
+            setattr(self, name, getattr(self, name) + counts[name])
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "trimmed_calls": self.trimmed,
+            "tokens_in": self.tokens,
+            "tokens_kept": self.kept,
+            "avg_tokens_in": round(self.tokens / self.calls, 1) if self.calls else 0,
+            "items": self.items,
+            "items_dropped": self.dropped,
+            "items_excerpted": self.excerpted,
+        }
+
+
+_stats: Dict[Tuple[str, str], _SourceStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(stage: Optional[str], report: Dict[str, Dict[str, int]]) -> None:
+    with _stats_lock:
+        for source, counts in report.items():
+            _stats.setdefault((stage or "", source), _SourceStats()).add(counts)
+
+
+def context_budget_stats() -> Dict[str, Any]:
+    """Context tokens in and kept, and items dropped, per stage and source."""
+    with _stats_lock:
+        stats = {key: s.snapshot() for key, s in sorted(_stats.items())}
+    return {
+        "enabled": CONTEXT_BUDGET,
+        "budget_tokens": CONTEXT_BUDGET_TOKENS,
+        "shares": {source.name: source.share for source in SOURCES},
+        "calls": [{"stage": stage or None, "source": source, **s} for (stage, source), s in stats.items()],
+    }
+
+
+def reset_context_budget_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,93 @@
+"""
+Content-addressed cache for LLM responses.
+
+A response is keyed on (model_id, rendered messages, output schema, tool
+definitions), so re-running a query - or a run that only diverges at a later
+stage - reuses earlier stage results instead of calling the model again.
+
+Configuration (environment):
+    LLM_CACHE                 "off" disables the cache entirely (default on)
+    LLM_CACHE_TTL             default TTL in seconds (default 86400)
+    LLM_CACHE_TTL_<STAGE>     per-stage TTL, e.g. LLM_CACHE_TTL_SENTINEL=3600
+"""
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from app.utils.cache import TieredCache, cache_key
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+
+# Stages that scan live news expire sooner than the structural ones
+STAGE_CACHE_TTL: Dict[str, float] = {
+    "sentinel": 6 * 3600,
+    "investigator": 6 * 3600,
+    "bureaucrat": 7 * 86400,
+    "engineer": 86400,
+    "liaison": 86400,
+}
+
+# Agents inject "The current time is <timestamp>." - key on the date only
+_CURRENT_TIME = re.compile(r"The current time is (\d{4}-\d{2}-\d{2})[^\n]*?\.(?=\s|$)")
+
+response_cache = TieredCache("llm_responses", max_memory_items=512, default_ttl=LLM_CACHE_TTL)
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def no_response_cache() -> Iterator[None]:
+    """
+    Skip cache lookups for calls made inside this block.
+    Fresh responses are still written, so the block also refreshes the cache.
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_bypassed() -> bool:
+    return _bypass.get()
+
+
+def stage_cache_ttl(stage: Optional[str]) -> float:
+    """TTL for a stage: LLM_CACHE_TTL_<STAGE>, then STAGE_CACHE_TTL, then LLM_CACHE_TTL."""
+    if stage:
+        override = os.getenv(f"LLM_CACHE_TTL_{stage.upper()}")
+        if override is not None:
+            return float(override)
+        if stage in STAGE_CACHE_TTL:
+            return STAGE_CACHE_TTL[stage]
+    return LLM_CACHE_TTL
+
+
+def _schema(response_format: Any) -> Any:
+    if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+        return response_format.model_json_schema()
+    return response_format
+
+
+def response_cache_key(
+    model_id: str,
+    messages: List[Any],
+    response_format: Any = None,
+    tools: Optional[List[Dict[str, Any]]] = None,
+    stream: bool = False,
+) -> str:
+    """Hash of everything that determines a model response."""
+    rendered = [
+        {
+            "role": message.role,
+            "content": _CURRENT_TIME.sub(r"The current date is \1.", message.content)
+            if isinstance(message.content, str) else message.content,
+        }
+        for message in messages
+    ]
+    return cache_key(model_id, rendered, _schema(response_format), tools or [], stream)
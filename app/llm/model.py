@@ -0,0 +1,252 @@
+"""
+Model client for Civic Remediation agents.
+
+All agents and the team talk to Pollinations.ai through its OpenAI-compatible
+API. `CivicModel` adds the project's response cache on top of `OpenAILike`
+by plugging into Agno's model cache hooks, runs every call under the stage
+deadline with hedging, retries and a circuit breaker (app.llm.resilience),
+draws each request from the provider's shared rate limit (app.utils.ratelimit),
+fits injected history, memories and documents into the context budget
+(app.llm.budget), and streams calls made while a token listener is active
+(app.llm.stream).
+"""
+from contextlib import closing
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from os import getenv
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from agno.models.message import Message
+from agno.models.openai.like import OpenAILike
+from agno.models.response import ModelResponse
+from agno.utils.log import log_debug
+from openai.lib.streaming.chat import ChatCompletionStreamState
+from openai.types.chat import ChatCompletion
+
+from app.llm.budget import CONTEXT_BUDGET, apply_context_budget
+from app.llm.resilience import LLM_HEDGE, Attempt, CircuitOpenError, call_with_resilience, current_attempt, is_timeout
+from app.llm.stream import token_listener
+from app.telemetry import record_llm_usage, span
+from app.utils.ratelimit import rate_limited
+from app.llm.cache import (
+    LLM_CACHE_ENABLED,
+    response_cache,
+    response_cache_key,
+    stage_cache_ttl,
+    cache_bypassed,
+)
+
+# Listener of the request being made in this context (set by `CivicModel._request`)
+_streaming_to: ContextVar[Optional[Callable[[str], None]]] = ContextVar("streaming_to", default=None)
+
+# Pollinations.ai OpenAI-compatible endpoint
+POLLINATIONS_BASE_URL = "https://gen.pollinations.ai/v1"
+# Default model - can be: openai, openai-fast, qwen-coder, mistral, deepseek, grok, claude, nova-fast, etc.
+DEFAULT_MODEL = "perplexity-reasoning"
+
+
+@dataclass
+class CivicModel(OpenAILike):
+    """OpenAILike model whose responses go through the shared response cache."""
+
+    # Pipeline stage / agent slug, used for per-stage cache TTLs and routing
+    stage: Optional[str] = None
+    # Model that takes over a call when this one times out (see app.llm.routing)
+    fallback_id: Optional[str] = None
+    # Shared rate limit the requests draw from (see app.utils.ratelimit)
+    provider: str = "pollinations"
+    _fallback_model: Optional["CivicModel"] = field(default=None, init=False, repr=False)
+
+    def invoke(self, messages: List[Message], assistant_message: Message, **kwargs: Any) -> ModelResponse:
+        with span("llm", self.id, stage=self.stage) as call:
+            sent = messages
+            if CONTEXT_BUDGET:
+                sent, context = apply_context_budget(messages, self.stage)
+                call.set(**{f"context_{source}_tokens": counts["kept"] for source, counts in context.items()})
+            try:
+                response = call_with_resilience(
+                    lambda: self._invoke_once(sent, assistant_message, **kwargs),
+                    model_id=self.id,
+                    stage=self.stage,
+                    # Two requests would interleave their tokens for a live listener
+                    hedge=LLM_HEDGE and token_listener() is None,
+                    # A slow model is not retried when the next tier can take over
+                    retry_timeouts=self.fallback_id is None,
+                )
+            except Exception as e:
+                if not self.fallback_id or not _should_fall_back(e):
+                    raise
+                print(f"Warning: {self.id} failed for '{self.stage}' ({e}), retrying on {self.fallback_id}")
+                call.set(fallback=self.fallback_id)
+                return self._fallback().invoke(messages, assistant_message, **kwargs)
+            usage = getattr(response, "response_usage", None)
+            if usage is not None:
+                record_llm_usage(self.id, self.stage, usage.input_tokens, usage.output_tokens)
+            return response
+
+    def _fallback(self) -> "CivicModel":
+        if self._fallback_model is None:
+            self._fallback_model = replace(self, id=self.fallback_id, fallback_id=None, cache_response=False)
+        return self._fallback_model
+
+    def _invoke_once(self, messages: List[Message], assistant_message: Message, **kwargs: Any) -> ModelResponse:
+        attempt = current_attempt()
+        if attempt is not None:
+            attempt.check()
+        with rate_limited(self.provider):
+            # A hedge that lost while waiting for its turn sends nothing
+            if attempt is not None:
+                attempt.check()
+            return self._request(messages, assistant_message, **kwargs)
+
+    def _request(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        listener = token_listener()
+        if listener is None:
+            return super().invoke(messages, assistant_message, **kwargs)
+        # Same request, error handling and parsing; only the client streams (see get_client)
+        token = _streaming_to.set(listener)
+        try:
+            return super().invoke(messages, assistant_message, **kwargs)
+        finally:
+            _streaming_to.reset(token)
+
+    def get_client(self) -> Any:
+        client = super().get_client()
+        attempt = current_attempt()
+        if attempt is not None:
+            # An abandoned attempt's request still ends at the call's deadline
+            timeout = attempt.remaining() if self.timeout is None else min(self.timeout, attempt.remaining())
+            client = client.with_options(timeout=timeout)
+        listener = _streaming_to.get()
+        return client if listener is None else _StreamingClient(client, listener, attempt)
+
+    def _get_model_cache_key(self, messages: List[Message], stream: bool, **kwargs: Any) -> str:
+        tools = kwargs.get("tools")
+        return response_cache_key(
+            self.id,
+            messages,
+            response_format=kwargs.get("response_format"),
+            tools=self._format_tools(tools) if tools else None,
+            stream=stream,
+        )
+
+    def _get_cached_model_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if cache_bypassed():
+            return None
+        return response_cache.get(cache_key)
+
+    def _save_model_response_to_cache(self, cache_key: str, result: ModelResponse, is_streaming: bool = False) -> None:
+        try:
+            data = result.to_dict()
+            # Structured output is re-parsed from `content` on a cache hit
+            data["parsed"] = None
+            response_cache.set(
+                cache_key,
+                {"is_streaming": is_streaming, "result": data},
+                ttl=self.cache_ttl if self.cache_ttl is not None else stage_cache_ttl(self.stage),
+            )
+        except Exception as e:
+            log_debug(f"Could not cache model response: {e}")
+
+    def _save_streaming_responses_to_cache(self, cache_key: str, responses: List[ModelResponse]) -> None:
+        try:
+            data = [response.to_dict() for response in responses]
+            for item in data:
+                item["parsed"] = None
+            response_cache.set(
+                cache_key,
+                {"is_streaming": True, "streaming_responses": data},
+                ttl=self.cache_ttl if self.cache_ttl is not None else stage_cache_ttl(self.stage),
+            )
+        except Exception as e:
+            log_debug(f"Could not cache streaming model response: {e}")
+
+
+def _should_fall_back(error: BaseException) -> bool:
+    """Timeouts (the client's or the stage deadline) and open circuits move a call to the fallback model."""
+    return is_timeout(error) or isinstance(error, CircuitOpenError)
+
+
+class _StreamingClient:
+    """
+    Stands in for the OpenAI client in a non-streamed call: the completion is
+    requested as a stream, each content delta goes to `listener`, and the
+    assembled completion is returned as `create()` would have returned it.
+    The stream is closed as soon as `attempt` is cancelled.
+    """
+
+    def __init__(self, client: Any, listener: Callable[[str], None], attempt: Optional[Attempt] = None):
+        self._client = client
+        self._listener = listener
+        self._attempt = attempt
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **params: Any) -> ChatCompletion:
+        state = ChatCompletionStreamState()
+        stream = self._client.chat.completions.create(**params, stream=True, stream_options={"include_usage": True})
+        with closing(stream):
+            for chunk in stream:
+                if self._attempt is not None:
+                    self._attempt.check()
+                state.handle_chunk(chunk)
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        self._listener(choice.delta.content)
+        return _plain_completion(state)
+
+
+def _plain_completion(state: ChatCompletionStreamState) -> ChatCompletion:
+    """The streamed completion without the SDK's parsing-only fields, as `create()` would return it."""
+    data = state.get_final_completion().model_dump(exclude_none=True)
+    for choice in data["choices"]:
+        message = choice["message"]
+        message.pop("parsed", None)
+        for tool_call in message.get("tool_calls") or []:
+            tool_call.pop("index", None)
+            tool_call["function"].pop("parsed_arguments", None)
+    return ChatCompletion.model_validate(data)
+
+
+def create_model(
+    model_id: str = DEFAULT_MODEL,
+    stage: Optional[str] = None,
+    cache: bool = LLM_CACHE_ENABLED,
+    cache_ttl: Optional[int] = None,
+    timeout: Optional[float] = None,
+    fallback_id: Optional[str] = None,
+) -> CivicModel:
+    """
+    Build the Pollinations.ai model client for an agent or team.
+    
+    Args:
+        model_id: Pollinations.ai model name
+        stage: Agent slug, selects the per-stage cache TTL
+        cache: Serve repeated calls from the response cache
+        cache_ttl: Override the stage TTL (seconds)
+        timeout: Seconds per call
+        fallback_id: Model that retries a call that timed out
+    """
+    return CivicModel(
+        id=model_id,
+        base_url=POLLINATIONS_BASE_URL,
+        api_key=getenv("POLLINATIONS_API_KEY", "not-provided"),  # Optional for Pollinations.ai
+        stage=stage,
+        cache_response=cache,
+        cache_ttl=cache_ttl,
+        timeout=timeout,
+        max_retries=0,  # Retries, hedging and deadlines are handled by app.llm.resilience
+        fallback_id=fallback_id,
+    )
+
+
+def create_routed_model(stage: Optional[str], model_id: Optional[str] = None, **options: Any) -> CivicModel:
+    """`create_model` for the model, timeout and fallback the router picks for `stage`."""
+    from app.llm.routing import route_model
+    route = route_model(stage, model_id)
+    return create_model(route.model_id, stage=stage, timeout=route.timeout, fallback_id=route.fallback_id, **options)
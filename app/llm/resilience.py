@@ -0,0 +1,394 @@
+"""
+Deadlines, hedging, retries and circuit breaking for model calls.
+
+Every `CivicModel` call goes through `call_with_resilience`:
+    - the call must finish within the stage deadline (LLM_DEADLINE[_<STAGE>]),
+      retries included; an attempt still running at the deadline is abandoned
+    - once a model has LLM_HEDGE_MIN_SAMPLES latencies recorded, an attempt
+      still running after its p95 latency gets a second, identical request;
+      whichever answers first is used
+    - abandoned requests are cancelled: one still queued for a worker never
+      starts, and a running one sees `current_attempt().cancelled` set and
+      its HTTP timeout ends at the deadline (see CivicModel.get_client), so
+      orphans never outlive the call's deadline on the worker pool
+    - timeouts, connection errors, 429s and 5xx responses are retried up to
+      LLM_RETRIES times with full-jitter exponential backoff
+    - LLM_BREAKER_FAILURES consecutive failures open the model's circuit for
+      LLM_BREAKER_RESET seconds; calls fail fast (and fall back to the next
+      model tier) until a trial call succeeds
+Latency histograms and retry/hedge/breaker counters are kept per model and
+stage; see `llm_stats()` (served at GET /llm/stats).
+
+Configuration (environment):
+    LLM_DEADLINE              seconds per model call, retries included (default 300)
+    LLM_DEADLINE_<STAGE>      per-stage deadline, e.g. LLM_DEADLINE_BUREAUCRAT=60
+    LLM_RETRIES               retries after a failed attempt (default 2)
+    LLM_RETRY_BASE_DELAY      backoff base in seconds (default 1)
+    LLM_RETRY_MAX_DELAY       backoff cap in seconds (default 20)
+    LLM_HEDGE                 "off" disables hedged requests (default on)
+    LLM_HEDGE_MIN_SAMPLES     latencies recorded before hedging starts (default 20)
+    LLM_BREAKER_FAILURES      consecutive failures that open the circuit (default 5)
+    LLM_BREAKER_RESET         seconds the circuit stays open (default 30)
+    LLM_CALL_WORKERS          threads running model requests, hedges included (default 64)
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from agno.exceptions import ModelProviderError
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "300"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "on").lower() not in ("0", "off", "false", "no")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# Histogram bucket upper bounds (seconds)
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The stage deadline passed before any attempt answered."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The model's circuit is open after repeated failures."""
+
+
+class AttemptAbandoned(RuntimeError):
+    """The call no longer wants this attempt's answer (another one won, or the deadline passed)."""
+
+
+class Attempt:
+    """One request of a call: when it must be done by, and whether it is still wanted."""
+
+    def __init__(self, deadline_at: float):
+        self.deadline_at = deadline_at
+        self.cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        return max(self.deadline_at - time.monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Raise AttemptAbandoned if the attempt was cancelled."""
+        if self.cancelled.is_set():
+            raise AttemptAbandoned("Attempt abandoned")
+
+
+_attempt: contextvars.ContextVar[Optional[Attempt]] = contextvars.ContextVar("llm_attempt", default=None)
+
+
+def current_attempt() -> Optional[Attempt]:
+    """The attempt being made in this thread, when running under `call_with_resilience`."""
+    return _attempt.get()
+
+
+def stage_deadline(stage: Optional[str]) -> float:
+    """Seconds a call for `stage` may take, retries included."""
+    if stage:
+        override = os.getenv(f"LLM_DEADLINE_{stage.upper()}")
+        if override:
+            return float(override)
+    return LLM_DEADLINE
+
+
+def is_timeout(error: BaseException) -> bool:
+    """A client timeout or passed deadline (also when wrapped by Agno)."""
+    return any(isinstance(e, (TimeoutError, APITimeoutError)) for e in (error, error.__cause__))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, rate limits and server errors (also when wrapped by Agno)."""
+    for e in (error, error.__cause__):
+        if isinstance(e, (TimeoutError, APIConnectionError)):
+            return True
+        if isinstance(e, APIStatusError) and (e.status_code == 429 or e.status_code >= 500):
+            return True
+    if isinstance(error, ModelProviderError) and error.__cause__ is None:
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_DELAY, cap: float = LLM_RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LatencyHistogram:
+    """Bucketed latency histogram (thread-safe) with percentile estimates."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile (None when empty)."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = p / 100 * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.total
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "buckets": {str(bound): n for bound, n in zip(self.buckets + ("+Inf",), counts)},
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failures; after `reset` seconds one
+    trial call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset: float = LLM_BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.consecutive = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.consecutive += 1
+            if self._trial or self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class CallStats:
+    """Latency histogram and counters for one (model, stage)."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.abandoned = 0  # Attempts still running when their answer was no longer wanted
+        self.failures = 0
+        self.deadline_exceeded = 0
+        self.rejected = 0  # Circuit open
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "abandoned": self.abandoned,
+            "failures": self.failures,
+            "deadline_exceeded": self.deadline_exceeded,
+            "rejected": self.rejected,
+            "latency": self.latency.snapshot(),
+        }
+
+
+_stats: Dict[Tuple[str, str], CallStats] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+_call_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_CALL_WORKERS", "64")), thread_name_prefix="llm-call")
+
+
+def call_stats(model_id: str, stage: Optional[str]) -> CallStats:
+    key = (model_id, stage or "")
+    with _registry_lock:
+        if key not in _stats:
+            _stats[key] = CallStats()
+        return _stats[key]
+
+
+def circuit_breaker(model_id: str) -> CircuitBreaker:
+    """The breaker shared by every stage calling `model_id`."""
+    with _registry_lock:
+        if model_id not in _breakers:
+            _breakers[model_id] = CircuitBreaker()
+        return _breakers[model_id]
+
+
+def llm_stats() -> Dict[str, Any]:
+    """Per-model/stage latency and retry statistics plus each model's circuit state."""
+    with _registry_lock:
+        stats = dict(_stats)
+        breakers = dict(_breakers)
+    return {
+        "calls": [{"model": model, "stage": stage or None, **s.snapshot()} for (model, stage), s in sorted(stats.items())],
+        "circuits": {model: breaker.state for model, breaker in sorted(breakers.items())},
+    }
+
+
+def reset_llm_stats() -> None:
+    with _registry_lock:
+        _stats.clear()
+        _breakers.clear()
+
+
+def _submit(fn: Callable[[], Any], attempt: Attempt) -> Future:
+    # Carry the caller's context (e.g. cache bypass) into the worker thread
+    context = contextvars.copy_context()
+    context.run(_attempt.set, attempt)
+    return _call_pool.submit(context.run, fn)
+
+
+def _abandon(futures: Dict[Future, Attempt], stats: CallStats) -> None:
+    """Cancel attempts whose answer is no longer wanted; count those already running."""
+    running = 0
+    for future, attempt in futures.items():
+        if future.done():
+            continue
+        attempt.cancelled.set()
+        if not future.cancel():
+            running += 1
+    if running:
+        stats.add(abandoned=running)
+
+
+def _hedged_attempt(fn: Callable[[], Any], stats: CallStats, remaining: float, hedge: bool) -> Any:
+    """One attempt, with a hedge request once the p95 latency has passed."""
+    started = time.monotonic()
+    attempt = Attempt(started + remaining)
+    first = _submit(fn, attempt)
+    futures: Dict[Future, Attempt] = {first: attempt}
+    try:
+        hedge_after = stats.latency.percentile(95) if hedge and stats.latency.count >= LLM_HEDGE_MIN_SAMPLES else None
+        if hedge_after is not None and hedge_after < remaining:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                stats.add(hedges=1)
+                attempt = Attempt(started + remaining)
+                futures[_submit(fn, attempt)] = attempt
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(remaining - (time.monotonic() - started), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        stats.add(hedge_wins=1)
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded(f"No answer within {remaining:.0f}s")
+    finally:
+        _abandon(futures, stats)
+
+
+def call_with_resilience(
+    fn: Callable[[], Any],
+    model_id: str,
+    stage: Optional[str] = None,
+    deadline: Optional[float] = None,
+    retries: int = LLM_RETRIES,
+    hedge: bool = LLM_HEDGE,
+    retry_timeouts: bool = True,
+) -> Any:
+    """
+    Call `fn` (one model request) under the stage deadline, with hedging,
+    jittered retries and the model's circuit breaker. With `retry_timeouts`
+    off, a timed-out attempt is raised at once (the caller has a fallback).
+    """
+    stats = call_stats(model_id, stage)
+    breaker = circuit_breaker(model_id)
+    deadline_at = time.monotonic() + (deadline if deadline is not None else stage_deadline(stage))
+    stats.add(calls=1)
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            stats.add(rejected=1)
+            raise CircuitOpenError(f"Circuit open for model '{model_id}'")
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            stats.add(deadline_exceeded=1, failures=1)
+            raise DeadlineExceeded(f"Deadline passed before attempt {attempt + 1} for '{model_id}'")
+        stats.add(attempts=1)
+        started = time.monotonic()
+        try:
+            result = _hedged_attempt(fn, stats, remaining, hedge)
+        except Exception as e:
+            # Only upstream trouble counts against the circuit, not e.g. a rejected request
+            if is_retryable(e):
+                breaker.failure()
+            else:
+                breaker.success()
+            if isinstance(e, DeadlineExceeded):
+                stats.add(deadline_exceeded=1, failures=1)
+                raise
+            delay = backoff_delay(attempt)
+            if (
+                attempt == retries
+                or not is_retryable(e)
+                or (not retry_timeouts and is_timeout(e))
+                or time.monotonic() + delay >= deadline_at
+            ):
+                stats.add(failures=1)
+                raise
+            stats.add(retries=1)
+            time.sleep(delay)
+            continue
+        stats.latency.record(time.monotonic() - started)
+        breaker.success()
+        return result
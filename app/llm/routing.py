@@ -0,0 +1,116 @@
+"""
+Per-stage model routing.
+
+Each agent is routed to a model tier instead of every stage using the
+reasoning model. Reasoning-heavy stages (Sentinel, Investigator) keep the
+reasoning model; tool-less mapping stages such as the Bureaucrat use the fast
+tier. A call that times out is retried once on the next tier down.
+
+A stage's tier (or an explicit model id) is taken from, in order:
+    1. MODEL_<STAGE> in the environment, e.g. MODEL_BUREAUCRAT=fast
+    2. the model id passed in code (e.g. `get_pooled_agent(..., model_id=...)`)
+    3. the `model:` field of the stage's prompt, if it names a tier or a Pollinations model
+    4. STAGE_TIERS below, else the "standard" tier
+
+Configuration (environment):
+    MODEL_ROUTING                     "off" sends every stage to DEFAULT_MODEL (default on)
+    MODEL_REASONING / _STANDARD / _FAST             model of each tier
+    MODEL_REASONING_TIMEOUT / _STANDARD_ / _FAST_   seconds per call before falling back
+    MODEL_<STAGE>                     tier or model id for one stage
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.llm.model import DEFAULT_MODEL
+
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "on").lower() not in ("0", "off", "false", "no")
+
+# (tier, default model, default timeout in seconds, tier to fall back to on timeout)
+TIERS = [
+    ("reasoning", DEFAULT_MODEL, 180.0, "standard"),
+    ("standard", "openai", 90.0, "fast"),
+    ("fast", "openai-fast", 45.0, None),
+]
+
+# Stages not listed use the "standard" tier
+STAGE_TIERS: Dict[str, str] = {
+    "sentinel": "reasoning",
+    "investigator": "reasoning",
+    "bureaucrat": "fast",
+    "team": "reasoning",
+    # Folding old memories into a summary (app.knowledge.memory retention)
+    "memory": "fast",
+}
+
+# Models a prompt's `model:` field may name directly (anything else is ignored)
+POLLINATIONS_MODELS = {
+    "openai", "openai-fast", "openai-large", "qwen-coder", "mistral", "deepseek",
+    "deepseek-reasoning", "grok", "claude", "nova-fast", "gemini", "perplexity-fast",
+    "perplexity-reasoning",
+}
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Where a stage's calls go: model, its tier, per-call timeout and timeout fallback."""
+    model_id: str
+    tier: Optional[str] = None
+    timeout: Optional[float] = None
+    fallback_id: Optional[str] = None
+
+
+def _tier_settings() -> Dict[str, ModelRoute]:
+    routes = {}
+    for tier, model_id, timeout, _ in TIERS:
+        env = f"MODEL_{tier.upper()}"
+        routes[tier] = ModelRoute(
+            model_id=os.getenv(env, model_id),
+            tier=tier,
+            timeout=float(os.getenv(f"{env}_TIMEOUT", str(timeout))),
+        )
+    for tier, _, _, fallback in TIERS:
+        if fallback:
+            route = routes[tier]
+            routes[tier] = ModelRoute(route.model_id, tier, route.timeout, routes[fallback].model_id)
+    return routes
+
+
+def _prompt_model(slug: str) -> Optional[str]:
+    from app.utils import get_agent_prompt, prompt_registry
+    if slug not in prompt_registry.configured_slugs():
+        return None
+    try:
+        return getattr(get_agent_prompt(slug), "model", None)
+    except RuntimeError:
+        return None
+
+
+def _choice(value: Optional[str], routes: Dict[str, ModelRoute], any_model: bool) -> Optional[ModelRoute]:
+    if not value:
+        return None
+    if value in routes:
+        return routes[value]
+    for route in routes.values():
+        if value == route.model_id:
+            return route
+    if any_model or value in POLLINATIONS_MODELS:
+        return ModelRoute(model_id=value)
+    return None
+
+
+def route_model(stage: Optional[str], model_id: Optional[str] = None) -> ModelRoute:
+    """
+    The model route for an agent slug (or "team"). `model_id` is the model
+    requested in code, if any; it may also be a tier name.
+    """
+    if not MODEL_ROUTING:
+        return ModelRoute(model_id=model_id or DEFAULT_MODEL)
+    routes = _tier_settings()
+    slug = stage or ""
+    return (
+        _choice(os.getenv(f"MODEL_{slug.upper()}") if slug else None, routes, any_model=True)
+        or _choice(model_id, routes, any_model=True)
+        or (_choice(_prompt_model(slug), routes, any_model=False) if slug else None)
+        or routes[STAGE_TIERS.get(slug, "standard")]
+    )
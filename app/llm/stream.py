@@ -0,0 +1,31 @@
+"""
+Token listeners for live output.
+
+Structured-output agents are not streamed by Agno: the model reply is only
+parsed once complete. While a listener is active in the current context,
+`CivicModel` requests the completion as a stream instead and passes every
+content delta to the listener as it arrives, then hands Agno the assembled
+completion exactly as a non-streamed call would.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+TokenListener = Callable[[str], None]
+
+_listener: ContextVar[Optional[TokenListener]] = ContextVar("token_listener", default=None)
+
+
+def token_listener() -> Optional[TokenListener]:
+    """The listener for model calls made in the current context, if any."""
+    return _listener.get()
+
+
+@contextmanager
+def listen_tokens(listener: TokenListener) -> Iterator[None]:
+    """Send the text of every model call made inside the block to `listener`."""
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
@@ -4,41 +4,130 @@ Civic Remediation System - Main Entry Point
 Supports two modes:
 1. Singleton Pipeline (NEW): Converging flow → ONE problem, ONE cause, ONE solution → Project Launch
 2. Deep Team (Legacy): Intelligent delegation to 7-agent team
+
+A pipeline run can be resumed from a later stage using its run id:
+    uv run python -m app.main <run_id> resume <stage>
+
+Stream a run, printing each stage's selection as soon as it is made:
+    uv run python -m app.main "<query>" stream
+
+Runs belong to a tenant, project and user, which scope their memories and
+sessions (defaults from CIVIC_TENANT, CIVIC_PROJECT and CIVIC_USER):
+    uv run python -m app.main "<query>" --tenant acme --project ganga --user asha
 """
 from dotenv import load_dotenv
 import sys
+from typing import Optional
+from uuid import uuid4
 
-# Import both modes
-from app.team import create_civic_team
-from app.workflow import create_singleton_pipeline
+# Each mode imports its pipeline or team on first use, so the CLI only loads what it runs
+from app.tenancy import parse_scope
+from app.utils import warm_prompts
 
 load_dotenv()
 
 
-def run_singleton_pipeline(query: str = "Pollution of the Ganga River"):
+def run_singleton_pipeline(
+    query: str = "Pollution of the Ganga River",
+    user_id: str = "civic-system",
+    session_id: Optional[str] = None,
+):
     """
     NEW: Singleton Pipeline mode.
     Converging flow: ONE problem → ONE cause → ONE department → ONE solution → ONE funding → Blueprint
+    
+    The pipeline is built once per process; each run gets its own session.
     """
     print(f"--- Starting Singleton Pipeline for: {query} ---")
     print("Mode: Converging (ONE item per stage)")
     
-    pipeline = create_singleton_pipeline()
-    response = pipeline.run(query)
+    from app.workflow import get_singleton_pipeline
+
+    pipeline = get_singleton_pipeline()
+    response = pipeline.run(query, user_id=user_id, session_id=session_id or str(uuid4()))
+    print(f"Run id: {response.run_id} (resume with: python -m app.main {response.run_id} resume <stage>)")
     
     return response
 
 
-def run_team(query: str = "Pollution of the Ganga River") -> str:
+def stream_singleton_pipeline(
+    query: str = "Pollution of the Ganga River",
+    user_id: str = "civic-system",
+    session_id: Optional[str] = None,
+):
+    """
+    Singleton Pipeline with live output: model text is printed as it is
+    generated and each selection as soon as its stage completes.
+    
+    Returns the final blueprint. While two stages run in parallel, the text of
+    the one that started first is shown.
+    """
+    from app.streaming import stream_pipeline
+
+    print(f"--- Streaming Singleton Pipeline for: {query} ---")
+    live = []  # Stages in progress; tokens are shown for the first one
+    result = None
+    for event in stream_pipeline(query, user_id=user_id, session_id=session_id):
+        kind = event["event"]
+        if kind == "run_started":
+            print(f"Run id: {event['run_id']} (resume with: python -m app.main {event['run_id']} resume <stage>)")
+        elif kind == "stage_started":
+            live.append(event["stage"])
+            print(f"\n>>> {event['stage']}", flush=True)
+        elif kind == "token" and live and event["stage"] == live[0]:
+            print(event["delta"], end="", flush=True)
+        elif kind == "stage_completed":
+            if event["stage"] in live:
+                live.remove(event["stage"])
+            selection = event["selection"]
+            text = selection.model_dump_json(indent=2) if hasattr(selection, "model_dump_json") else str(selection)
+            note = " (from checkpoint)" if event["replayed"] else ""
+            print(f"\n<<< {event['stage']}{note}\n{text}", flush=True)
+        elif kind == "run_failed":
+            raise RuntimeError(event["error"])
+        elif kind == "run_completed":
+            result = event["result"]
+    return result
+
+
+def resume_pipeline(
+    run_id: str,
+    from_stage: int,
+    user_id: str = "civic-system",
+    session_id: Optional[str] = None,
+):
+    """
+    Re-run a previous Singleton Pipeline run from `from_stage` onward,
+    reusing the checkpointed selections of the earlier stages.
+    """
+    from app.workflow import resume
+
+    print(f"--- Resuming Singleton Pipeline run {run_id} from stage {from_stage} ---")
+    return resume(run_id, from_stage, user_id=user_id, session_id=session_id)
+
+
+def run_team(
+    query: str = "Pollution of the Ganga River",
+    user_id: str = "civic-system",
+    session_id: Optional[str] = None,
+    team_mode: Optional[str] = None,
+) -> str:
     """
     Legacy: Team-based intelligent delegation mode.
     The coordinator (Deep Team) decides which agents to invoke and synthesizes results.
+    
+    With team_mode="parallel" members run over their dependency graph instead,
+    independent members at the same time, and the leader only synthesizes.
+    Defaults to TEAM_MODE.
     """
+    from app.team import TEAM_MODE, get_civic_team, get_parallel_team
+
+    team_mode = team_mode or TEAM_MODE
     print(f"--- Starting Civic Remediation Deep Team for: {query} ---")
-    print("Mode: Divergent (multiple items per agent)")
+    print(f"Mode: Divergent (multiple items per agent, {team_mode})")
     
-    team = create_civic_team()
-    response = team.run(query)
+    team = get_parallel_team() if team_mode == "parallel" else get_civic_team()
+    response = team.run(query, user_id=user_id, session_id=session_id or str(uuid4()))
     
     return response.content
 
@@ -48,15 +137,29 @@ run_pipeline = run_singleton_pipeline
 
 
 if __name__ == "__main__":
-    query = sys.argv[1] if len(sys.argv) > 1 else "Pollution of the Ganga River"
-    mode = sys.argv[2] if len(sys.argv) > 2 else "singleton"
+    scope, args = parse_scope(sys.argv[1:])
+    query = args[0] if len(args) > 0 else "Pollution of the Ganga River"
+    mode = args[1] if len(args) > 1 else "singleton"
+    scoped = {"user_id": scope.user_id, "session_id": scope.session_id()}
+    
+    # Load every prompt once up front; agents then read from the registry
+    warm_prompts()
     
     if mode == "team":
         print("Using Deep Team mode (intelligent delegation)")
-        result = run_team(query)
+        result = run_team(query, **scoped)
+    elif mode == "team-parallel":
+        print("Using Deep Team mode (parallel delegation)")
+        result = run_team(query, team_mode="parallel", **scoped)
+    elif mode == "stream":
+        print("Using Singleton Pipeline mode (converging, streamed)")
+        result = stream_singleton_pipeline(query, **scoped)
+    elif mode == "resume":
+        from_stage = int(args[2]) if len(args) > 2 else 5
+        result = resume_pipeline(query, from_stage, **scoped)
     else:
         print("Using Singleton Pipeline mode (converging)")
-        result = run_singleton_pipeline(query)
+        result = run_singleton_pipeline(query, **scoped)
     
     print("\n--- Final Result ---")
     print(result)
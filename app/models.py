@@ -132,9 +132,11 @@ class RemediationBlueprint(BaseModel):
 class PipelineContext(BaseModel):
     """
     Context object passed between pipeline stages.
-    Each stage adds its singleton selection to this context.
+    Each stage adds its singleton selection to this context, which is
+    checkpointed under `run_id` so a run can be resumed from any stage.
     """
     original_query: str = Field(..., description="The user's original query/request")
+    run_id: Optional[str] = Field(None, description="Pipeline run this context belongs to")
     problem: Optional[SelectedProblem] = None
     cause: Optional[SelectedCause] = None
     department: Optional[SelectedDepartment] = None
@@ -1,19 +1,250 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from app.main import run_pipeline
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Literal, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from app.jobs import Job, JobMode, JobQueue, JobStatus, QueueFullError
+from app.utils import warm_prompts, prompt_registry
+from app.knowledge import get_pool_metrics, dispose_engine, findings_writer
+from app.checkpoints import checkpoints
+from app.llm import context_budget_stats, llm_stats
+from app.utils.ratelimit import PRIORITY_HIGH, rate_limit_stats
+from app.utils.tool_cache import tool_cache_stats
+from app.streaming import sse_format, ndjson_format
+from app.telemetry import prometheus_metrics, telemetry_stats
+from app.tenancy import DEFAULT_PROJECT, DEFAULT_TENANT, DEFAULT_USER, SCOPE_NAME_PATTERN, tenant_prefix
 
-app = FastAPI(title="Civic Remediation System API")
+job_queue = JobQueue()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the prompt registry so requests never pay for prompt loading
+    warm_prompts()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    # Write queued findings before the pool goes away
+    findings_writer.close()
+    dispose_engine()
+
+app = FastAPI(title="Civic Remediation System API", lifespan=lifespan)
 
 class Query(BaseModel):
     query: str
+    mode: JobMode = "singleton"
+    # Memories and sessions are scoped to the user within the tenant's project
+    tenant: str = Field(DEFAULT_TENANT, pattern=SCOPE_NAME_PATTERN)
+    project: str = Field(DEFAULT_PROJECT, pattern=SCOPE_NAME_PATTERN)
+    user_id: str = Field(DEFAULT_USER, pattern=SCOPE_NAME_PATTERN)
+
+@app.post("/run", status_code=202)
+async def run(query: Query):
+    """
+    Queue a Civic Remediation Pipeline run.
+    Returns immediately with a job id; poll /jobs/{id} or follow /jobs/{id}/events.
+    """
+    try:
+        job = job_queue.submit(Job(
+            query=query.query,
+            mode=query.mode,
+            tenant=query.tenant,
+            project=query.project,
+            user_id=query.user_id,
+        ))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "job_id": job.id,
+        "run_id": job.run_id,
+        "status": job.status.value,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.post("/run/stream")
+async def run_stream(query: Query, format: Literal["sse", "ndjson"] = "sse", tokens: bool = True):
+    """
+    Run the Singleton Pipeline and stream it as it runs: each stage's selection
+    as soon as the stage completes, and (unless tokens=false) the partial model
+    output in between. Served as server-sent events or, with format=ndjson,
+    one JSON event per line.
+
+    The run is a job like POST /run (so the queue size and worker limits
+    apply, 503 when full); if the client disconnects it still completes and
+    stays available at /jobs/{job_id}.
+    """
+    if query.mode != "singleton":
+        raise HTTPException(status_code=400, detail="Streaming is only available for the singleton pipeline")
+    try:
+        job = job_queue.submit(Job(
+            query=query.query,
+            tenant=query.tenant,
+            project=query.project,
+            user_id=query.user_id,
+            tokens=tokens,
+            # Someone is watching this run, so its calls go ahead of queued jobs and batches
+            priority=PRIORITY_HIGH,
+        ))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    events = _stream_job(job)
+    if format == "ndjson":
+        return StreamingResponse((ndjson_format(event) async for event in events), media_type="application/x-ndjson")
+    return StreamingResponse((sse_format(event) async for event in events), media_type="text/event-stream")
+
+async def _stream_job(job: Job) -> AsyncIterator[Dict[str, Any]]:
+    """A streaming job's events in the `stream_pipeline` format."""
+    yield {"event": "run_started", "run_id": job.run_id, "job_id": job.id}
+    async for event in job_queue.events(job.id):
+        if event["event"] in ("stage_started", "token", "stage_completed"):
+            yield event
+        elif event["event"] == JobStatus.succeeded.value:
+            yield {"event": "run_completed", "run_id": job.run_id, "result": job.result}
+        elif event["event"] == JobStatus.failed.value:
+            yield {"event": "run_failed", "run_id": job.run_id, "error": job.error}
+
+class Resume(BaseModel):
+    from_stage: int = Field(..., ge=1, le=5)
+    tenant: str = Field(DEFAULT_TENANT, pattern=SCOPE_NAME_PATTERN)
+    project: str = Field(DEFAULT_PROJECT, pattern=SCOPE_NAME_PATTERN)
+    user_id: str = Field(DEFAULT_USER, pattern=SCOPE_NAME_PATTERN)
+
+@app.post("/runs/{run_id}/resume", status_code=202)
+async def resume_run(run_id: str, body: Resume):
+    """
+    Queue a re-run of a previous pipeline run from `from_stage` onward.
+    Earlier stages reuse their checkpointed selections.
+    """
+    context = checkpoints.load(run_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail=f"No checkpoint found for run '{run_id}'")
+    try:
+        job = job_queue.submit(Job(
+            query=context.original_query,
+            tenant=body.tenant,
+            project=body.project,
+            user_id=body.user_id,
+            run_id=run_id,
+            from_stage=body.from_stage,
+        ))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "job_id": job.id,
+        "run_id": run_id,
+        "status": job.status.value,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """
+    Current status, stage and (once finished) result of a job.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent stream of a job's progress (queued, stage_started, stage_completed, ...).
+    Partial model output (token events) is only sent while the client is connected.
+    """
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    async def stream():
+        async for event in job_queue.events(job_id):
+            yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get("/jobs")
+async def jobs_stats():
+    """
+    Queue depth and job counts by status.
+    """
+    return job_queue.stats()
+
+@app.get("/prompts/stats")
+def prompt_stats():
+    """
+    Prompt registry cache statistics (hits, misses, cached slugs).
+    """
+    return prompt_registry.stats()
+
+@app.get("/db/pool")
+def db_pool_stats():
+    """
+    Shared database pool metrics (checkouts, wait time, live pool state).
+    """
+    return get_pool_metrics()
+
+@app.get("/llm/stats")
+def llm_call_stats():
+    """
+    Model call latency histograms, retry/hedge counters and circuit states per model and stage.
+    """
+    return llm_stats()
+
+@app.get("/context")
+def context_budget():
+    """
+    Context tokens in and kept per stage and source (team history, member replies, memories, documents, prompt).
+    """
+    return context_budget_stats()
+
+@app.get("/ratelimits")
+def rate_limits():
+    """
+    Shared rate limiters per provider and tool (rate, burst, waiting callers, throttled calls, 429 penalties).
+    """
+    return rate_limit_stats()
+
+@app.get("/tools/cache")
+def tool_cache_statistics():
+    """
+    Tool-result cache hits, misses and shared in-flight calls per tool.
+    """
+    return tool_cache_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus metrics: stage, agent, model, tool and knowledge-base span durations, model tokens and cost.
+    """
+    return PlainTextResponse(prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/telemetry")
+def telemetry_summary():
+    """
+    Span counts, errors and p50/p95 durations per stage, agent, model and tool call; token usage per model and stage.
+    """
+    return telemetry_stats()
+
+@app.get("/kb/writes")
+def kb_write_stats():
+    """
+    Write-behind queue for agent findings (pending, batches and documents written).
+    """
+    return findings_writer.stats()
 
-@app.post("/run")
-def run(query: Query):
+@app.get("/tenants/{tenant}/memories")
+def tenant_memories(tenant: str, project: Optional[str] = None):
     """
-    Run the full Civic Remediation Pipeline.
+    Stored memories per user of a tenant (or of one of its projects).
     """
-    result = run_pipeline(query.query)
-    return {"result": result}
+    from app.knowledge.memory import memory_owners
+    try:
+        prefix = tenant_prefix(tenant, project)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"tenant": tenant, "project": project, "owners": memory_owners(prefix)}
 
 if __name__ == "__main__":
     print("Starting server... Open http://localhost:8000/docs to play with the agent.")
@@ -0,0 +1,123 @@
+"""
+Streaming output for the Singleton Pipeline.
+
+`stream_pipeline` runs the pipeline in a background thread and yields events
+as they happen: each stage's `Selected*` model as soon as that stage
+completes, and the partial text of the LLM call a stage is waiting on.
+The same events are served as SSE or NDJSON by the API (POST /run/stream)
+and printed live by the CLI (`python -m app.main "<query>" stream`).
+
+Events are dicts with an "event" key:
+    run_started      run_id
+    stage_started    stage, field
+    token            stage, field, delta     (partial model output)
+    stage_completed  stage, field, selection (the Selected* model), replayed
+    run_completed    run_id, result          (the RemediationBlueprint)
+    run_failed       run_id, error
+"""
+import contextvars
+import json
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from uuid import uuid4
+
+from agno.run.base import RunStatus
+from pydantic import BaseModel
+
+StageChannel = Callable[[Dict[str, Any]], None]
+
+# run id -> (event sink, whether the consumer wants token events)
+_channels: Dict[str, Tuple[StageChannel, bool]] = {}
+_channels_lock = threading.Lock()
+_DONE = object()
+
+
+def stage_channel(run_id: Optional[str]) -> Optional[StageChannel]:
+    """The event sink of a streamed run, or None when nobody is streaming it."""
+    with _channels_lock:
+        registered = _channels.get(run_id)
+    return registered[0] if registered else None
+
+
+def streams_tokens(run_id: Optional[str]) -> bool:
+    """Whether a streamed run's consumer wants model tokens (only then are its calls streamed)."""
+    with _channels_lock:
+        registered = _channels.get(run_id)
+    return bool(registered and registered[1])
+
+
+def stream_pipeline(
+    query: str,
+    user_id: str = "civic-system",
+    session_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+    from_stage: Optional[int] = None,
+    tokens: bool = True,
+    priority: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run the Singleton Pipeline and yield its events as they happen.
+
+    With `from_stage`, resumes `run_id` instead (earlier stages are replayed
+    from their checkpoints and reported with `replayed=True`). Set `tokens`
+    to False to receive only stage and run events; model calls are then made
+    without streaming. `priority` is the run's
+    place in the shared rate-limit queues (app.utils.ratelimit). If the
+    consumer stops early, the run still completes in the background.
+    """
+    from app.utils.ratelimit import request_priority
+    from app.workflow import get_singleton_pipeline, resume
+
+    run_id = run_id or str(uuid4())
+    session_id = session_id or str(uuid4())
+    events: "queue.Queue[Any]" = queue.Queue()
+
+    def channel(event: Dict[str, Any]) -> None:
+        events.put(event)
+
+    def run() -> None:
+        try:
+            with request_priority(priority) if priority is not None else nullcontext():
+                if from_stage:
+                    response = resume(run_id, from_stage, user_id=user_id, session_id=session_id)
+                else:
+                    response = get_singleton_pipeline().run(query, run_id=run_id, user_id=user_id, session_id=session_id)
+            if response.status == RunStatus.error:
+                events.put({"event": "run_failed", "run_id": run_id, "error": str(response.content)})
+            else:
+                events.put({"event": "run_completed", "run_id": run_id, "result": response.content})
+        except Exception as e:
+            events.put({"event": "run_failed", "run_id": run_id, "error": str(e)})
+        finally:
+            with _channels_lock:
+                _channels.pop(run_id, None)
+            events.put(_DONE)
+
+    with _channels_lock:
+        _channels[run_id] = (channel, tokens)
+    yield {"event": "run_started", "run_id": run_id}
+    # A copy of the caller's context, so its request priority reaches the model calls
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), name=f"pipeline-stream-{run_id[:8]}", daemon=True).start()
+    while (event := events.get()) is not _DONE:
+        yield event
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def event_json(event: Dict[str, Any]) -> str:
+    """An event as one line of JSON (Selected* models are dumped)."""
+    return json.dumps(event, default=_jsonable, ensure_ascii=False)
+
+
+def sse_format(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {event_json(event)}\n\n"
+
+
+def ndjson_format(event: Dict[str, Any]) -> str:
+    return event_json(event) + "\n"
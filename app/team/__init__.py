@@ -1,7 +1,21 @@
 """
 Team module for Civic Remediation System.
 Provides multi-agent team coordination.
+
+Names are imported on first use, so the team (and its seven agent modules)
+is only loaded by processes that run in team mode.
 """
-from app.team.builder import create_civic_team
+from app.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "create_civic_team": "app.team.builder",
+    "get_civic_team": "app.team.builder",
+    "ParallelTeam": "app.team.parallel",
+    "create_parallel_team": "app.team.parallel",
+    "get_parallel_team": "app.team.parallel",
+    "TEAM_MODE": "app.team.parallel",
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ["create_civic_team"]
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
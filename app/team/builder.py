@@ -2,13 +2,14 @@
 Civic Remediation Team - Intelligent Agent Coordination.
 The team leader coordinates all agents and delegates tasks intelligently.
 """
-from os import getenv
+import os
+import threading
+from typing import Dict, Optional
 from agno.agent import Agent
 from agno.team import Team
-from agno.models.openai.like import OpenAILike
 
-from app.knowledge import get_shared_db, get_civic_knowledge
-from app.agents.base import POLLINATIONS_BASE_URL, DEFAULT_MODEL
+from app.knowledge import create_memory_manager, get_shared_db, get_civic_knowledge
+from app.llm import create_routed_model
 from app.agents.sentinel import SentinelAgent
 from app.agents.investigator import InvestigatorAgent
 from app.agents.bureaucrat import BureaucratAgent
@@ -18,53 +19,87 @@ from app.agents.coordinator import CoordinatorAgent
 from app.agents.liaison import LiaisonAgent
 
 
+# Team members and the members whose findings each one builds on.
+# The leader delegates in this order; parallel mode runs each dependency level at once.
+TEAM_MEMBERS = [
+    ("sentinel", SentinelAgent, ()),
+    ("investigator", InvestigatorAgent, ("sentinel",)),
+    ("bureaucrat", BureaucratAgent, ("investigator",)),
+    ("auditor", AuditorAgent, ("investigator", "bureaucrat")),
+    ("engineer", EngineerAgent, ("investigator", "bureaucrat")),
+    ("coordinator", CoordinatorAgent, ("bureaucrat", "auditor")),
+    ("liaison", LiaisonAgent, ("engineer", "auditor")),
+]
+
+# Past team runs shared with each member when the leader delegates
+TEAM_HISTORY_RUNS = int(os.getenv("TEAM_HISTORY_RUNS", "3"))
+
+TEAM_INSTRUCTIONS = [
+    "You coordinate a team of high-level specialists for civic infrastructure remediation in India.",
+    "IMPORTANT: Focus on high-level systemic failures (departments, funds, pipelines), NOT ground-level behavior.",
+    "",
+    "DELEGATION WORKFLOW:",
+    "1. Sentinel: Scout for the 'Viral Signal' (critical regional breakdown).",
+    "2. Investigator: Gather deep evidence (RTI data, reports, metrics).",
+    "3. Bureaucrat: Map the departmental bottlenecks and coordination gaps.",
+    "4. Auditor: Audit the financial flow and budget utilization.",
+    "5. Engineer: Match technical solutions to the investigated technical root causes.",
+    "6. Coordinator: Architect a high-level coordination plan to fix broken bureaucratic pipelines.",
+    "7. Liaison: Mobilize resources (funding, grants) and finalize costs.",
+    "",
+    "Synthesize these granular findings into a 'Master Remediation Blueprint' that identifies exactly who is failing, why the money is stuck, and how a joint task force can fix the root cause.",
+]
+
+
+def create_team_members(user_id: str = "civic-system") -> Dict[str, Agent]:
+    """Member agents keyed by name, in TEAM_MEMBERS order."""
+    return {name: agent_class(user_id).agent for name, agent_class, _ in TEAM_MEMBERS}
+
+
 def create_civic_team(user_id: str = "civic-system") -> Team:
     """
     Create a coordinated team of specialized civic remediation agents.
     The team uses a 7-agent structure for deep investigation and systemic solution building.
     """
     # Create individual agents
-    sentinel = SentinelAgent(user_id).agent
-    investigator = InvestigatorAgent(user_id).agent
-    bureaucrat = BureaucratAgent(user_id).agent
-    auditor = AuditorAgent(user_id).agent
-    engineer = EngineerAgent(user_id).agent
-    coordinator = CoordinatorAgent(user_id).agent
-    liaison = LiaisonAgent(user_id).agent
+    members = create_team_members(user_id)
     
     # Create the team
     team = Team(
         name="Civic Remediation Deep Team",
-        model=OpenAILike(
-            id=DEFAULT_MODEL,
-            base_url=POLLINATIONS_BASE_URL,
-            api_key=getenv("POLLINATIONS_API_KEY", "not-provided"),
-        ),
+        model=create_routed_model("team"),
         reasoning=False,
         db=get_shared_db(),
         update_memory_on_run=True,
+        memory_manager=create_memory_manager(),
         knowledge=get_civic_knowledge(),
         search_knowledge=True,
-        instructions=[
-            "You coordinate a team of high-level specialists for civic infrastructure remediation in India.",
-            "IMPORTANT: Focus on high-level systemic failures (departments, funds, pipelines), NOT ground-level behavior.",
-            "",
-            "DELEGATION WORKFLOW:",
-            "1. Sentinel: Scout for the 'Viral Signal' (critical regional breakdown).",
-            "2. Investigator: Gather deep evidence (RTI data, reports, metrics).",
-            "3. Bureaucrat: Map the departmental bottlenecks and coordination gaps.",
-            "4. Auditor: Audit the financial flow and budget utilization.",
-            "5. Engineer: Match technical solutions to the investigated technical root causes.",
-            "6. Coordinator: Architect a high-level coordination plan to fix broken bureaucratic pipelines.",
-            "7. Liaison: Mobilize resources (funding, grants) and finalize costs.",
-            "",
-            "Synthesize these granular findings into a 'Master Remediation Blueprint' that identifies exactly who is failing, why the money is stuck, and how a joint task force can fix the root cause.",
-        ],
-        members=[sentinel, investigator, bureaucrat, auditor, engineer, coordinator, liaison],
+        instructions=TEAM_INSTRUCTIONS,
+        # Copies: the team sets its id on its members, and the pooled agents also run the pipeline
+        members=[agent.deep_copy() for agent in members.values()],
         add_team_history_to_members=True,
+        num_team_history_runs=TEAM_HISTORY_RUNS,
         user_id=user_id,
         add_datetime_to_context=True,
         timezone_identifier="Etc/UTC",
     )
     
     return team
+
+
+_team: Optional[Team] = None
+_team_lock = threading.Lock()
+
+
+def get_civic_team() -> Team:
+    """
+    Return the process-wide Deep Team, building it on first use.
+    Members are copies of the pooled agents (the team marks its members as
+    its own); pass the run's scoped `user_id` and a fresh `session_id` to
+    `Team.run` to keep owners and runs isolated.
+    """
+    global _team
+    with _team_lock:
+        if _team is None:
+            _team = create_civic_team()
+        return _team
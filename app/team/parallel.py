@@ -0,0 +1,148 @@
+"""
+Parallel execution mode for the Deep Team.
+
+Instead of the leader delegating to one member at a time, the members run as
+the dependency graph declared in TEAM_MEMBERS: every member whose dependencies
+have reported is called at once (Auditor with Engineer, then Coordinator with
+Liaison), and the leader synthesizes all findings in a single final call.
+Each member sees the query plus its dependencies' findings only, each capped
+at TEAM_MEMBER_CONTEXT_CHARS, instead of the whole team history.
+
+Configuration (environment):
+    TEAM_MODE                  "delegate" (leader-driven, default) or "parallel"
+    TEAM_MAX_PARALLEL          members running at once (default 4)
+    TEAM_MEMBER_CONTEXT_CHARS  characters of each dependency's findings passed on (default 4000)
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Sequence
+from uuid import uuid4
+
+from agno.agent import Agent
+from pydantic import BaseModel
+
+from app.knowledge import create_memory_manager, get_shared_db, get_civic_knowledge
+from app.llm import create_routed_model
+from app.team.builder import TEAM_MEMBERS, TEAM_INSTRUCTIONS, create_team_members
+from app.utils.graph import dependency_levels
+
+TEAM_MODE = os.getenv("TEAM_MODE", "delegate")
+TEAM_MAX_PARALLEL = int(os.getenv("TEAM_MAX_PARALLEL", "4"))
+TEAM_MEMBER_CONTEXT_CHARS = int(os.getenv("TEAM_MEMBER_CONTEXT_CHARS", "4000"))
+
+
+def _findings_text(content: Any, limit: int) -> str:
+    if isinstance(content, BaseModel):
+        text = content.model_dump_json(indent=2)
+    elif isinstance(content, (dict, list)):
+        text = json.dumps(content, indent=2, default=str)
+    else:
+        text = str(content)
+    if limit and len(text) > limit:
+        text = text[:limit] + "\n... [truncated]"
+    return text
+
+
+class ParallelTeam:
+    """
+    Runs team members level by level over their dependency graph, then asks
+    the leader to synthesize the collected findings.
+
+    Args:
+        members: Member agents keyed by name
+        dependencies: Names of the members whose findings each member needs
+        leader: Agent that writes the final blueprint from all findings
+        max_parallel: Members running at once
+        context_chars: Cap on each dependency's findings passed to a member (0 = no cap)
+    """
+
+    def __init__(
+        self,
+        members: Dict[str, Agent],
+        dependencies: Dict[str, Sequence[str]],
+        leader: Agent,
+        max_parallel: int = TEAM_MAX_PARALLEL,
+        context_chars: int = TEAM_MEMBER_CONTEXT_CHARS,
+    ):
+        self.members = members
+        self.dependencies = dependencies
+        self.levels = dependency_levels(dependencies)
+        self.leader = leader
+        self.max_parallel = max_parallel
+        self.context_chars = context_chars
+
+    def member_message(self, name: str, query: str, findings: Dict[str, Any]) -> str:
+        """The query plus the (capped) findings of the members `name` depends on."""
+        parts = [f"Task: {query}"]
+        for dep in self.dependencies[name]:
+            parts.append(f"Findings from {self.members[dep].name}:\n{_findings_text(findings[dep], self.context_chars)}")
+        return "\n\n".join(parts)
+
+    def _run_member(self, name: str, query: str, findings: Dict[str, Any], user_id: str, session_id: str) -> Any:
+        message = self.member_message(name, query, findings)
+        try:
+            # Members get their own session so concurrent runs never write the same row
+            response = self.members[name].run(message, user_id=user_id, session_id=f"{session_id}:{name}")
+            return response.content
+        except Exception as e:
+            print(f"Warning: Team member '{name}' failed: {e}")
+            return f"(no findings: {e})"
+
+    def run(self, query: str, user_id: str = "civic-system", session_id: Optional[str] = None):
+        """Run every member, then return the leader's synthesis (a RunOutput)."""
+        session_id = session_id or str(uuid4())
+        findings: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            for level in self.levels:
+                futures = {
+                    name: pool.submit(self._run_member, name, query, findings, user_id, session_id)
+                    for name in level
+                }
+                for name, future in futures.items():
+                    findings[name] = future.result()
+
+        report = [f"Task: {query}"] + [
+            f"Findings from {self.members[name].name}:\n{_findings_text(content, 0)}"
+            for name, content in findings.items()
+        ]
+        return self.leader.run("\n\n".join(report), user_id=user_id, session_id=session_id)
+
+
+def create_parallel_team(user_id: str = "civic-system") -> ParallelTeam:
+    """Build the Deep Team in parallel mode, with a leader that only synthesizes."""
+    leader = Agent(
+        name="Civic Remediation Deep Team",
+        model=create_routed_model("team"),
+        db=get_shared_db(),
+        update_memory_on_run=True,
+        memory_manager=create_memory_manager(),
+        knowledge=get_civic_knowledge(),
+        search_knowledge=True,
+        instructions=TEAM_INSTRUCTIONS + [
+            "",
+            "Every specialist has already reported; their findings are in the message. Do not ask for more.",
+        ],
+        user_id=user_id,
+        add_datetime_to_context=True,
+        timezone_identifier="Etc/UTC",
+    )
+    return ParallelTeam(
+        members=create_team_members(user_id),
+        dependencies={name: depends_on for name, _, depends_on in TEAM_MEMBERS},
+        leader=leader,
+    )
+
+
+_parallel_team: Optional[ParallelTeam] = None
+_parallel_team_lock = threading.Lock()
+
+
+def get_parallel_team() -> ParallelTeam:
+    """Return the process-wide parallel-mode team, building it on first use; runs are scoped by `run`'s `user_id`."""
+    global _parallel_team
+    with _parallel_team_lock:
+        if _parallel_team is None:
+            _parallel_team = create_parallel_team()
+        return _parallel_team
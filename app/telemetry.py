@@ -0,0 +1,344 @@
+"""
+Spans and metrics for pipeline stages, agent runs, model calls, tool calls
+and knowledge-base reads and writes.
+
+A span times one step. On finish its duration goes into a histogram per
+(kind, name), served in the Prometheus text format at GET /metrics and
+summarized as p50/p95 by `telemetry_stats()`. Model-call spans also record
+token usage and, for priced models, cost. Finished spans can be appended to
+a JSONL file and mirrored to OpenTelemetry. Spans nest: a model call made
+inside a stage is that stage's child, and every span of a pipeline run
+shares the run id as its trace id.
+
+Span kinds:
+    stage   a pipeline step (app.workflow)
+    agent   an Agent.run call
+    llm     a model request (cache hits never reach the model)
+    tool    a tool call (ParallelTools search/extract)
+    kb      knowledge-base persistence and search
+    db      knowledge-base writes
+
+Configuration (environment):
+    TELEMETRY             "off" makes every span a no-op (default on)
+    TELEMETRY_JSONL       file that finished spans are appended to (default: none)
+    TELEMETRY_OTEL        "on" also opens an OpenTelemetry span per span; needs
+                          opentelemetry-api and a tracer provider set up by the host
+    LLM_PRICE_<MODEL>     "input,output" USD per million tokens, enabling cost
+                          metrics for that model, e.g. LLM_PRICE_OPENAI_FAST=0.05,0.4
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from app.llm.resilience import LatencyHistogram
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "on").lower() not in ("0", "off", "false", "no")
+TELEMETRY_JSONL = os.getenv("TELEMETRY_JSONL") or None
+TELEMETRY_OTEL = os.getenv("TELEMETRY_OTEL", "off").lower() in ("1", "on", "true", "yes")
+
+# Histogram bucket upper bounds (seconds); tool and database spans are much shorter than model calls
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+_current: ContextVar[Optional["Span"]] = ContextVar("telemetry_span", default=None)
+
+
+class Span:
+    """One timed step; use as a context manager (or `start()` / `finish()`)."""
+
+    __slots__ = ("kind", "name", "attributes", "trace_id", "span_id", "parent_id", "started_at", "duration",
+                 "status", "_started", "_token", "_otel")
+
+    def __init__(self, kind: str, name: str, attributes: Dict[str, Any]):
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.trace_id: Optional[str] = attributes.pop("trace_id", None)
+        self.span_id = uuid4().hex[:16]
+        self.parent_id: Optional[str] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.status = "ok"
+        self._started = 0.0
+        self._token: Any = None
+        self._otel: Any = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def start(self) -> "Span":
+        parent = _current.get()
+        if parent is not None:
+            self.parent_id = parent.span_id
+            self.trace_id = self.trace_id or parent.trace_id
+        self.trace_id = self.trace_id or uuid4().hex
+        self._token = _current.set(self)
+        if TELEMETRY_OTEL:
+            self._otel = _otel_start(self)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = type(error).__name__
+        _current.reset(self._token)
+        if self._otel is not None:
+            _otel_finish(self, error)
+        metrics.observe(self)
+        if TELEMETRY_JSONL:
+            _export(self)
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": round(self.started_at, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.finish(exc)
+        return False
+
+
+class _NoSpan:
+    """Stands in for a span while telemetry is off."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def start(self) -> "_NoSpan":
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(kind: str, name: str, **attributes: Any) -> Any:
+    """A span for one step; `trace_id` sets the trace of a root span."""
+    if not TELEMETRY_ENABLED:
+        return _NO_SPAN
+    return Span(kind, name, attributes)
+
+
+def current_span() -> Any:
+    """The innermost open span (a no-op span when there is none)."""
+    return _current.get() or _NO_SPAN
+
+
+def traced(kind: str, name: Optional[str] = None) -> Callable:
+    """Decorator: run the function inside a span (named after the function by default)."""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not TELEMETRY_ENABLED:
+                return fn(*args, **kwargs)
+            with Span(kind, span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def telemetry_tool_hook(function_name: str, function_call: Callable, arguments: Dict[str, Any]) -> Any:
+    """Agno tool hook: each tool call is a "tool" span."""
+    with span("tool", function_name):
+        return function_call(**arguments)
+
+
+def model_price(model_id: str) -> Optional[Tuple[float, float]]:
+    """(input, output) USD per million tokens from LLM_PRICE_<MODEL>, or None if unpriced."""
+    value = os.getenv(f"LLM_PRICE_{re.sub(r'[^A-Za-z0-9]', '_', model_id).upper()}")
+    if not value:
+        return None
+    prices = [float(part) for part in value.split(",")]
+    return prices[0], prices[-1]
+
+
+def record_llm_usage(model_id: str, stage: Optional[str], input_tokens: int, output_tokens: int) -> None:
+    """Count a model call's tokens (and cost) against its model and stage."""
+    if not TELEMETRY_ENABLED:
+        return
+    cost = None
+    price = model_price(model_id)
+    if price is not None:
+        cost = (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+    current_span().set(input_tokens=input_tokens, output_tokens=output_tokens, **({"cost_usd": cost} if cost is not None else {}))
+    metrics.add_usage(model_id, stage or "", input_tokens, output_tokens, cost)
+
+
+class Metrics:
+    """Span duration histograms, span counts and model usage totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.counts: Dict[Tuple[str, str, str], int] = {}
+        self.tokens: Dict[Tuple[str, str, str], int] = {}
+        self.cost: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, finished: Span) -> None:
+        key = (finished.kind, finished.name)
+        with self._lock:
+            histogram = self.durations.get(key)
+            if histogram is None:
+                histogram = self.durations[key] = LatencyHistogram(SPAN_BUCKETS)
+            count_key = key + (finished.status,)
+            self.counts[count_key] = self.counts.get(count_key, 0) + 1
+        histogram.record(finished.duration)
+
+    def add_usage(self, model_id: str, stage: str, input_tokens: int, output_tokens: int, cost: Optional[float]) -> None:
+        with self._lock:
+            for direction, tokens in (("input", input_tokens), ("output", output_tokens)):
+                key = (model_id, stage, direction)
+                self.tokens[key] = self.tokens.get(key, 0) + tokens
+            if cost is not None:
+                self.cost[(model_id, stage)] = self.cost.get((model_id, stage), 0.0) + cost
+
+    def reset(self) -> None:
+        with self._lock:
+            self.durations.clear()
+            self.counts.clear()
+            self.tokens.clear()
+            self.cost.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            durations = dict(self.durations)
+            counts = dict(self.counts)
+            tokens = dict(self.tokens)
+            cost = dict(self.cost)
+        spans = {}
+        for (kind, name), histogram in sorted(durations.items()):
+            snapshot = histogram.snapshot()
+            spans[f"{kind}/{name}"] = {
+                "count": snapshot["count"],
+                "errors": counts.get((kind, name, "error"), 0),
+                "sum": snapshot["sum"],
+                "p50": snapshot["p50"],
+                "p95": snapshot["p95"],
+            }
+        usage: Dict[str, Dict[str, Any]] = {}
+        for (model_id, stage, direction), count in sorted(tokens.items()):
+            entry = usage.setdefault(f"{model_id}/{stage}", {"input_tokens": 0, "output_tokens": 0})
+            entry[f"{direction}_tokens"] = count
+        for (model_id, stage), total in cost.items():
+            usage[f"{model_id}/{stage}"]["cost_usd"] = round(total, 6)
+        return {"enabled": TELEMETRY_ENABLED, "spans": spans, "llm_usage": usage}
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            durations = sorted(self.durations.items())
+            counts = sorted(self.counts.items())
+            tokens = sorted(self.tokens.items())
+            cost = sorted(self.cost.items())
+        lines: List[str] = [
+            "# HELP civic_span_duration_seconds Duration of pipeline stages, agent runs, model and tool calls, KB reads and writes.",
+            "# TYPE civic_span_duration_seconds histogram",
+        ]
+        for (kind, name), histogram in durations:
+            snapshot = histogram.snapshot()
+            labels = f'kind="{kind}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, count in snapshot["buckets"].items():
+                cumulative += count
+                lines.append(f'civic_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"civic_span_duration_seconds_sum{{{labels}}} {snapshot['sum']}")
+            lines.append(f"civic_span_duration_seconds_count{{{labels}}} {snapshot['count']}")
+        lines += ["# HELP civic_spans_total Finished spans by status.", "# TYPE civic_spans_total counter"]
+        for (kind, name, status), count in counts:
+            lines.append(f'civic_spans_total{{kind="{kind}",name="{_label(name)}",status="{status}"}} {count}')
+        lines += ["# HELP civic_llm_tokens_total Model tokens by model, stage and direction.", "# TYPE civic_llm_tokens_total counter"]
+        for (model_id, stage, direction), count in tokens:
+            lines.append(f'civic_llm_tokens_total{{model="{_label(model_id)}",stage="{_label(stage)}",direction="{direction}"}} {count}')
+        lines += ["# HELP civic_llm_cost_usd_total Model cost in USD for priced models (LLM_PRICE_<MODEL>).", "# TYPE civic_llm_cost_usd_total counter"]
+        for (model_id, stage), total in cost:
+            lines.append(f'civic_llm_cost_usd_total{{model="{_label(model_id)}",stage="{_label(stage)}"}} {total:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+def telemetry_stats() -> Dict[str, Any]:
+    return metrics.stats()
+
+
+def prometheus_metrics() -> str:
+    return metrics.prometheus()
+
+
+_export_lock = threading.Lock()
+_export_file: Any = None
+
+
+def _export(finished: Span) -> None:
+    global _export_file
+    line = json.dumps(finished.record(), ensure_ascii=False, default=str) + "\n"
+    with _export_lock:
+        if _export_file is None:
+            os.makedirs(os.path.dirname(TELEMETRY_JSONL) or ".", exist_ok=True)
+            _export_file = open(TELEMETRY_JSONL, "a", encoding="utf-8", buffering=1)
+        _export_file.write(line)
+
+
+_tracer: Any = None
+
+
+def _otel_start(opened: Span) -> Any:
+    global _tracer, TELEMETRY_OTEL
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            print("Warning: TELEMETRY_OTEL is on but opentelemetry-api is not installed; OpenTelemetry export disabled")
+            TELEMETRY_OTEL = False
+            return None
+        _tracer = trace.get_tracer("civic-remediation")
+    scope = _tracer.start_as_current_span(f"{opened.kind} {opened.name}", attributes={"civic.kind": opened.kind})
+    scope.__enter__()
+    return scope
+
+
+def _otel_finish(finished: Span, error: Optional[BaseException]) -> None:
+    from opentelemetry import trace
+
+    otel_span = trace.get_current_span()
+    for key, value in finished.attributes.items():
+        if isinstance(value, (str, bool, int, float)):
+            otel_span.set_attribute(f"civic.{key}", value)
+    if error is not None:
+        finished._otel.__exit__(type(error), error, error.__traceback__)
+    else:
+        finished._otel.__exit__(None, None, None)
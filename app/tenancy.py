@@ -0,0 +1,87 @@
+"""
+Tenant, project and user scoping for memories and sessions.
+
+Every run belongs to a user within a project within a tenant. Agno keys
+memories and sessions on a single `user_id`, so the three are folded into
+one memory owner, "tenant:project:user"; session ids get the same
+"tenant:project:" prefix so two tenants never share a session row. Both
+prefixes are indexed (see `app.knowledge.memory.create_memory_indexes`), so
+one tenant's or project's rows can be listed, capped or purged without
+scanning anyone else's.
+
+Configuration (environment):
+    CIVIC_TENANT    tenant for runs that do not name one (default "default")
+    CIVIC_PROJECT   project for runs that do not name one (default "default")
+    CIVIC_USER      user for CLI runs (default "civic-system")
+"""
+import argparse
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+DEFAULT_TENANT = os.getenv("CIVIC_TENANT", "default")
+DEFAULT_PROJECT = os.getenv("CIVIC_PROJECT", "default")
+DEFAULT_USER = os.getenv("CIVIC_USER", "civic-system")
+
+# Tenant, project and user names; ":" is reserved as the owner separator
+SCOPE_NAME_PATTERN = r"^[A-Za-z0-9_.@-]{1,64}$"
+_SCOPE_NAME = re.compile(SCOPE_NAME_PATTERN)
+
+
+@dataclass(frozen=True)
+class Scope:
+    """Who a run belongs to: `user` within `project` within `tenant`."""
+    tenant: str = DEFAULT_TENANT
+    project: str = DEFAULT_PROJECT
+    user: str = DEFAULT_USER
+
+    def __post_init__(self):
+        for part in ("tenant", "project", "user"):
+            if not _SCOPE_NAME.match(getattr(self, part)):
+                raise ValueError(f"Invalid {part} '{getattr(self, part)}' (letters, digits and _.@- only)")
+
+    @property
+    def prefix(self) -> str:
+        """Shared by every memory owner and session id of this tenant and project."""
+        return f"{self.tenant}:{self.project}:"
+
+    @property
+    def user_id(self) -> str:
+        """The memory owner passed to agno as `user_id`."""
+        return f"{self.prefix}{self.user}"
+
+    def session_id(self, session_id: Optional[str] = None) -> str:
+        """A session id under this scope (a fresh one if omitted); scoped ids are returned unchanged."""
+        session_id = session_id or str(uuid4())
+        return session_id if session_id.startswith(self.prefix) else f"{self.prefix}{session_id}"
+
+    @classmethod
+    def from_user_id(cls, user_id: str) -> "Scope":
+        """Inverse of `user_id`; an unscoped id is a user of the default tenant and project."""
+        parts = user_id.split(":")
+        return cls(*parts) if len(parts) == 3 else cls(user=user_id)
+
+
+def tenant_prefix(tenant: str, project: Optional[str] = None) -> str:
+    """Owner/session prefix matching a whole tenant, or one project within it."""
+    for name in (tenant, project) if project else (tenant,):
+        if not _SCOPE_NAME.match(name):
+            raise ValueError(f"Invalid scope name '{name}'")
+    return f"{tenant}:{project}:" if project else f"{tenant}:"
+
+
+def add_scope_arguments(parser: argparse.ArgumentParser) -> None:
+    """The --tenant / --project / --user options shared by the CLIs."""
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant the run belongs to")
+    parser.add_argument("--project", default=DEFAULT_PROJECT, help="Project within the tenant")
+    parser.add_argument("--user", default=DEFAULT_USER, help="User within the project")
+
+
+def parse_scope(argv: List[str]) -> Tuple[Scope, List[str]]:
+    """Take the scope options out of `argv`; returns the scope and the remaining arguments."""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_scope_arguments(parser)
+    args, rest = parser.parse_known_args(argv)
+    return Scope(args.tenant, args.project, args.user), rest
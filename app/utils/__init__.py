@@ -1,7 +1,21 @@
 """
 Utilities module for Civic Remediation System.
 Provides common utility functions (prompts, helpers, etc.).
+
+Names are imported on first use (see app/utils/lazy.py), so modules that
+only need the cache or rate limiter do not load the prompt registry.
 """
-from app.utils.prompts import get_agent_prompt, LocalPrompt
+from app.utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "get_agent_prompt": "app.utils.prompts",
+    "warm_prompts": "app.utils.prompts",
+    "prompt_registry": "app.utils.prompts",
+    "PromptRegistry": "app.utils.prompts",
+    "LocalPrompt": "app.utils.prompts",
+    "PromptMessage": "app.utils.prompts",
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ["get_agent_prompt", "LocalPrompt"]
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,161 @@
+"""
+Two-tier cache used for LLM responses and other expensive, repeatable calls.
+
+Values live in an in-memory LRU (per process) backed by a SQLite file on disk
+(shared by every process on the machine). Keys are content hashes built with
+`cache_key`, values are anything JSON-serializable.
+
+Location is controlled by CIVIC_CACHE_DIR (default `.civic/cache`).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_DIR = os.getenv("CIVIC_CACHE_DIR", os.path.join(".civic", "cache"))
+
+_MISSING = object()
+
+
+def cache_key(*parts: Any) -> str:
+    """Content-address a set of values (order matters, dict keys do not)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of a SQLite table.
+
+    Both tiers hold the JSON encoding, so callers always get a fresh copy they
+    are free to mutate.
+
+    Args:
+        name: Cache namespace; also the SQLite file name (`<name>.sqlite3`)
+        directory: Where the SQLite file lives (None keeps the cache memory-only)
+        max_memory_items: LRU capacity of the in-memory tier
+        default_ttl: Seconds before entries expire (None = never)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Optional[str] = CACHE_DIR,
+        max_memory_items: int = 256,
+        default_ttl: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_memory_items = max_memory_items
+        self.default_ttl = default_ttl
+        self.path = os.path.join(directory, f"{name}.sqlite3") if directory else None
+        self._memory: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or `default` if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                raw, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return json.loads(raw)
+                del self._memory[key]
+
+            db = self._db()
+            if db is not None:
+                row = db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    raw, expires_at = row
+                    if expires_at is None or expires_at > now:
+                        self._remember(key, raw, expires_at)
+                        self.disk_hits += 1
+                        return json.loads(raw)
+                    db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    db.commit()
+
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _MISSING) -> None:  # type: ignore[assignment]
+        """Store a value; `ttl` overrides the cache default (None = never expire)."""
+        ttl = self.default_ttl if ttl is _MISSING else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        raw = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            self._remember(key, raw, expires_at)
+            db = self._db()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, raw, now, expires_at),
+                )
+                db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM cache")
+                db.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from disk; returns how many were removed."""
+        with self._lock:
+            db = self._db()
+            if db is None:
+                return 0
+            cursor = db.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "memory_items": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def _remember(self, key: str, raw: str, expires_at: Optional[float]) -> None:
+        self._memory[key] = (raw, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
@@ -0,0 +1,28 @@
+"""
+Dependency-graph helpers shared by the pipeline and the Deep Team.
+"""
+from typing import Iterable, List, Mapping
+
+
+def dependency_levels(dependencies: Mapping[str, Iterable[str]]) -> List[List[str]]:
+    """
+    Group nodes into levels: every node only depends on nodes from earlier
+    levels, so the nodes of one level can run at the same time.
+
+    `dependencies` maps each node to the nodes it needs, in declaration order;
+    a node may only depend on nodes declared before it (which rules out cycles).
+    Order within a level follows declaration order.
+    """
+    level_of = {}
+    levels: List[List[str]] = []
+    for node, depends_on in dependencies.items():
+        depends_on = list(depends_on)
+        unknown = [dep for dep in depends_on if dep not in level_of]
+        if unknown:
+            raise ValueError(f"'{node}' depends on {unknown}, which must be declared before it")
+        level = max((level_of[dep] + 1 for dep in depends_on), default=0)
+        level_of[node] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(node)
+    return levels
@@ -0,0 +1,37 @@
+"""
+Lazy package exports.
+
+Package `__init__` modules re-export their public names without importing the
+submodules behind them: a name's submodule is imported the first time the
+name is read. Importing `app.knowledge` therefore no longer loads PgVector,
+Gemini and psycopg unless something actually uses the knowledge base.
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Module `__getattr__` and `__dir__` for a package whose names live in submodules.
+
+    Args:
+        package: The package's `__name__`
+        exports: Public name -> module defining it
+
+    Usage (in a package `__init__`):
+        __getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+    """
+    def __getattr__(name: str) -> Any:
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module), name)
+        # Later reads skip __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
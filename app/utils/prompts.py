@@ -1,56 +1,260 @@
 import yaml
 import os
-import langwatch.prompts
-from typing import List, Dict, Any
+import re
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Iterable
+from pydantic import BaseModel
+
+# Local prompt sources and the LangWatch CLI config listing the synced slugs
+PROMPTS_DIR = "prompts"
+PROMPT_CONFIG_FILES = ("prompts-lock.json", "prompts.json")
+# Seconds before a cached prompt is re-validated (0 disables expiry)
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "300"))
+# Jinja2-style placeholder: {{ key }} / {{key}}
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class PromptMessage:
+    """A rendered prompt message exposing `.role` and `.content` (what agents read)."""
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+
+
+def _to_text(value: Any) -> str:
+    """Render a template value; models and containers become JSON."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, BaseModel):
+        return value.model_dump_json(indent=2)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, indent=2, ensure_ascii=False, default=str)
+    if value is None:
+        return ""
+    return str(value)
+
+
+class CompiledTemplate:
+    """
+    A message template pre-split on its {{ key }} placeholders.
+
+    `parts` alternates literal text and placeholder names (even indexes are
+    literals), so rendering is a single join with no rescanning of the text.
+    Placeholders without a value are left as written.
+    """
+    __slots__ = ("parts", "keys")
+
+    def __init__(self, source: str):
+        self.parts = _PLACEHOLDER.split(source)
+        self.keys = frozenset(self.parts[1::2])
+
+    def render(self, values: Dict[str, Any]) -> str:
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0]
+        out = []
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                out.append(part)
+            elif part in values:
+                out.append(_to_text(values[part]))
+            else:
+                out.append(f"{{{{ {part} }}}}")
+        return "".join(out)
+
 
 class LocalPrompt:
-    """Fallback class for local prompts when LangWatch sync fails."""
-    def __init__(self, slug: str, messages: List[Dict[str, Any]]):
+    """
+    Prompt backed by compiled message templates.
+    Used for local YAML prompts and for prompts fetched from LangWatch.
+    `model` is the prompt's `model:` field (a model tier or id, see app.llm.routing).
+    """
+    def __init__(self, slug: str, messages: List[Dict[str, Any]], version: Optional[int] = None, model: Optional[str] = None):
         self.slug = slug
         self.messages = messages
+        self.version = version
+        self.model = model
+        self._templates = [
+            (msg.get("role"), CompiledTemplate(msg.get("content") or ""))
+            for msg in messages
+        ]
 
-    def format(self, **kwargs) -> List[Any]:
-        """Simple format implementation replacing {{ key }} with value."""
-        formatted_messages = []
-        for msg in self.messages:
-            content = msg.get("content", "")
-            role = msg.get("role")
-            
-            # Simple Jinja2-style replacement
-            for key, value in kwargs.items():
-                if isinstance(value, str):
-                   content = content.replace(f"{{{{ {key} }}}}", value)
-                   content = content.replace(f"{{{{{key}}}}}", value)
-            
-            # Create a simple object that mimics what Agno expects (usually an object with role/content attributes)
-            # Or Agno expects a dict? SentinelAgent converts to dict:
-            # formatted_messages = [{"role": m.role, "content": m.content} for m in messages]
-            # So the object returned by format() must have .role and .content attributes.
-            
-            class MessageObj:
-                def __init__(self, r, c):
-                    self.role = r
-                    self.content = c
-            
-            formatted_messages.append(MessageObj(role, content))
-            
-        return formatted_messages
+    def format(self, **kwargs) -> List[PromptMessage]:
+        """Render every message in one pass; non-string values are serialized (JSON for models)."""
+        return [PromptMessage(role, template.render(kwargs)) for role, template in self._templates]
 
-def get_agent_prompt(slug: str):
+
+class _CachedPrompt:
+    """A loaded prompt plus the data needed to decide when it is stale."""
+    __slots__ = ("prompt", "source", "loaded_at", "mtime", "version")
+
+    def __init__(self, prompt: Any, source: str, mtime: Optional[float] = None, version: Optional[int] = None):
+        self.prompt = prompt
+        self.source = source
+        self.loaded_at = time.monotonic()
+        self.mtime = mtime
+        self.version = version
+
+
+class PromptRegistry:
     """
-    Get prompt from LangWatch, or fallback to local YAML if not found/synced.
+    Process-wide cache of agent prompts.
+
+    Prompts are loaded once (LangWatch first, local YAML as fallback) and served
+    from memory afterwards. An entry is re-validated when its TTL expires or when
+    the backing YAML file changes on disk; a re-fetched LangWatch prompt with an
+    unchanged version keeps the cached object.
+
+    Loads run outside the registry lock, so a slow LangWatch fetch only holds
+    up callers waiting for that same slug; they share its single in-flight load.
     """
-    try:
-        # Try fetching from LangWatch (requires successful sync)
-        return langwatch.prompts.get(slug)
-    except (ValueError, Exception) as e:
-        print(f"Warning: Could not load prompt '{slug}' from LangWatch ({e}). Falling back to local YAML.")
-        
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, ttl: float = PROMPT_CACHE_TTL):
+        self.prompts_dir = prompts_dir
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, _CachedPrompt] = {}
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+
+    def get(self, slug: str) -> Any:
+        """Return the prompt for `slug`, loading it on first use or when stale."""
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is not None and not self._is_stale(entry):
+                self.hits += 1
+                return entry.prompt
+            self.misses += 1
+        return self._refresh(slug).prompt
+
+    def _refresh(self, slug: str) -> _CachedPrompt:
+        """Load `slug` and cache it, or wait for the load already in flight."""
+        with self._lock:
+            loading = self._loading.get(slug)
+            owner = loading is None
+            if owner:
+                loading = self._loading[slug] = Future()
+                previous = self._entries.get(slug)
+        if not owner:
+            return loading.result()
+        try:
+            entry = self._load(slug, previous=previous)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(slug, None)
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[slug] = entry
+            self._loading.pop(slug, None)
+        loading.set_result(entry)
+        return entry
+
+    def warm(self, slugs: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Load prompts ahead of time (defaults to every configured slug).
+        Slugs that cannot be loaded are skipped; returns the slugs now cached.
+        """
+        loaded = []
+        for slug in (slugs if slugs is not None else self.configured_slugs()):
+            try:
+                self._refresh(slug)
+                loaded.append(slug)
+            except RuntimeError as e:
+                print(f"Warning: Skipping prompt '{slug}' during warm-up ({e}).")
+        return loaded
+
+    def invalidate(self, slug: Optional[str] = None) -> None:
+        """Drop one cached prompt, or all of them."""
+        with self._lock:
+            if slug is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(slug, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and the slugs currently held."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "slugs": sorted(self._entries),
+            }
+
+    def configured_slugs(self) -> List[str]:
+        """Slugs from the LangWatch prompt config/lockfile plus local YAML prompts."""
+        slugs: List[str] = []
+        for config_file in PROMPT_CONFIG_FILES:
+            try:
+                with open(config_file, "r") as f:
+                    slugs.extend(json.load(f).get("prompts", {}))
+            except (OSError, ValueError):
+                continue
+        if os.path.isdir(self.prompts_dir):
+            slugs.extend(
+                name[:-len(".yaml")]
+                for name in sorted(os.listdir(self.prompts_dir))
+                if name.endswith(".yaml")
+            )
+        return list(dict.fromkeys(slugs))
+
+    def _yaml_path(self, slug: str) -> str:
+        return os.path.join(self.prompts_dir, f"{slug}.yaml")
+
+    def _is_stale(self, entry: _CachedPrompt) -> bool:
+        if entry.source == "local":
+            try:
+                if os.path.getmtime(self._yaml_path(entry.prompt.slug)) != entry.mtime:
+                    return True
+            except OSError:
+                return True
+        return self.ttl > 0 and time.monotonic() - entry.loaded_at > self.ttl
+
+    def _load(self, slug: str, previous: Optional[_CachedPrompt] = None) -> _CachedPrompt:
+        try:
+            # Try fetching from LangWatch (requires successful sync); imported here as it is slow to load
+            import langwatch.prompts
+            prompt = langwatch.prompts.get(slug)
+            version = getattr(prompt, "version", None)
+            if previous is not None and previous.source == "langwatch" and version is not None and version == previous.version:
+                return _CachedPrompt(previous.prompt, "langwatch", version=version)
+            # Compile the fetched messages once so rendering never goes back through LangWatch
+            compiled = LocalPrompt(slug, list(prompt.messages or []), version=version, model=getattr(prompt, "model", None))
+            return _CachedPrompt(compiled, "langwatch", version=version)
+        except (ValueError, Exception) as e:
+            print(f"Warning: Could not load prompt '{slug}' from LangWatch ({e}). Falling back to local YAML.")
+
         # Fallback: Read local YAML directly
-        yaml_path = os.path.join("prompts", f"{slug}.yaml")
+        yaml_path = self._yaml_path(slug)
         if os.path.exists(yaml_path):
+            mtime = os.path.getmtime(yaml_path)
             with open(yaml_path, "r") as f:
                 data = yaml.safe_load(f)
-                return LocalPrompt(slug, data.get("messages", []))
-        
+                prompt = LocalPrompt(slug, data.get("messages", []), model=data.get("model"))
+                return _CachedPrompt(prompt, "local", mtime=mtime)
+
         raise RuntimeError(f"Prompt '{slug}' not found locally or in LangWatch.")
+
+
+# Shared by every agent in the process
+prompt_registry = PromptRegistry()
+
+
+def get_agent_prompt(slug: str):
+    """
+    Get prompt from LangWatch, or fallback to local YAML if not found/synced.
+    Served from the process-wide prompt registry after the first load.
+    """
+    return prompt_registry.get(slug)
+
+
+def warm_prompts(slugs: Optional[Iterable[str]] = None) -> List[str]:
+    """Preload prompts into the registry (call once at startup)."""
+    return prompt_registry.warm(slugs)
@@ -0,0 +1,297 @@
+"""
+Token-bucket rate limiting shared by every agent, per provider and per tool.
+
+Each limited resource (the Pollinations endpoint, each ParallelTools call)
+has a bucket refilled at `rate` requests per second up to `burst`. Buckets
+live in a SQLite file under CIVIC_CACHE_DIR, so every process on the machine
+draws from the same bucket; RATE_LIMIT_BACKEND=memory keeps them per process.
+Callers waiting for a token are served in priority order (then FIFO), and
+`max_concurrent` caps the requests in flight per process.
+
+A 429 from upstream drains the shared bucket for the Retry-After period, so
+all agents (in all processes) pause together instead of each backing off and
+retrying on its own.
+
+Configuration (environment):
+    RATE_LIMIT_BACKEND       sqlite (default), memory, or off
+    RATE_LIMIT_<NAME>        "rate,burst,max_concurrent" for a resource,
+                             e.g. RATE_LIMIT_POLLINATIONS=2,10,8
+"""
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.cache import CACHE_DIR
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite").lower()
+
+# (resource, requests per second, burst, max concurrent requests per process; 0 = unlimited)
+RATE_LIMITS = [
+    ("pollinations", 2.0, 10, 8),
+    ("parallel_search", 5.0, 10, 8),
+    ("parallel_extract", 2.0, 5, 4),
+]
+
+# Lower runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+_priority: ContextVar[int] = ContextVar("rate_limit_priority", default=PRIORITY_NORMAL)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Rate-limited calls made inside the block queue at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimitTimeout(TimeoutError):
+    """No token became available within the caller's timeout."""
+
+
+class MemoryBuckets:
+    """Token buckets held in this process."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, name: str, rate: float, burst: float, cost: float) -> float:
+        """Take `cost` tokens; returns 0, or the seconds until they will be available."""
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            self._buckets[name] = (tokens - cost if not wait else tokens, now)
+            return wait
+
+    def drain(self, name: str, rate: float, seconds: float) -> None:
+        """Empty the bucket so the next token arrives in `seconds`."""
+        with self._lock:
+            self._buckets[name] = (1 - seconds * rate, time.time())
+
+
+class SQLiteBuckets(MemoryBuckets):
+    """Token buckets in a SQLite file, shared by every process using it."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+        return self._conn
+
+    def take(self, name: str, rate: float, burst: float, cost: float) -> float:
+        with self._lock:
+            db = self._db()
+            # IMMEDIATE takes the write lock up front, so the read-modify-write is atomic across processes
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = db.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                tokens, updated = row if row is not None else (burst, now)
+                tokens = min(burst, tokens + max(now - updated, 0) * rate)
+                wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (name, tokens - cost if not wait else tokens, now),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return wait
+
+    def drain(self, name: str, rate: float, seconds: float) -> None:
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (name, 1 - seconds * rate, time.time()),
+            )
+
+
+class RateLimiter:
+    """
+    Token bucket for one resource, with a priority queue of waiters and an
+    optional cap on concurrent requests.
+
+    Args:
+        name: Resource name (the bucket key)
+        rate: Tokens added per second
+        burst: Bucket capacity
+        max_concurrent: Requests in flight at once in this process (0 = unlimited)
+        store: Where the bucket lives (MemoryBuckets or SQLiteBuckets)
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_concurrent: int = 0, store: Optional[MemoryBuckets] = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.store = store or MemoryBuckets()
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._turn = threading.Condition()
+        self.acquired = 0
+        self.throttled = 0
+        self.penalties = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, cost: float = 1.0, priority: Optional[int] = None, timeout: Optional[float] = None) -> float:
+        """Block until `cost` tokens are taken; returns the seconds waited."""
+        entry = (_priority.get() if priority is None else priority, next(self._sequence))
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        with self._turn:
+            heapq.heappush(self._waiters, entry)
+            self._turn.notify_all()
+            try:
+                while True:
+                    # Only the first waiter in priority order may take tokens
+                    if not self._turn.wait_for(lambda: self._waiters[0] == entry, timeout=self._remaining(deadline)):
+                        raise RateLimitTimeout(f"No '{self.name}' token within {timeout}s")
+                    wait = self.store.take(self.name, self.rate, self.burst, cost)
+                    if not wait:
+                        break
+                    if deadline is not None and time.monotonic() + wait > deadline:
+                        raise RateLimitTimeout(f"No '{self.name}' token within {timeout}s")
+                    # Woken early if a higher-priority caller arrives
+                    self._turn.wait(timeout=wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._turn.notify_all()
+        waited = time.monotonic() - started
+        self.acquired += 1
+        if waited > 0.001:
+            self.throttled += 1
+            self.wait_seconds += waited
+        return waited
+
+    @contextmanager
+    def slot(self, cost: float = 1.0, priority: Optional[int] = None) -> Iterator[None]:
+        """Take a token, then hold one of the concurrency slots for the block."""
+        self.acquire(cost, priority)
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def penalize(self, seconds: float) -> None:
+        """Pause every caller (in every process sharing the store) for `seconds`."""
+        self.penalties += 1
+        self.store.drain(self.name, self.rate, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "waiting": len(self._waiters),
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "penalties": self.penalties,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+def _limits() -> Dict[str, Tuple[float, float, int]]:
+    limits = {name: (rate, burst, concurrent) for name, rate, burst, concurrent in RATE_LIMITS}
+    for name in list(limits):
+        override = os.getenv(f"RATE_LIMIT_{name.upper()}")
+        if override:
+            rate, burst, concurrent = (override.split(",") + ["", ""])[:3]
+            default = limits[name]
+            limits[name] = (float(rate), float(burst or default[1]), int(concurrent or default[2]))
+    return limits
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+_store: Optional[MemoryBuckets] = None
+
+
+def rate_limiter(name: str) -> Optional[RateLimiter]:
+    """The shared limiter for a resource, or None if it is not rate limited."""
+    global _store
+    if RATE_LIMIT_BACKEND == "off":
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limit = _limits().get(name)
+            if limit is None:
+                return None
+            if _store is None:
+                _store = SQLiteBuckets(os.path.join(CACHE_DIR, "ratelimits.sqlite3")) if RATE_LIMIT_BACKEND == "sqlite" else MemoryBuckets()
+            limiter = _limiters[name] = RateLimiter(name, *limit, store=_store)
+        return limiter
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to pause for a 429 (its Retry-After header, else 1), or None for other errors."""
+    # Provider errors wrap the HTTP error, which carries the response headers
+    chain = [e for e in (error, error.__cause__) if e is not None]
+    if not any(getattr(e, "status_code", None) == 429 for e in chain):
+        return None
+    for e in chain:
+        response = getattr(e, "response", None)
+        header = response.headers.get("retry-after") if response is not None else None
+        if header:
+            try:
+                return float(header)
+            except ValueError:
+                break
+    return 1.0
+
+
+@contextmanager
+def rate_limited(name: str) -> Iterator[None]:
+    """Run the block under the resource's limiter (a no-op for unlimited resources)."""
+    limiter = rate_limiter(name)
+    if limiter is None:
+        yield
+        return
+    with limiter.slot():
+        try:
+            yield
+        except Exception as e:
+            pause = _retry_after(e)
+            if pause is not None:
+                limiter.penalize(pause)
+            raise
+
+
+def rate_limit_tool_hook(function_name: str, function_call: Callable, arguments: Dict[str, Any]) -> Any:
+    """Agno tool hook: tool calls draw from the tool's shared limiter."""
+    with rate_limited(function_name):
+        return function_call(**arguments)
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,137 @@
+"""
+Cache for tool results (ParallelTools web search and page extraction).
+
+Agents on the same topic keep issuing the same searches and extracts, in the
+Singleton Pipeline and the Deep Team alike. Every agent built by
+`create_agent` runs its tool calls through `tool_cache_hook`, which keys a
+call on the tool name and its normalized arguments and serves repeats from a
+TieredCache under CIVIC_CACHE_DIR (shared by all processes on the machine).
+Identical calls made at the same time share one request.
+
+Only tools listed in TOOL_CACHE_TTL (or given a TTL in the environment) are
+cached, and error results are never stored. Calls inside
+`app.llm.no_response_cache()` skip lookups but still refresh the cache.
+
+Configuration (environment):
+    TOOL_CACHE                 "off" disables the cache entirely (default on)
+    TOOL_CACHE_TTL_<TOOL>      TTL in seconds for one tool, e.g. TOOL_CACHE_TTL_PARALLEL_SEARCH=3600
+                               (0 disables caching for that tool)
+"""
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.cache import TieredCache, cache_key
+
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+# Search results go stale with the news; page contents change far less often
+TOOL_CACHE_TTL: Dict[str, float] = {
+    "parallel_search": 6 * 3600,
+    "parallel_extract": 7 * 86400,
+}
+
+# Arguments whose list order does not change the result
+UNORDERED_ARGUMENTS = {"search_queries", "urls"}
+# Free-text arguments compared case-insensitively
+CASELESS_ARGUMENTS = {"objective", "search_queries"}
+
+tool_cache = TieredCache("tool_results", max_memory_items=512)
+
+_WHITESPACE = re.compile(r"\s+")
+_inflight: Dict[str, "Future[Any]"] = {}
+_inflight_lock = threading.Lock()
+_counts: Dict[str, Dict[str, int]] = {}
+
+
+def tool_cache_ttl(function_name: str) -> Optional[float]:
+    """TTL for a tool's results, or None if the tool is not cached."""
+    override = os.getenv(f"TOOL_CACHE_TTL_{function_name.upper()}")
+    ttl = float(override) if override is not None else TOOL_CACHE_TTL.get(function_name)
+    return ttl if ttl else None
+
+
+def _normalize(name: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = _WHITESPACE.sub(" ", value).strip()
+        return value.casefold() if name in CASELESS_ARGUMENTS else value
+    if isinstance(value, (list, tuple)):
+        items = [_normalize(name, item) for item in value]
+        if name in UNORDERED_ARGUMENTS:
+            return sorted(set(items), key=str)
+        return items
+    return value
+
+
+def tool_cache_key(function_name: str, arguments: Dict[str, Any]) -> str:
+    """Hash of a tool call; arguments left at None (the tool's default) are ignored."""
+    normalized = {name: _normalize(name, value) for name, value in arguments.items() if value is not None}
+    return cache_key("tool", function_name, normalized)
+
+
+def _is_error(result: Any) -> bool:
+    """ParallelTools reports failures as a JSON object with an "error" key instead of raising."""
+    if not isinstance(result, str):
+        return result is None
+    try:
+        value = json.loads(result)
+    except ValueError:
+        return False
+    return isinstance(value, dict) and "error" in value
+
+
+def _count(function_name: str, outcome: str) -> None:
+    with _inflight_lock:
+        counts = _counts.setdefault(function_name, {"hits": 0, "shared": 0, "misses": 0})
+        counts[outcome] += 1
+
+
+def tool_cache_hook(function_name: str, function_call: Callable, arguments: Dict[str, Any]) -> Any:
+    """Agno tool hook: serve repeated tool calls from the tool cache."""
+    from app.llm.cache import cache_bypassed
+    from app.telemetry import current_span
+
+    ttl = tool_cache_ttl(function_name)
+    if not TOOL_CACHE_ENABLED or ttl is None:
+        return function_call(**arguments)
+
+    key = tool_cache_key(function_name, arguments)
+    if not cache_bypassed():
+        cached = tool_cache.get(key)
+        if cached is not None:
+            _count(function_name, "hits")
+            current_span().set(cache="hit")
+            return cached
+
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        owner = pending is None
+        if owner:
+            pending = _inflight[key] = Future()
+    if not owner:
+        # The same call is already running for another agent
+        _count(function_name, "shared")
+        return pending.result()
+
+    _count(function_name, "misses")
+    try:
+        result = function_call(**arguments)
+        if not _is_error(result):
+            tool_cache.set(key, result, ttl=ttl)
+        pending.set_result(result)
+        return result
+    except BaseException as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def tool_cache_stats() -> Dict[str, Any]:
+    with _inflight_lock:
+        tools = {name: dict(counts) for name, counts in _counts.items()}
+    return {**tool_cache.stats(), "tools": tools}
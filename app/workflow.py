@@ -4,11 +4,18 @@ Singleton Pipeline Workflow - Converging Civic Remediation.
 Implements the "one thing at a time" principle:
 Problem → Cause → Department → Solution → Funding → Project Launch
 
-Each stage receives the previous output and MUST select exactly ONE item,
-creating a converging flow toward a cohesive remediation blueprint.
+Each stage receives the selections it depends on and MUST select exactly ONE
+item, creating a converging flow toward a cohesive remediation blueprint.
+Department and Solution both depend only on Problem and Cause, so they run
+in parallel (PIPELINE_PARALLEL=false restores a strictly sequential run).
 """
+import os
+import threading
+from contextlib import nullcontext
 from typing import Optional
-from agno.workflow import Workflow, Step, StepInput, StepOutput
+from uuid import uuid4
+from agno.run import RunContext
+from agno.workflow import Workflow, Step, Parallel, StepInput, StepOutput
 
 from app.models import (
     SelectedProblem,
@@ -19,36 +26,132 @@ from app.models import (
     RemediationBlueprint,
     PipelineContext,
 )
-from app.agents.base import create_agent, POLLINATIONS_BASE_URL, DEFAULT_MODEL
+from app.agents.base import POLLINATIONS_BASE_URL, DEFAULT_MODEL
+from app.agents.pool import get_pooled_agent
 from app.knowledge import get_shared_db
+from app.checkpoints import checkpoints
+from app.llm import listen_tokens
+from app.streaming import stage_channel, streams_tokens
+from app.telemetry import span
+from app.utils.graph import dependency_levels
 
 
 # =============================================================================
 # Stage Configuration (KISS: Data-driven instead of repetitive functions)
 # =============================================================================
+# (step name, agent name, prompt slug, output schema, description,
+#  PipelineContext field, fields the stage depends on)
 STAGES = [
     ("1. Select ONE Problem", "Problem Selector", "sentinel", SelectedProblem, 
-     "Analyze civic problems and SELECT the SINGLE most critical one to address."),
+     "Analyze civic problems and SELECT the SINGLE most critical one to address.", "problem", ()),
     ("2. Identify ONE Cause", "Cause Identifier", "investigator", SelectedCause,
-     "Investigate root causes and SELECT the SINGLE most critical factor."),
+     "Investigate root causes and SELECT the SINGLE most critical factor.", "cause", ("problem",)),
     ("3. Map ONE Department", "Department Mapper", "bureaucrat", SelectedDepartment,
-     "Map government bodies and SELECT the ONE most responsible department."),
+     "Map government bodies and SELECT the ONE most responsible department.", "department", ("problem", "cause")),
     ("4. Design ONE Solution", "Solution Designer", "engineer", SelectedSolution,
-     "Evaluate interventions and SELECT the SINGLE most effective solution."),
+     "Evaluate interventions and SELECT the SINGLE most effective solution.", "solution", ("problem", "cause")),
     ("5. Match ONE Funding", "Funding Matcher", "liaison", SelectedFunding,
-     "Search funding sources and SELECT the ONE best-matched programme."),
+     "Search funding sources and SELECT the ONE best-matched programme.", "funding", ("solution",)),
 ]
 
+# Run stages whose dependencies are already met side by side (set false to force sequential runs)
+PIPELINE_PARALLEL = os.getenv("PIPELINE_PARALLEL", "true").lower() in ("1", "true", "yes")
 
-def _create_stage_step(name: str, agent_name: str, slug: str, schema, description: str) -> Step:
-    """Create a pipeline stage step from config."""
-    agent = create_agent(
+
+def stage_levels(stages=STAGES):
+    """
+    Group stages into levels of the dependency graph: every stage in a level
+    only depends on stages from earlier levels, so a level can run in parallel.
+    """
+    by_field = {stage[5]: stage for stage in stages}
+    levels = dependency_levels({stage[5]: stage[6] for stage in stages})
+    return [[by_field[field] for field in level] for level in levels]
+
+
+def collect_selections(step_input: StepInput) -> PipelineContext:
+    """Gather every stage selection so far, including those inside Parallel groups."""
+    context = PipelineContext(original_query=str(step_input.input))
+    fields = {stage[3]: stage[5] for stage in STAGES}
+
+    def visit(output: StepOutput) -> None:
+        field = fields.get(type(output.content))
+        if field is not None:
+            setattr(context, field, output.content)
+        for child in output.steps or []:
+            visit(child)
+
+    for output in (step_input.previous_step_outputs or {}).values():
+        visit(output)
+    return context
+
+
+def _stage_input(step_input: StepInput, depends_on):
+    """
+    The query for the first stage, the dependency's selection for single-dependency
+    stages, or a PipelineContext holding just the dependencies otherwise.
+    """
+    if not depends_on:
+        return step_input.input
+    selections = collect_selections(step_input)
+    if len(depends_on) == 1:
+        return getattr(selections, depends_on[0])
+    return PipelineContext(
+        original_query=selections.original_query,
+        **{dep: getattr(selections, dep) for dep in depends_on},
+    )
+
+
+def _create_stage_step(
+    index: int, name: str, agent_name: str, slug: str, schema, description: str, field: str, depends_on=()
+) -> Step:
+    """
+    Create a pipeline stage step from config (agents come from the shared pool).
+    
+    The stage checkpoints its selection as `PipelineContext.<field>` under the
+    run id. When a run is resumed from a later stage, this stage replays its
+    checkpointed selection instead of calling the agent again. When the run is
+    being streamed, the stage reports its start, model tokens and selection.
+    """
+    agent = get_pooled_agent(
         name=agent_name,
         slug=slug,
         output_schema=schema,
         enable_reasoning_tools=False,
     )
-    return Step(name=name, agent=agent, description=description)
+
+    def run_stage(step_input: StepInput, run_context: RunContext) -> StepOutput:
+        # Every span of a run (model and tool calls included) shares the run id as trace id
+        with span("stage", name, trace_id=run_context.run_id, session_id=run_context.session_id) as stage_span:
+            return _run_stage(step_input, run_context, stage_span)
+
+    def _run_stage(step_input: StepInput, run_context: RunContext, stage_span) -> StepOutput:
+        # Keyed by run id so a resumed session never leaks into later runs
+        resume_from = (run_context.session_state or {}).get("resume_from", {}).get(run_context.run_id, 1)
+        emit = stage_channel(run_context.run_id)
+        if index < resume_from:
+            context = checkpoints.load(run_context.run_id)
+            saved = getattr(context, field) if context is not None else None
+            if saved is not None:
+                stage_span.set(replayed=True)
+                if emit:
+                    emit({"event": "stage_completed", "stage": name, "field": field, "selection": saved, "replayed": True})
+                return StepOutput(content=saved)
+
+        message = _stage_input(step_input, depends_on)
+        tokens = nullcontext()
+        if emit:
+            emit({"event": "stage_started", "stage": name, "field": field})
+            if streams_tokens(run_context.run_id):
+                tokens = listen_tokens(lambda delta: emit({"event": "token", "stage": name, "field": field, "delta": delta}))
+        with tokens:
+            response = agent.run(message, user_id=run_context.user_id, session_id=run_context.session_id)
+        if isinstance(response.content, schema):
+            checkpoints.record_stage(run_context.run_id, str(step_input.input), field, response.content)
+        if emit:
+            emit({"event": "stage_completed", "stage": name, "field": field, "selection": response.content, "replayed": False})
+        return StepOutput(content=response.content)
+
+    return Step(name=name, executor=run_stage, description=description)
 
 
 # =============================================================================
@@ -61,28 +164,13 @@ def synthesize_blueprint(step_input: StepInput) -> StepOutput:
     
     This is a custom function that aggregates the pipeline outputs.
     """
-    # Get outputs from previous steps
-    previous_outputs = step_input.previous_outputs or []
-    
-    # Extract singleton selections from each stage
-    problem: Optional[SelectedProblem] = None
-    cause: Optional[SelectedCause] = None
-    department: Optional[SelectedDepartment] = None
-    solution: Optional[SelectedSolution] = None
-    funding: Optional[SelectedFunding] = None
-    
-    for output in previous_outputs:
-        content = output.content
-        if isinstance(content, SelectedProblem):
-            problem = content
-        elif isinstance(content, SelectedCause):
-            cause = content
-        elif isinstance(content, SelectedDepartment):
-            department = content
-        elif isinstance(content, SelectedSolution):
-            solution = content
-        elif isinstance(content, SelectedFunding):
-            funding = content
+    # Extract singleton selections from each stage (parallel stages included)
+    selections = collect_selections(step_input)
+    problem: Optional[SelectedProblem] = selections.problem
+    cause: Optional[SelectedCause] = selections.cause
+    department: Optional[SelectedDepartment] = selections.department
+    solution: Optional[SelectedSolution] = selections.solution
+    funding: Optional[SelectedFunding] = selections.funding
     
     # Synthesize the final blueprint
     if all([problem, cause, department, solution, funding]):
@@ -120,10 +208,18 @@ def create_singleton_pipeline() -> Workflow:
     """
     Create the converging singleton pipeline for civic remediation.
     
-    Each stage receives the previous output and MUST select exactly ONE item.
+    Each stage receives the selections it depends on and MUST select exactly
+    ONE item. Independent stages (Department and Solution) run in parallel.
     """
-    # Generate steps from STAGES config
-    steps = [_create_stage_step(*stage) for stage in STAGES]
+    # Generate steps from STAGES config, one Parallel group per dependency level
+    index = {stage[0]: i for i, stage in enumerate(STAGES, start=1)}
+    steps = []
+    for level in stage_levels():
+        level_steps = [_create_stage_step(index[stage[0]], *stage) for stage in level]
+        if len(level_steps) > 1 and PIPELINE_PARALLEL:
+            steps.append(Parallel(*level_steps, name=" + ".join(stage[0] for stage in level)))
+        else:
+            steps.extend(level_steps)
     
     # Add final synthesis step
     steps.append(Step(
@@ -142,4 +238,55 @@ def create_singleton_pipeline() -> Workflow:
     )
 
 
-__all__ = ['create_singleton_pipeline', 'RemediationBlueprint']
+_pipeline: Optional[Workflow] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_singleton_pipeline() -> Workflow:
+    """
+    Return the process-wide singleton pipeline, building it on first use.
+    
+    The workflow is reused across runs; callers isolate runs by passing a
+    fresh `session_id` (and the caller's `user_id`) to `Workflow.run`.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = create_singleton_pipeline()
+        return _pipeline
+
+
+def resume(
+    run_id: str,
+    from_stage: int,
+    user_id: str = "civic-system",
+    session_id: Optional[str] = None,
+    **run_kwargs,
+):
+    """
+    Re-run a previous pipeline run from stage `from_stage` (1-5) onward.
+    
+    Stages before `from_stage` replay their checkpointed selections, so only
+    the later agents are called again. Extra keyword arguments (e.g. `stream`)
+    are passed to `Workflow.run`.
+    """
+    if not 1 <= from_stage <= len(STAGES):
+        raise ValueError(f"from_stage must be between 1 and {len(STAGES)}, got {from_stage}")
+    context = checkpoints.load(run_id)
+    if context is None:
+        raise KeyError(f"No checkpoint found for run '{run_id}'")
+    missing = [stage[0] for stage in STAGES[:from_stage - 1] if getattr(context, stage[5]) is None]
+    if missing:
+        raise ValueError(f"Run '{run_id}' cannot resume from stage {from_stage}; not checkpointed: {', '.join(missing)}")
+
+    return get_singleton_pipeline().run(
+        context.original_query,
+        run_id=run_id,
+        user_id=user_id,
+        session_id=session_id or str(uuid4()),
+        session_state={"resume_from": {run_id: from_stage}},
+        **run_kwargs,
+    )
+
+
+__all__ = ['create_singleton_pipeline', 'get_singleton_pipeline', 'resume', 'RemediationBlueprint']
@@ -0,0 +1,223 @@
+"""
+Offline benchmark suite.
+
+Runs the real construction, prompt, pipeline, team and knowledge-base code
+against the stand-ins in `tests.benchmarks.mocks` (no network, no API keys,
+no Postgres), so results depend only on this code and the simulated
+latencies. Each benchmark is timed over several iterations after one
+warm-up run, and the medians are compared with the stored baseline.
+
+Usage (from the repository root):
+    python -m tests.benchmarks                       # run and compare with baseline.json
+    python -m tests.benchmarks --only pipeline_run   # one benchmark
+    python -m tests.benchmarks --update-baseline     # record new baseline numbers
+
+Exits with status 1 if a median is slower than its baseline by more than
+`--tolerance` (a fraction, plus a small absolute allowance for timer noise).
+Baselines are only comparable for the same simulated latencies; when they
+differ the comparison is skipped.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+QUERY = "Untreated sewage flowing into the Ganga at Varanasi"
+
+# Medians within this many seconds of the baseline never count as regressions
+NOISE_FLOOR = 0.005
+
+
+def bench_build_cold(env: Dict[str, Any]) -> None:
+    """Build the pipeline and the Deep Team with an empty agent pool."""
+    from app.agents.pool import agent_pool
+    from app.team.builder import create_civic_team
+    from app.workflow import create_singleton_pipeline
+
+    agent_pool.clear()
+    create_singleton_pipeline()
+    create_civic_team()
+
+
+def bench_build_warm(env: Dict[str, Any]) -> None:
+    """Build the pipeline and the Deep Team with member agents already pooled."""
+    from app.team.builder import create_civic_team
+    from app.workflow import create_singleton_pipeline
+
+    create_singleton_pipeline()
+    create_civic_team()
+
+
+def bench_prompt_render(env: Dict[str, Any]) -> None:
+    """Render every agent prompt with realistic template values."""
+    from app.agent_os import AGENTS
+    from app.models import SelectedCause, SelectedProblem
+    from app.utils import get_agent_prompt
+    from tests.benchmarks.mocks import fake_instance
+
+    values = {
+        "query": QUERY,
+        "problem": SelectedProblem(**fake_instance(SelectedProblem)),
+        "cause": SelectedCause(**fake_instance(SelectedCause)),
+    }
+    for _, _, slug, _ in AGENTS:
+        get_agent_prompt(slug).format(**values)
+
+
+def bench_pipeline_run(env: Dict[str, Any]) -> None:
+    """One full Singleton Pipeline run."""
+    from app.workflow import create_singleton_pipeline
+
+    create_singleton_pipeline().run(QUERY, user_id="bench", session_id=str(uuid4()))
+
+
+def bench_team_delegation(env: Dict[str, Any]) -> None:
+    """One Deep Team run: the leader delegates to each member in turn, then answers."""
+    from agno.utils.team import get_member_id
+
+    from app.team.builder import get_civic_team
+
+    team = get_civic_team()
+    env["llm"].delegate_to = [get_member_id(member) for member in team.members]
+    try:
+        team.run(QUERY, user_id="bench", session_id=str(uuid4()))
+    finally:
+        env["llm"].delegate_to = []
+
+
+def bench_team_parallel(env: Dict[str, Any]) -> None:
+    """One Deep Team run in parallel mode (members by dependency level, then synthesis)."""
+    from app.team.parallel import create_parallel_team
+
+    create_parallel_team("bench").run(QUERY, user_id="bench", session_id=str(uuid4()))
+
+
+def bench_kb_persist(env: Dict[str, Any]) -> None:
+    """Persist 50 sets of findings (10 distinct) and wait for the write-behind queue."""
+    from app.knowledge.base import persist_agent_findings
+    from app.models import SelectedProblem
+    from tests.benchmarks.mocks import fake_instance
+
+    findings = SelectedProblem(**fake_instance(SelectedProblem))
+    for i in range(50):
+        persist_agent_findings(findings, "Sentinel", f"{QUERY} #{i % 10}")
+    env["writer"].flush()
+
+
+# (name, function); each runs against a fresh `offline()` environment per benchmark
+BENCHMARKS: List[Tuple[str, Callable[[Dict[str, Any]], None]]] = [
+    ("build_cold", bench_build_cold),
+    ("build_warm", bench_build_warm),
+    ("prompt_render", bench_prompt_render),
+    ("pipeline_run", bench_pipeline_run),
+    ("team_delegation", bench_team_delegation),
+    ("team_parallel", bench_team_parallel),
+    ("kb_persist", bench_kb_persist),
+]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_benchmarks(
+    iterations: int = 5,
+    llm_latency: float = 0.0,
+    tool_latency: float = 0.0,
+    db_latency: float = 0.0,
+    only: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Time each benchmark; returns {name: {"median", "p95", "min", "iterations", "llm_requests"}}."""
+    from tests.benchmarks.mocks import offline
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, function in BENCHMARKS:
+        if only and name not in only:
+            continue
+        # The app's progress prints are not part of the results
+        with offline(llm_latency, tool_latency, db_latency) as env, contextlib.redirect_stdout(io.StringIO()):
+            function(env)  # Warm-up: imports, prompt loading, agent pool
+            env["llm"].requests = 0
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                function(env)
+                samples.append(time.perf_counter() - start)
+        results[name] = {
+            "median": round(statistics.median(samples), 6),
+            "p95": round(percentile(samples, 0.95), 6),
+            "min": round(min(samples), 6),
+            "iterations": iterations,
+            "llm_requests": env["llm"].requests // iterations,
+        }
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Names of benchmarks whose median regressed past the baseline."""
+    regressed = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected and result["median"] > expected["median"] * (1 + tolerance) + NOISE_FLOOR:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks", description="Offline benchmark suite")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per model request")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="seconds per ParallelTools call")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="seconds per knowledge-base batch write")
+    parser.add_argument("--only", nargs="+", choices=[name for name, _ in BENCHMARKS])
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over baseline (0.5 = 50%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    settings = {"llm_latency": args.llm_latency, "tool_latency": args.tool_latency, "db_latency": args.db_latency}
+    results = run_benchmarks(args.iterations, only=args.only, **settings)
+
+    stored: Dict[str, Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    comparable = stored.get("settings") == settings
+    baseline = stored.get("results", {}) if comparable else {}
+
+    print(f"{'benchmark':<18}{'median':>10}{'p95':>10}{'baseline':>10}{'change':>9}{'llm calls':>11}")
+    for name, result in results.items():
+        expected = baseline.get(name, {}).get("median")
+        change = f"{result['median'] / expected - 1:+.0%}" if expected else "-"
+        shown = f"{expected:.4f}" if expected else "-"
+        print(f"{name:<18}{result['median']:>10.4f}{result['p95']:>10.4f}{shown:>10}{change:>9}{result['llm_requests']:>11}")
+
+    if args.update_baseline:
+        merged = {**(stored.get("results", {}) if comparable else {}), **results}
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": settings, "python": platform.python_version(), "results": merged}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if stored and not comparable:
+        print(f"Baseline was recorded with {stored.get('settings')}; not comparing.")
+        return 0
+    regressed = compare(results, baseline, args.tolerance)
+    if regressed:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
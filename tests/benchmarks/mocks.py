@@ -0,0 +1,224 @@
+"""
+Deterministic offline stand-ins for the model provider, ParallelTools, the
+agent database and the knowledge base.
+
+`offline()` patches them in for the duration of a block, so the real
+pipeline, team and agent code run end to end with no network access:
+
+    MockLLM         replaces the HTTP request of every CivicModel call. It
+                    answers structured-output calls with a schema-valid
+                    instance, calls ParallelTools once before answering when
+                    the agent has them, and (for the Deep Team leader)
+                    delegates to each member in turn.
+    MockParallelTools
+                    drop-in ParallelTools returning fixed search/extract JSON.
+    KB              findings go through the real write-behind queue, dedupe
+                    and (hashing) embedder into an in-memory store.
+
+Latencies are configurable so runs can model a fast or slow provider;
+with zero latency a run measures only this code.
+"""
+import json
+import time
+import typing
+from contextlib import ExitStack, contextmanager
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from unittest import mock
+
+from agno.tools import Toolkit
+from openai.types.chat import ChatCompletion
+from pydantic import BaseModel
+
+
+def fake_value(annotation: Any, name: str, constraints: Sequence[Any] = ()) -> Any:
+    """A deterministic value of `annotation` for the field `name`."""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return fake_value(next(arg for arg in args if arg is not type(None)), name)
+    if origin is typing.Literal:
+        return args[0]
+    if origin in (list, List, Sequence, tuple, set):
+        return [fake_value(args[0] if args else str, name)]
+    if origin in (dict, Dict):
+        return {}
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return fake_instance(annotation)
+        if issubclass(annotation, Enum):
+            return next(iter(annotation)).value
+        if issubclass(annotation, bool):
+            return True
+        if issubclass(annotation, (int, float)):
+            low = next((getattr(c, "ge", None) for c in constraints if getattr(c, "ge", None) is not None), 1)
+            return annotation(low)
+    return f"{name.replace('_', ' ')} (benchmark)"
+
+
+def fake_instance(schema: type) -> Dict[str, Any]:
+    """Field values of a schema-valid instance of a pydantic model."""
+    return {
+        name: fake_value(field.annotation, name, field.metadata)
+        for name, field in schema.model_fields.items()
+    }
+
+
+class MockLLM:
+    """
+    Stands in for the provider behind `CivicModel`.
+
+    Args:
+        latency: Seconds each model request takes
+        delegate_to: Member ids the team leader delegates to, in order
+    """
+
+    def __init__(self, latency: float = 0.0, delegate_to: Sequence[str] = ()):
+        self.latency = latency
+        self.delegate_to = list(delegate_to)
+        self.requests = 0
+
+    def request(self, model: Any, messages: List[Any], assistant_message: Any, response_format: Any = None,
+                tools: Optional[List[Dict[str, Any]]] = None, **kwargs: Any) -> Any:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        tool_names = [tool.get("function", {}).get("name") for tool in tools or []]
+        tool_results = sum(1 for message in messages if message.role == "tool")
+        prompt = next((m.content for m in reversed(messages) if m.role == "user" and isinstance(m.content, str)), "")
+
+        call = None
+        if "delegate_task_to_member" in tool_names and tool_results < len(self.delegate_to):
+            member = self.delegate_to[tool_results]
+            call = ("delegate_task_to_member", {"member_id": member, "task": f"Report on: {prompt[:200]}"})
+        elif "parallel_search" in tool_names and tool_results == 0:
+            call = ("parallel_search", {"objective": prompt[:200], "search_queries": [prompt[:60]]})
+
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        if call is not None:
+            message["tool_calls"] = [{
+                "id": f"call_{self.requests}",
+                "type": "function",
+                "function": {"name": call[0], "arguments": json.dumps(call[1])},
+            }]
+        elif isinstance(response_format, type) and issubclass(response_format, BaseModel):
+            message["content"] = json.dumps(fake_instance(response_format))
+        else:
+            message["content"] = f"Benchmark answer to: {prompt[:200]}"
+
+        completion = ChatCompletion.model_validate({
+            "id": f"bench-{self.requests}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model.id,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if call else "stop"}],
+            "usage": {"prompt_tokens": sum(len(str(m.content or "")) for m in messages) // 4,
+                      "completion_tokens": len(str(message["content"] or "")) // 4 + 1,
+                      "total_tokens": 0},
+        })
+        return model._parse_provider_response(completion, response_format=response_format)
+
+
+class MockParallelTools(Toolkit):
+    """ParallelTools with the same function names and fixed results."""
+
+    latency = 0.0
+
+    def __init__(self, enable_search: bool = True, enable_extract: bool = False, **kwargs: Any):
+        tools = ([self.parallel_search] if enable_search else []) + ([self.parallel_extract] if enable_extract else [])
+        super().__init__(name="parallel_tools", tools=tools)
+
+    def parallel_search(self, objective: Optional[str] = None, search_queries: Optional[List[str]] = None,
+                        max_results: Optional[int] = None, max_chars_per_result: Optional[int] = None) -> str:
+        """Search the web for an objective and/or keyword queries."""
+        time.sleep(self.latency)
+        results = [
+            {"url": f"https://example.gov.in/report-{i}", "title": f"Report {i} on {objective or ''}"[:120],
+             "excerpts": [f"Excerpt {i}: figures and findings relevant to the objective."]}
+            for i in range(max_results or 5)
+        ]
+        return json.dumps({"search_id": "bench", "results": results})
+
+    def parallel_extract(self, urls: List[str], objective: Optional[str] = None,
+                         search_queries: Optional[List[str]] = None, excerpts: bool = True,
+                         max_chars_per_excerpt: Optional[int] = None, full_content: bool = False,
+                         max_chars_for_full_content: Optional[int] = None) -> str:
+        """Extract content from specific URLs."""
+        time.sleep(self.latency)
+        return json.dumps({"results": [{"url": url, "excerpts": ["Extracted text."]} for url in urls], "errors": []})
+
+
+class MemoryVectorStore:
+    """Stands in for PgVector: upserts embedded documents into a dict."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.documents: Dict[str, Any] = {}
+
+    def write(self, batch: List[Any]) -> None:
+        from app.knowledge.embedder import HashingEmbedder
+        from app.knowledge.writer import dedupe_documents, embed_documents
+
+        unique = dedupe_documents(batch)
+        documents = [doc for doc, _ in unique.values()]
+        embed_documents(HashingEmbedder(), documents)
+        time.sleep(self.latency)
+        for doc in documents:
+            self.documents[doc.id] = doc
+
+
+@contextmanager
+def offline(llm_latency: float = 0.0, tool_latency: float = 0.0, db_latency: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """
+    Run the block against the stand-ins. Yields {"llm", "store", "writer"}.
+    Pooled agents and teams built inside the block are dropped on exit.
+    """
+    import agno.tools.parallel
+    from agno.db.in_memory import InMemoryDb
+
+    import app.agents.base
+    import app.knowledge.base
+    import app.llm.cache
+    import app.llm.model
+    import app.team.builder
+    import app.team.parallel
+    import app.utils.ratelimit
+    import app.utils.tool_cache
+    import app.workflow
+    from app.agents.pool import agent_pool
+    from app.checkpoints import CheckpointStore
+    from app.knowledge.writer import WriteBehindQueue
+    from app.utils.cache import TieredCache
+
+    llm = MockLLM(llm_latency)
+    store = MemoryVectorStore(db_latency)
+    writer = WriteBehindQueue(store.write, batch_size=32, max_delay=0.05)
+    db = InMemoryDb()
+    tools = type("BenchParallelTools", (MockParallelTools,), {"latency": tool_latency})
+
+    def request(model: Any, messages: List[Any], assistant_message: Any, **kwargs: Any) -> Any:
+        return llm.request(model, messages, assistant_message, **kwargs)
+
+    with ExitStack() as stack:
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        patch(app.llm.model.CivicModel, "_request", request)
+        # Every call is computed (agno runs some calls in worker threads, where a
+        # `no_response_cache()` block would not apply); results are still written, to memory
+        patch(app.llm.model, "response_cache", TieredCache("bench-llm", directory=None))
+        patch(app.utils.tool_cache, "tool_cache", TieredCache("bench-tools", directory=None))
+        for module in (app.llm.model, app.llm.cache):
+            patch(module, "cache_bypassed", lambda: True)
+        patch(app.utils.ratelimit, "RATE_LIMIT_BACKEND", "off")
+        patch(agno.tools.parallel, "ParallelTools", tools)
+        for module in (app.agents.base, app.team.builder, app.team.parallel):
+            patch(module, "get_shared_db", lambda: db)
+        for module in (app.team.builder, app.team.parallel):
+            patch(module, "get_civic_knowledge", lambda: None)
+        patch(app.workflow, "checkpoints", CheckpointStore(TieredCache("bench-checkpoints", directory=None)))
+        patch(app.knowledge.base, "findings_writer", writer)
+        stack.callback(writer.close)
+        stack.callback(setattr, app.team.builder, "_team", None)
+        stack.callback(setattr, app.team.parallel, "_parallel_team", None)
+        stack.callback(agent_pool.clear)
+        agent_pool.clear()
+        yield {"llm": llm, "store": store, "writer": writer}
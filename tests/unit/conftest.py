@@ -0,0 +1,30 @@
+import pytest
+
+from app.models import (
+    SelectedCause,
+    SelectedDepartment,
+    SelectedFunding,
+    SelectedProblem,
+    SelectedSolution,
+)
+
+
+@pytest.fixture
+def selections():
+    """One canned selection per pipeline stage, keyed by prompt slug."""
+    return {
+        "sentinel": SelectedProblem(
+            title="Polluted Ganga", location="Kanpur", description="d", key_metric="m",
+            affected_population="1M", severity_score=9, feasibility_score=6, why_selected="w",
+        ),
+        "investigator": SelectedCause(cause_title="Tanneries", cause_type="industrial_discharge", evidence="e", why_critical="w"),
+        "bureaucrat": SelectedDepartment(name="NMCG", department_type="govt", jurisdiction="central", why_responsible="w"),
+        "engineer": SelectedSolution(
+            solution_title="Decentralized STPs", solution_type="decentralized_stp", technical_approach="t",
+            implementation_scale="Pilot", estimated_cost_tier="Medium", timeline_estimate="2y", why_selected="w",
+        ),
+        "liaison": SelectedFunding(
+            programme_name="Namami Gange", funder_type="govt_programme", organization="GoI",
+            amount_available="100Cr", eligibility_match="e", why_matched="w",
+        ),
+    }
@@ -0,0 +1,43 @@
+from app.agents.pool import AgentPool
+from app.models import SelectedProblem, SelectedCause
+
+
+def test_pool_reuses_agents_per_configuration():
+    pool = AgentPool()
+
+    first = pool.get("Problem Selector", "sentinel", output_schema=SelectedProblem)
+    again = pool.get("Problem Selector", "sentinel", output_schema=SelectedProblem)
+    other = pool.get("Problem Selector", "sentinel", output_schema=SelectedCause)
+
+    assert first is again
+    assert other is not first
+    assert len(pool) == 2
+
+
+def test_pool_keys_on_tool_configuration(monkeypatch):
+    from agno.tools.parallel import ParallelTools
+
+    monkeypatch.setenv("PARALLEL_API_KEY", "test-key")
+
+    search_only = AgentPool.key("Sentinel", "sentinel", tools=[ParallelTools(enable_search=True, enable_extract=False)])
+    search_again = AgentPool.key("Sentinel", "sentinel", tools=[ParallelTools(enable_search=True, enable_extract=False)])
+    with_extract = AgentPool.key("Sentinel", "sentinel", tools=[ParallelTools(enable_search=True, enable_extract=True)])
+
+    assert search_only == search_again
+    assert search_only != with_extract
+
+
+def test_the_deep_team_leaves_pooled_agents_alone(monkeypatch):
+    import app.team.builder as builder
+
+    monkeypatch.setenv("PARALLEL_API_KEY", "test-key")
+    monkeypatch.setattr(builder, "get_shared_db", lambda: None)
+    monkeypatch.setattr(builder, "get_civic_knowledge", lambda: None)
+
+    team = builder.create_civic_team()
+    team.initialize_team()
+    pooled = builder.create_team_members()
+
+    assert [member.name for member in team.members] == [agent.name for agent in pooled.values()]
+    assert all(member.team_id == team.id for member in team.members)
+    assert not any(agent.team_id for agent in pooled.values())
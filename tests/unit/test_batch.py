@@ -0,0 +1,40 @@
+import json
+
+from app.batch import run_batch, read_queries
+
+
+def _fake_runner(calls):
+    def runner(row):
+        calls.append(row["query"])
+        status = "error" if "fail" in row["query"] else "ok"
+        return {"id": row["id"], "query": row["query"], "status": status}
+    return runner
+
+
+def test_batch_resumes_from_checkpoint(tmp_path):
+    queries = tmp_path / "queries.jsonl"
+    queries.write_text("\n".join([
+        json.dumps({"id": "bihar", "query": "Bihar floods"}),
+        json.dumps({"query": "Ganga pollution"}),
+        json.dumps("please fail"),
+    ]))
+    output = tmp_path / "results.jsonl"
+
+    first_calls = []
+    counts = run_batch(str(queries), str(output), concurrency=2, runner=_fake_runner(first_calls))
+    assert counts == {"ok": 2, "error": 1, "skipped": 0}
+    assert sorted(first_calls) == ["Bihar floods", "Ganga pollution", "please fail"]
+
+    # Only the failed query is retried on the next run
+    second_calls = []
+    counts = run_batch(str(queries), str(output), concurrency=2, runner=_fake_runner(second_calls))
+    assert counts == {"ok": 0, "error": 1, "skipped": 2}
+    assert second_calls == ["please fail"]
+    assert len(output.read_text().splitlines()) == 4
+
+
+def test_read_queries_from_csv(tmp_path):
+    path = tmp_path / "queries.csv"
+    path.write_text("id,query\nup,Uttar Pradesh roads\n,\n")
+
+    assert [(row["id"], row["query"]) for row in read_queries(str(path))] == [("up", "Uttar Pradesh roads")]
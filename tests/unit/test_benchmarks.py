@@ -0,0 +1,25 @@
+from app.models import RemediationBlueprint
+from app.team.builder import TEAM_MEMBERS
+from tests.benchmarks.bench import BENCHMARKS, compare, run_benchmarks
+from tests.benchmarks.mocks import fake_instance
+
+
+def test_fake_instances_are_schema_valid():
+    blueprint = RemediationBlueprint(**fake_instance(RemediationBlueprint))
+    assert 1 <= blueprint.problem.severity_score <= 10
+
+
+def test_every_benchmark_runs_offline():
+    results = run_benchmarks(iterations=1)
+
+    assert set(results) == {name for name, _ in BENCHMARKS}
+    assert results["pipeline_run"]["llm_requests"] >= 5
+    # The leader delegates to (and hears back from) every member, then answers
+    assert results["team_delegation"]["llm_requests"] > 2 * len(TEAM_MEMBERS)
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"fast": {"median": 0.1}, "slow": {"median": 0.1}}
+    results = {"fast": {"median": 0.12}, "slow": {"median": 0.3}, "new": {"median": 1.0}}
+
+    assert compare(results, baseline, tolerance=0.5) == ["slow"]
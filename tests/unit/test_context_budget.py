@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+
+import app.llm.budget as budget
+from app.llm import CivicModel, create_model
+from app.llm.budget import allocate, apply_context_budget, context_budget_stats, estimate_tokens
+
+FILLER = "Routine notes with nothing of interest. " * 30
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    budget.reset_context_budget_stats()
+    yield
+    budget.reset_context_budget_stats()
+
+
+def history(runs):
+    body = "".join(f"[run-{i}]\ninput: q{i}\nresponse: {text}\n\n" for i, text in enumerate(runs, 1))
+    return f"<team_history_context>\n{body}</team_history_context>\n"
+
+
+def memories(items):
+    return "<memories_from_previous_interactions>" + "".join(f"\n- {m}" for m in items) + "\n</memories_from_previous_interactions>\n"
+
+
+def references(documents):
+    return "<references>\n" + json.dumps(documents, indent=2) + "\n</references>"
+
+
+def test_sources_under_their_share_give_the_rest_to_others():
+    assert allocate({"a": 100, "b": 10, "c": 500}, 300, {"a": 1, "b": 1, "c": 1}) == {"a": 100, "b": 10, "c": 190}
+    assert allocate({"a": 100, "b": 500}, 1000, {"a": 1, "b": 1}) == {"a": 100, "b": 500}
+    assert allocate({"a": 400, "b": 400}, 300, {"a": 2, "b": 1}) == {"a": 200, "b": 100}
+
+
+def test_context_within_budget_is_sent_unchanged():
+    messages = [Message(role="system", content=memories(["likes rivers"])), Message(role="user", content="Ganga")]
+
+    sent, report = apply_context_budget(messages, "sentinel", budget=1000)
+
+    assert sent is messages
+    assert report["memories"]["kept"] == report["memories"]["tokens"]
+    assert report["prompt"]["tokens"] > 0
+
+
+def test_most_relevant_and_newest_items_are_kept_in_order():
+    runs = [FILLER, FILLER + "Tannery effluent in the Ganga at Kanpur.", FILLER, FILLER]
+    task = "Tannery effluent in the Ganga"
+    messages = [Message(role="user", content=history(runs) + task)]
+
+    sent, report = apply_context_budget(messages, "investigator", budget=estimate_tokens(FILLER) * 2 + 60)
+    content = sent[0].content
+
+    assert "[run-2]" in content and "[run-4]" in content
+    assert "[run-1]" not in content and "[run-3]" not in content
+    assert content.index("[run-2]") < content.index("[run-4]")
+    assert "(2 of 4 runs omitted to fit the context budget)" in content
+    assert content.endswith(task)
+    assert report["history"]["dropped"] == 2
+    assert report["history"]["kept"] <= estimate_tokens(FILLER) * 2 + 60
+    assert messages[0].content == history(runs) + task
+
+
+def test_an_overflowing_item_keeps_its_most_relevant_sentences():
+    text = FILLER + "The Kanpur tanneries discharge chromium. " + FILLER
+    messages = [Message(role="user", content=history([text]) + "chromium from Kanpur tanneries")]
+
+    sent, report = apply_context_budget(messages, budget=100)
+
+    assert "[run-1]" in sent[0].content
+    assert "The Kanpur tanneries discharge chromium." in sent[0].content
+    assert report["history"]["excerpted"] == 1
+    assert report["history"]["kept"] <= 100
+
+
+def test_documents_are_trimmed_as_json():
+    documents = [{"name": f"doc-{i}", "content": ("Sewage outfalls. " if i == 2 else "Traffic counts. ") * 40} for i in range(4)]
+    messages = [
+        Message(role="user", content="sewage outfalls\n" + references(documents)),
+        Message(role="tool", tool_name="search_knowledge_base", content=json.dumps(documents)),
+    ]
+
+    sent, report = apply_context_budget(messages, budget=estimate_tokens(json.dumps(documents[2], indent=2)) * 2 + 20)
+
+    body = sent[0].content.split("<references>\n")[1].split("\n(")[0]
+    assert [doc["name"] for doc in json.loads(body)] == ["doc-2"]
+    assert [doc["name"] for doc in json.loads(sent[1].content.split("\n(")[0])] == ["doc-2"]
+    assert report["knowledge"]["items"] == 8
+
+
+def test_stats_report_tokens_per_stage_and_source():
+    messages = [Message(role="system", content=memories(["a", "b"])), Message(role="user", content="task")]
+    apply_context_budget(messages, "liaison")
+    apply_context_budget(messages, "liaison")
+
+    rows = {(row["stage"], row["source"]): row for row in context_budget_stats()["calls"]}
+
+    assert rows["liaison", "memories"]["calls"] == 2
+    assert rows["liaison", "memories"]["items"] == 4
+    assert rows["liaison", "prompt"]["tokens_in"] > 0
+
+
+def test_model_calls_send_the_budgeted_messages(monkeypatch):
+    seen = []
+
+    def fake_request(self, messages, assistant_message, **kwargs):
+        seen.append(messages)
+        return ModelResponse(content="ok")
+
+    monkeypatch.setattr(CivicModel, "_request", fake_request)
+    monkeypatch.setattr(budget, "CONTEXT_BUDGET_TOKENS", 50)
+    messages = [Message(role="user", content=history([FILLER, FILLER]) + "task")]
+
+    create_model("test-model", stage="engineer", cache=False).invoke(messages, Message(role="assistant"))
+
+    assert "(1 of 2 runs omitted" in seen[0][0].content
+    assert messages[0].content == history([FILLER, FILLER]) + "task"
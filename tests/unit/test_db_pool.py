@@ -0,0 +1,20 @@
+from sqlalchemy import create_engine, event, text
+
+from app.knowledge.engine import InstrumentedQueuePool, pool_metrics
+
+
+def test_instrumented_pool_records_checkouts_and_wait(tmp_path):
+    pool_metrics.reset()
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=1)
+    event.listen(engine, "checkout", lambda *_: pool_metrics.incr("checkouts"))
+
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    snapshot = pool_metrics.snapshot(engine.pool)
+    assert snapshot["checkouts"] == 3
+    assert snapshot["wait_seconds_total"] >= 0
+    assert snapshot["pool_size"] == 1
+    assert snapshot["checked_out"] == 0
+    engine.dispose()
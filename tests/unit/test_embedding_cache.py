@@ -0,0 +1,99 @@
+import asyncio
+import math
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from app.knowledge.embedder import CachedEmbedder, HashingEmbedder, LocalEmbedder, create_embedder, knowledge_table_name
+from app.utils.cache import TieredCache
+
+
+@dataclass
+class CountingEmbedder(HashingEmbedder):
+    batches: List[List[str]] = field(default_factory=list)
+
+    async def async_get_embeddings_batch_and_usage(self, texts):
+        self.batches.append(list(texts))
+        return await super().async_get_embeddings_batch_and_usage(texts)
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dimensions=64)
+    vector = embedder.get_embedding("Pothole on Main Street")
+
+    assert vector == HashingEmbedder(dimensions=64).get_embedding("pothole on main street")
+    assert len(vector) == 64
+    assert math.isclose(math.sqrt(sum(v * v for v in vector)), 1.0)
+    assert embedder.get_embedding("") == [0.0] * 64
+
+
+def test_hashing_embedder_ranks_related_text_closer():
+    embedder = HashingEmbedder()
+    query = embedder.get_embedding("broken street light on elm avenue")
+    related = embedder.get_embedding("street light broken near elm avenue park")
+    unrelated = embedder.get_embedding("library opening hours for the summer")
+
+    assert cosine(query, related) > cosine(query, unrelated)
+
+
+def test_cached_batch_only_embeds_misses():
+    inner = CountingEmbedder(dimensions=32)
+    embedder = CachedEmbedder(embedder=inner, cache=TieredCache("test-embeddings", directory=None))
+
+    first, _ = asyncio.run(embedder.async_get_embeddings_batch_and_usage(["a b", "c d"]))
+    second, _ = asyncio.run(embedder.async_get_embeddings_batch_and_usage(["c d", "e f", "a b"]))
+
+    assert inner.batches == [["a b", "c d"], ["e f"]]
+    assert second[0] == first[1] and second[2] == first[0]
+    assert embedder.get_embedding("e f") == second[1]
+    assert (embedder.hits, embedder.misses) == (3, 3)
+    assert embedder.dimensions == 32
+
+
+def test_cache_key_includes_model():
+    cache = TieredCache("test-embeddings", directory=None)
+    small = CachedEmbedder(embedder=HashingEmbedder(dimensions=16), cache=cache)
+    large = CachedEmbedder(embedder=HashingEmbedder(dimensions=48), cache=cache)
+
+    assert len(small.get_embedding("water main leak")) == 16
+    assert len(large.get_embedding("water main leak")) == 48
+
+
+def test_create_embedder_backends():
+    assert isinstance(create_embedder("hashing"), CachedEmbedder)
+    assert isinstance(create_embedder("hashing", cached=False), HashingEmbedder)
+    assert knowledge_table_name("gemini") == "civic_knowledge"
+    assert knowledge_table_name("local") == "civic_knowledge_local"
+    with pytest.raises(ValueError):
+        create_embedder("word2vec")
+
+
+def test_local_model_is_loaded_once_under_concurrent_first_calls(monkeypatch):
+    loads = []
+
+    class TextEmbedding:
+        def __init__(self, model_name):
+            loads.append(model_name)
+            time.sleep(0.05)  # Model download and ONNX session start
+
+        def embed(self, texts, batch_size):
+            return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setitem(sys.modules, "fastembed", SimpleNamespace(TextEmbedding=TextEmbedding))
+    embedder = LocalEmbedder(id="test-model", dimensions=2)
+    callers = [threading.Thread(target=embedder.get_embedding, args=(f"text {i}",)) for i in range(4)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join(5)
+
+    assert loads == ["test-model"]
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+from agno.knowledge.document import Document
+from agno.vectordb.pgvector import PgVector
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+
+import app.knowledge.base as kb
+import app.knowledge.writer as writer
+from app.knowledge.compaction import merge_group
+from app.knowledge.embedder import HashingEmbedder
+from app.knowledge.writer import dedupe_documents, write_documents
+
+
+def test_findings_hash_ignores_key_order_and_query_spacing():
+    first = kb.findings_hash("Sentinel", "Bihar  floods", {"title": "Kosi", "score": 9})
+    again = kb.findings_hash("Sentinel", " bihar floods ", {"score": 9, "title": "Kosi"})
+
+    assert first == again
+    assert kb.findings_hash("Investigator", "Bihar floods", {"title": "Kosi", "score": 9}) != first
+    assert kb.findings_hash("Sentinel", "Bihar floods", {"title": "Kosi", "score": 8}) != first
+
+
+def test_repeated_findings_produce_the_same_document(monkeypatch):
+    queued = []
+    monkeypatch.setattr(kb.findings_writer, "submit", queued.append)
+
+    kb.persist_agent_findings({"title": "Kosi"}, "Sentinel", "Bihar floods")
+    kb.persist_agent_findings({"title": "Kosi"}, "Sentinel", "Bihar floods")
+
+    assert queued[0].id == queued[1].id
+    assert queued[0].content == queued[1].content
+    unique = dedupe_documents(queued + [Document(content="other")])
+    assert [count for _, count in unique.values()] == [2, 1]
+
+
+def test_merge_keeps_latest_and_sums_counts():
+    plan = merge_group([
+        {"id": "a", "meta_data": {"timestamp": "2026-01-01", "first_seen": "2025-12-01", "seen_count": 3}},
+        {"id": "b", "meta_data": {"timestamp": "2026-02-01", "seen_count": 1}},
+        {"id": "c", "meta_data": {"timestamp": "2026-01-15", "merged_ids": ["z"]}},
+    ])
+
+    assert plan["keep"] == "b"
+    assert sorted(plan["delete"]) == ["a", "c"]
+    assert plan["meta_data"]["seen_count"] == 5
+    assert plan["meta_data"]["first_seen"] == "2025-12-01"
+    assert plan["meta_data"]["merged_ids"] == ["a", "c", "z"]
+
+
+def recording_vector_db(monkeypatch, stored=()):
+    """A PgVector whose session records statements; lookups return `stored` (hash, merged_ids) rows."""
+    engine = create_engine("postgresql+psycopg://ai:ai@localhost:5532/ai")
+    vector_db = PgVector(table_name="civic_knowledge", db_engine=engine, embedder=HashingEmbedder(dimensions=8))
+    statements = []
+
+    class Session:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, stmt):
+            statements.append(stmt)
+            return SimpleNamespace(all=lambda: list(stored))
+
+        def commit(self):
+            pass
+
+    vector_db.Session = Session
+    monkeypatch.setattr(writer, "_created_tables", {"civic_knowledge"})
+    return vector_db, statements
+
+
+def test_concurrent_inserts_of_a_hash_add_up_counts(monkeypatch):
+    # Nothing connects: the session only records the statements it is given
+    vector_db, statements = recording_vector_db(monkeypatch)
+
+    write_documents([Document(id="a", content="Kosi floods"), Document(id="a", content="Kosi floods")],
+                    SimpleNamespace(vector_db=vector_db))
+
+    sql = str(statements[-1].compile(dialect=postgresql.dialect()))
+    conflict = sql[sql.index("ON CONFLICT"):]
+    assert "civic_knowledge.meta_data || excluded.meta_data" in conflict
+    assert "coalesce(CAST((ai.civic_knowledge.meta_data ->>" in conflict
+    assert "coalesce(CAST((excluded.meta_data ->>" in conflict
+    assert "jsonb_strip_nulls" in conflict and "coalesce(ai.civic_knowledge.meta_data" in conflict
+
+
+def test_repeats_of_a_compacted_finding_count_against_its_survivor(monkeypatch):
+    plan = merge_group([
+        {"id": "kept", "meta_data": {"timestamp": "2026-02-01", "seen_count": 2}},
+        {"id": "gone", "meta_data": {"timestamp": "2026-01-01", "seen_count": 1}},
+    ])
+    vector_db, statements = recording_vector_db(monkeypatch, stored=[("kept", plan["meta_data"]["merged_ids"])])
+    repeat = Document(id="gone", content="Kosi floods", meta_data={"content_hash": "gone", "seen_count": 1})
+
+    write_documents([repeat, repeat], SimpleNamespace(vector_db=vector_db))
+
+    lookup, bump = [str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+                    for stmt in statements]
+    assert "?| ARRAY['gone']" in lookup
+    assert bump.startswith("UPDATE ai.civic_knowledge")
+    assert "content_hash IN ('kept')" in bump and "+ 2" in bump
+    assert repeat.embedding is None
@@ -0,0 +1,62 @@
+"""
+Cold-start budget: entry points must import without loading the team, the
+knowledge base, LangWatch or any tool. Measured with `python -X importtime`
+in a fresh interpreter; IMPORT_BUDGET_MS raises the budget on slow machines.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "500"))
+
+# Subsystems that are only loaded once they are used
+DEFERRED = [
+    "langwatch",
+    "agno.agent",
+    "agno.team",
+    "agno.tools.parallel",
+    "agno.vectordb.pgvector",
+    "agno.os",
+    "psycopg",
+    "openai",
+    "app.team",
+    "app.workflow",
+    "app.knowledge.base",
+]
+
+
+def import_profile(module):
+    """(cumulative import time of `module` in ms, modules it loaded)."""
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, timeout=60, check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative = int(parts[1]) / 1000
+    return cumulative, set(result.stdout.split())
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.agent_os"])
+def test_entry_point_imports_within_budget(module):
+    elapsed_ms, loaded = import_profile(module)
+
+    assert sorted(name for name in DEFERRED if name in loaded) == []
+    assert elapsed_ms is not None and elapsed_ms < BUDGET_MS, f"import {module} took {elapsed_ms:.0f}ms"
+
+
+def test_package_exports_resolve_on_first_use():
+    import app.knowledge as knowledge
+    import app.llm as llm
+
+    assert callable(knowledge.get_shared_db)
+    assert llm.DEFAULT_MODEL
+    assert "persist_agent_findings" in dir(knowledge)
+    with pytest.raises(AttributeError):
+        knowledge.missing_name
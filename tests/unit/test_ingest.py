@@ -0,0 +1,223 @@
+import io
+import threading
+from types import SimpleNamespace
+
+import pytest
+from agno.knowledge.document import Document
+from agno.vectordb.pgvector import PgVector
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+
+import app.knowledge.writer as writer
+from app.knowledge.embedder import HashingEmbedder
+from app.knowledge.ingest import BulkIngestor, chunk_stream, parse_blocks
+from app.knowledge.writer import write_documents
+
+
+class RecordingIngestor(BulkIngestor):
+    """Ingestor whose storage is a dict, so the pipeline runs without Postgres."""
+
+    def __init__(self, stored=None, fail_writes=0, **options):
+        super().__init__(knowledge=object(), progress_every=0, **options)
+        self.stored = dict(stored or {})
+        self.rows = {}
+        self.batches = []
+        self.committed = []
+        self.fail_writes = fail_writes
+        self._lock = threading.Lock()
+
+    def stored_hashes(self, sources):
+        return {s: h for s, h in self.stored.items() if s in sources}
+
+    def commit_source(self, source, source_hash):
+        with self._lock:
+            self.committed.append(source)
+            self.stored[source] = source_hash
+            self.rows = {
+                key: meta for key, meta in self.rows.items()
+                if meta["source_url"] != source or meta.get("pending")
+            }
+            for meta in self.rows.values():
+                if meta["source_url"] == source and meta["source_hash"] == source_hash:
+                    meta.pop("pending", None)
+
+    def discard_source(self, source, source_hash):
+        with self._lock:
+            self.rows = {
+                key: meta for key, meta in self.rows.items()
+                if not (meta["source_url"] == source and meta["source_hash"] == source_hash and meta.get("pending"))
+            }
+
+    def write(self, batch):
+        with self._lock:
+            if self.fail_writes:
+                self.fail_writes -= 1
+                raise RuntimeError("database unavailable")
+            self.batches.append(batch)
+            for doc in batch:
+                self.rows[doc.id] = dict(doc.meta_data)
+
+    def chunks_of(self, source):
+        return [meta for meta in self.rows.values() if meta["source_url"] == source]
+
+
+def recording_vector_db(monkeypatch, stored=()):
+    """A PgVector whose session records statements; lookups return `stored` rows."""
+    engine = create_engine("postgresql+psycopg://ai:ai@localhost:5532/ai")
+    vector_db = PgVector(table_name="civic_knowledge", db_engine=engine, embedder=HashingEmbedder(dimensions=8))
+    statements = []
+
+    class Session:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, stmt):
+            statements.append(str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})))
+            return SimpleNamespace(all=lambda: list(stored))
+
+        def commit(self):
+            pass
+
+    vector_db.Session = Session
+    monkeypatch.setattr(writer, "_created_tables", {"civic_knowledge"})
+    return vector_db, statements
+
+
+def test_chunk_stream_respects_size_and_overlap():
+    words = [f"word{i:03d}" for i in range(300)]
+    pieces = [" ".join(words[i:i + 7]) for i in range(0, 300, 7)]
+
+    chunks = list(chunk_stream(pieces, chunk_size=100, overlap=20))
+
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert all(a.split()[-1] in b.split()[:3] for a, b in zip(chunks, chunks[1:]))
+    seen = {word for chunk in chunks for word in chunk.split()}
+    assert seen == set(words)
+
+
+def test_chunk_stream_splits_long_words():
+    assert list(chunk_stream(["x" * 25], chunk_size=10, overlap=0)) == ["x" * 10, "x" * 10, "x" * 5]
+    with pytest.raises(ValueError):
+        list(chunk_stream(["a"], chunk_size=10, overlap=10))
+
+
+def test_parse_html_keeps_visible_text_only():
+    html = b"<html><head><style>p {}</style><script>var x = 1;</script></head><body><p>Open &amp; shut</p></body></html>"
+    text = " ".join(" ".join(parse_blocks(io.BytesIO(html), "page.html")).split())
+    assert text == "Open & shut"
+
+
+def test_ingests_in_batches_and_skips_unchanged(tmp_path):
+    sources = []
+    for i in range(5):
+        path = tmp_path / f"report{i}.txt"
+        path.write_text(" ".join(f"finding {i} item {n}" for n in range(200)))
+        sources.append(str(path))
+    ingestor = RecordingIngestor(workers=3, writers=2, batch_size=8, chunk_size=200, overlap=0)
+
+    report = ingestor.run(sources + [str(tmp_path / "missing.txt")])
+
+    assert (report.ingested, report.failed, report.unchanged) == (5, 1, 0)
+    assert report.chunks == sum(len(batch) for batch in ingestor.batches)
+    assert all(len(batch) <= 8 for batch in ingestor.batches)
+    assert len({doc.id for batch in ingestor.batches for doc in batch}) == report.chunks
+
+    (tmp_path / "report0.txt").write_text("revised report")
+    again = ingestor.run(sources)
+
+    assert (again.ingested, again.unchanged, again.chunks) == (1, 4, 1)
+    assert ingestor.committed[-1] == sources[0]
+    assert [meta["chunk"] for meta in ingestor.chunks_of(sources[0])] == [1]
+    assert not any("pending" in meta for meta in ingestor.rows.values())
+
+
+def test_a_failed_write_keeps_the_stored_version_and_is_retried(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text(" ".join(f"finding {n}" for n in range(200)))
+    ingestor = RecordingIngestor(batch_size=4, chunk_size=100, overlap=0)
+    ingestor.run([str(path)])
+    stored = ingestor.stored[str(path)]
+    chunks = len(ingestor.chunks_of(str(path)))
+
+    path.write_text(" ".join(f"revised {n}" for n in range(200)))
+    ingestor.fail_writes = 1
+    failed = ingestor.run([str(path)])
+
+    assert (failed.ingested, failed.failed) == (0, 1)
+    assert "write failed" in failed.errors[str(path)]
+    assert ingestor.stored[str(path)] == stored
+    assert len(ingestor.chunks_of(str(path))) == chunks
+    assert all("pending" not in meta for meta in ingestor.chunks_of(str(path)))
+
+    retried = ingestor.run([str(path)])
+
+    assert (retried.ingested, retried.unchanged) == (1, 0)
+    assert ingestor.stored[str(path)] != stored
+
+
+def test_a_parse_failure_discards_the_chunks_already_written(tmp_path, monkeypatch):
+    path = tmp_path / "report.txt"
+    path.write_text("original")
+    ingestor = RecordingIngestor(batch_size=2, chunk_size=50, overlap=0)
+    ingestor.run([str(path)])
+
+    def broken(file, source, content_type=""):
+        yield " ".join(f"page {n}" for n in range(50))
+        raise ValueError("corrupt page")
+
+    monkeypatch.setattr("app.knowledge.ingest.parse_blocks", broken)
+    path.write_text("changed")
+    report = ingestor.run([str(path)])
+
+    assert (report.ingested, report.failed) == (0, 1)
+    assert report.chunks > 0
+    assert "corrupt page" in report.errors[str(path)]
+    assert [meta["chunk"] for meta in ingestor.chunks_of(str(path))] == [1]
+    assert ingestor.run([str(path)]).failed == 1
+
+
+def test_a_forced_run_replaces_unchanged_sources(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text(" ".join(f"finding {n}" for n in range(200)))
+    ingestor = RecordingIngestor(batch_size=4, chunk_size=100, overlap=0)
+    ingestor.run([str(path)])
+    stored = set(ingestor.rows)
+
+    assert ingestor.run([str(path)]).unchanged == 1
+    forced = ingestor.run([str(path)], force=True)
+
+    assert (forced.ingested, forced.unchanged) == (1, 0)
+    assert len(ingestor.rows) == len(stored) and not stored & set(ingestor.rows)
+    assert not any("pending" in meta for meta in ingestor.rows.values())
+
+
+def test_commit_and_discard_statements(monkeypatch):
+    vector_db, statements = recording_vector_db(monkeypatch)
+    ingestor = BulkIngestor(SimpleNamespace(vector_db=vector_db), progress_every=0)
+
+    ingestor.commit_source("report.pdf", "abc")
+    delete_stored, publish = statements
+    assert delete_stored.startswith("DELETE FROM ai.civic_knowledge")
+    assert "->> 'source_url') = 'report.pdf'" in delete_stored
+    assert "NOT (ai.civic_knowledge.meta_data ? 'pending')" in delete_stored
+    assert publish.startswith("UPDATE ai.civic_knowledge SET meta_data=(ai.civic_knowledge.meta_data - 'pending')")
+    assert "->> 'source_hash') = 'abc'" in publish and "meta_data ? 'pending'" in publish
+
+    statements.clear()
+    ingestor.discard_source("report.pdf", "abc")
+    (discard,) = statements
+    assert discard.startswith("DELETE FROM ai.civic_knowledge")
+    assert "->> 'source_hash') = 'abc'" in discard and "meta_data ? 'pending'" in discard
+    assert "NOT" not in discard
+
+
+def test_rewritten_chunks_do_not_count_as_seen_again(monkeypatch):
+    chunk = Document(id="k", content="Ganga", meta_data={"type": "document", "content_hash": "k", "pending": True})
+    vector_db, statements = recording_vector_db(monkeypatch, stored=[("k", None)])
+
+    write_documents([chunk, chunk], SimpleNamespace(vector_db=vector_db))
+
+    assert len(statements) == 1 and statements[0].startswith("SELECT")
@@ -0,0 +1,136 @@
+import pytest
+
+from app.jobs import Job, JobQueue, JobStatus, QueueFullError
+
+
+def fake_runner(job, emit):
+    for stage in ("1. Select ONE Problem", "2. Identify ONE Cause"):
+        emit({"event": "stage_started", "stage": stage})
+        emit({"event": "stage_completed", "stage": stage})
+    return f"blueprint for {job.query}"
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_streams_stage_events():
+    queue = JobQueue(runner=fake_runner, workers=1)
+    await queue.start()
+    try:
+        job = queue.submit(Job(query="Ganga"))
+        events = [event["event"] async for event in queue.events(job.id)]
+    finally:
+        await queue.stop()
+
+    assert job.status is JobStatus.succeeded
+    assert job.result == "blueprint for Ganga"
+    assert events == [
+        "queued", "started",
+        "stage_started", "stage_completed",
+        "stage_started", "stage_completed",
+        "succeeded",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error():
+    def failing_runner(job, emit):
+        raise ValueError("upstream timeout")
+
+    queue = JobQueue(runner=failing_runner, workers=1)
+    await queue.start()
+    try:
+        job = queue.submit(Job(query="Ganga"))
+        [event async for event in queue.events(job.id)]
+    finally:
+        await queue.stop()
+
+    assert job.status is JobStatus.failed
+    assert job.error == "upstream timeout"
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_queue_is_full():
+    queue = JobQueue(runner=fake_runner, max_queue=1, workers=0)
+    await queue.start()
+    queue.submit(Job(query="first"))
+
+    with pytest.raises(QueueFullError):
+        queue.submit(Job(query="second"))
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_jobs_forward_tokens_and_priority(monkeypatch):
+    import app.streaming
+    from app.jobs import run_pipeline_job
+
+    calls = []
+
+    def fake_stream(query, **kwargs):
+        calls.append(kwargs)
+        yield {"event": "stage_started", "stage": "1. Select ONE Problem", "field": "problem"}
+        if kwargs["tokens"]:
+            yield {"event": "token", "stage": "1. Select ONE Problem", "field": "problem", "delta": "Gan"}
+        yield {"event": "run_completed", "run_id": "r", "result": "blueprint"}
+
+    monkeypatch.setattr(app.streaming, "stream_pipeline", fake_stream)
+    queue = JobQueue(runner=run_pipeline_job, workers=1)
+    await queue.start()
+    try:
+        plain = queue.submit(Job(query="Ganga"))
+        plain_events = [event["event"] async for event in queue.events(plain.id)]
+        streamed = queue.submit(Job(query="Ganga", tokens=True, priority=0))
+        streamed_events = [event async for event in queue.events(streamed.id)]
+    finally:
+        await queue.stop()
+
+    assert [(call["tokens"], call["priority"]) for call in calls] == [(False, None), (True, 0)]
+    assert "token" not in plain_events
+    assert [event["delta"] for event in streamed_events if event["event"] == "token"] == ["Gan"]
+    assert streamed.result == "blueprint"
+    # Tokens only reach followers connected while they stream: the job keeps stage events
+    assert "token" not in [event["event"] for event in streamed.events]
+    assert "token" not in [event["event"] async for event in queue.events(streamed.id)]
+
+
+@pytest.mark.asyncio
+async def test_every_worker_runs_a_job_at_once():
+    import asyncio
+    import threading
+
+    running, peak = [0], [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def slow_runner(job, emit):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+
+    queue = JobQueue(runner=slow_runner, workers=4)
+    await queue.start()
+    try:
+        jobs = [queue.submit(Job(query=f"q{i}")) for i in range(6)]
+        for _ in range(100):
+            if peak[0] == 4:
+                break
+            await asyncio.sleep(0.01)
+        release.set()
+        for job in jobs:
+            [event async for event in queue.events(job.id)]
+    finally:
+        await queue.stop()
+
+    assert peak[0] == 4
+
+
+def test_unknown_modes_are_rejected():
+    from fastapi.testclient import TestClient
+
+    from app.serve import app
+
+    response = TestClient(app).post("/run", json={"query": "Ganga", "mode": "teams"})
+
+    assert response.status_code == 422
@@ -0,0 +1,59 @@
+from agno.knowledge.embedder.base import Embedder
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+
+from app.knowledge.admin import filter_index_sql, search_statement, vector_index_sql
+
+
+def _vector_db(distance=Distance.cosine):
+    # Nothing connects until a statement runs, so no database is needed here
+    engine = create_engine("postgresql+psycopg://ai:ai@localhost:5532/ai")
+    return PgVector(table_name="civic_knowledge", db_engine=engine, embedder=Embedder(dimensions=3), distance=distance)
+
+
+def _sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_filtered_vector_search_orders_by_distance():
+    sql = _sql(search_statement(_vector_db(), [0.1, 0.2, 0.3], agent="Sentinel", since="2026-01-01"))
+
+    assert "meta_data ->>" in sql
+    assert "ORDER BY ai.civic_knowledge.embedding <=>" in sql
+    assert "ts_rank_cd" not in sql
+    assert "NOT (ai.civic_knowledge.meta_data ? " in sql
+
+
+def test_hybrid_search_reranks_nearest_candidates():
+    sql = _sql(search_statement(_vector_db(), [0.1, 0.2, 0.3], query="sewage", doc_type="agent_findings", limit=5))
+
+    # The inner query is a plain nearest-neighbour scan the ANN index can serve
+    inner = sql[sql.index("FROM (") :]
+    assert "ORDER BY ai.civic_knowledge.embedding <=>" in inner
+    assert "ts_rank_cd" in sql and "websearch_to_tsquery" in sql
+
+
+def test_search_uses_the_indexed_distance_metric():
+    for distance, operator, opclass in [
+        (Distance.l2, "<->", "vector_l2_ops"),
+        (Distance.max_inner_product, "<#>", "vector_ip_ops"),
+    ]:
+        db = _vector_db(distance)
+
+        assert f"ORDER BY ai.civic_knowledge.embedding {operator}" in _sql(search_statement(db, [0.1, 0.2, 0.3]))
+        hybrid = _sql(search_statement(db, [0.1, 0.2, 0.3], query="sewage"))
+        assert f"ORDER BY ai.civic_knowledge.embedding {operator}" in hybrid[hybrid.index("FROM ("):]
+        assert opclass in vector_index_sql(db, "hnsw", "civic_knowledge_hnsw_index")
+
+
+def test_index_sql():
+    db = _vector_db()
+
+    hnsw = vector_index_sql(db, "hnsw", "civic_knowledge_hnsw_index")
+    ivfflat = vector_index_sql(db, "ivfflat", "civic_knowledge_ivfflat_index", rows=50_000)
+
+    assert "USING hnsw (embedding vector_cosine_ops) WITH (m = 16" in hnsw
+    assert "WITH (lists = 50)" in ivfflat
+    assert any("meta_data->>'agent'" in sql for sql in filter_index_sql(db))
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError
+
+import app.llm.resilience as resilience
+from app.llm.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    LatencyHistogram,
+    call_with_resilience,
+    call_stats,
+    current_attempt,
+    llm_stats,
+)
+
+REQUEST = httpx.Request("POST", "http://test")
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    resilience.reset_llm_stats()
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    yield
+    resilience.reset_llm_stats()
+
+
+def flaky(failures, result="ok"):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise APIConnectionError(request=REQUEST)
+        return result
+
+    return fn, calls
+
+
+def test_retries_transient_errors():
+    fn, calls = flaky(2)
+    assert call_with_resilience(fn, "m", "sentinel", retries=2, hedge=False) == "ok"
+    stats = call_stats("m", "sentinel").snapshot()
+    assert (len(calls), stats["retries"], stats["latency"]["count"]) == (3, 2, 1)
+
+
+def test_client_errors_are_not_retried():
+    def fn():
+        raise BadRequestError("bad", response=httpx.Response(400, request=REQUEST), body=None)
+
+    with pytest.raises(BadRequestError):
+        call_with_resilience(fn, "m", retries=3, hedge=False)
+    assert call_stats("m", None).attempts == 1
+
+
+def test_deadline_abandons_a_stuck_call():
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_with_resilience(lambda: time.sleep(2), "m", deadline=0.2, hedge=False)
+    assert time.monotonic() - started < 1
+
+
+def test_hedge_after_p95_uses_the_first_answer():
+    for _ in range(resilience.LLM_HEDGE_MIN_SAMPLES):
+        call_stats("m", "s").latency.record(0.1)
+    first = threading.Event()
+
+    def fn():
+        if not first.is_set():
+            first.set()
+            time.sleep(2)  # The stuck request
+            return "slow"
+        return "fast"
+
+    started = time.monotonic()
+    assert call_with_resilience(fn, "m", "s", hedge=True) == "fast"
+    assert time.monotonic() - started < 1
+    stats = call_stats("m", "s")
+    assert (stats.hedges, stats.hedge_wins) == (1, 1)
+
+
+def test_losing_and_timed_out_attempts_are_cancelled():
+    for _ in range(resilience.LLM_HEDGE_MIN_SAMPLES):
+        call_stats("m", "s").latency.record(0.1)
+    first = threading.Event()
+    loser = []
+
+    def fn():
+        if not first.is_set():
+            first.set()
+            loser.append(current_attempt())
+            loser[0].cancelled.wait(2)
+            return "slow"
+        return "fast"
+
+    assert call_with_resilience(fn, "m", "s", hedge=True) == "fast"
+    assert loser[0].cancelled.is_set()
+    assert call_stats("m", "s").abandoned == 1
+
+    # An attempt still queued for a worker at the deadline never runs
+    release = threading.Event()
+    ran = []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        resilience._call_pool, saved = pool, resilience._call_pool
+        try:
+            pool.submit(release.wait, 2)
+            with pytest.raises(DeadlineExceeded):
+                call_with_resilience(lambda: ran.append(1), "q", deadline=0.2, hedge=False)
+        finally:
+            resilience._call_pool = saved
+            release.set()
+    assert ran == [] and call_stats("q", None).abandoned == 0
+
+
+def test_circuit_opens_then_half_opens():
+    breaker = CircuitBreaker(failures=2, reset=0.1)
+    resilience._breakers["m"] = breaker
+    fn, _ = flaky(100)
+    for _ in range(2):
+        with pytest.raises(APIConnectionError):
+            call_with_resilience(fn, "m", retries=0, hedge=False)
+    with pytest.raises(CircuitOpenError):
+        call_with_resilience(fn, "m", retries=0, hedge=False)
+    assert llm_stats()["circuits"] == {"m": "open"}
+
+    time.sleep(0.15)
+    assert call_with_resilience(lambda: "ok", "m", retries=0, hedge=False) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for seconds in [0.1] * 90 + [4] * 9 + [50]:
+        histogram.record(seconds)
+    assert (histogram.percentile(50), histogram.percentile(95), histogram.percentile(100)) == (0.25, 5, 60)
+    assert histogram.snapshot()["count"] == 100
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APITimeoutError
+
+import app.llm.resilience as resilience
+import app.llm.routing as routing
+from app.llm import CivicModel, create_model, create_routed_model, route_model
+
+
+@pytest.fixture
+def prompt_models(monkeypatch):
+    models = {}
+    monkeypatch.setattr(routing, "_prompt_model", lambda slug: models.get(slug))
+    return models
+
+
+def test_stages_get_their_tier(prompt_models):
+    assert route_model("sentinel").model_id == routing.DEFAULT_MODEL
+    assert route_model("bureaucrat").tier == "fast"
+    assert route_model("engineer").tier == "standard"
+    assert route_model("sentinel").fallback_id == route_model("engineer").model_id
+    assert route_model("bureaucrat").fallback_id is None
+
+
+def test_prompt_model_field_and_overrides(prompt_models, monkeypatch):
+    prompt_models.update(engineer="fast", liaison="mistral", auditor="mistral-large-latest")
+
+    assert route_model("engineer").tier == "fast"
+    assert route_model("liaison") == routing.ModelRoute("mistral")
+    assert route_model("auditor").tier == "standard"  # Not a Pollinations model: ignored
+    assert route_model("engineer", model_id="reasoning").tier == "reasoning"
+
+    monkeypatch.setenv("MODEL_ENGINEER", "claude")
+    assert route_model("engineer", model_id="reasoning").model_id == "claude"
+
+    monkeypatch.setattr(routing, "MODEL_ROUTING", False)
+    assert route_model("bureaucrat").model_id == routing.DEFAULT_MODEL
+
+
+def test_timeout_falls_back_to_next_tier(prompt_models, monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    model = create_routed_model("sentinel", cache=False)
+    calls = []
+
+    def fake_invoke(self, messages, assistant_message, **kwargs):
+        calls.append(self.id)
+        if self.id == model.id:
+            raise APITimeoutError(request=httpx.Request("POST", "http://test"))
+        return SimpleNamespace(content="ok")
+
+    monkeypatch.setattr(CivicModel, "_invoke_once", fake_invoke)
+    assert model.invoke([], None).content == "ok"
+    assert calls == [model.id, model.fallback_id]
+
+
+def test_other_errors_do_not_fall_back():
+    model = create_model("a", fallback_id="b", cache=False)
+    model._invoke_once = lambda *args, **kwargs: (_ for _ in ()).throw(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        model.invoke([], None)
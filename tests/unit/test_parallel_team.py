@@ -0,0 +1,45 @@
+import threading
+from types import SimpleNamespace
+
+from app.team.builder import TEAM_MEMBERS
+from app.team.parallel import ParallelTeam
+
+
+class FakeAgent:
+    def __init__(self, name, barrier=None):
+        self.name = name
+        self.barrier = barrier
+        self.messages = []
+
+    def run(self, message, **kwargs):
+        self.messages.append(message)
+        if self.barrier is not None:
+            self.barrier.wait()
+        return SimpleNamespace(content=f"{self.name} findings " + "x" * 50)
+
+
+def test_independent_members_run_together_with_capped_context():
+    # Auditor and Engineer only pass the barrier if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    members = {
+        name: FakeAgent(name.title(), barrier if name in ("auditor", "engineer") else None)
+        for name, _, _ in TEAM_MEMBERS
+    }
+    leader = FakeAgent("Leader")
+    team = ParallelTeam(
+        members=members,
+        dependencies={name: deps for name, _, deps in TEAM_MEMBERS},
+        leader=leader,
+        context_chars=20,
+    )
+
+    response = team.run("Ganga pollution", session_id="s-1")
+
+    assert response.content.startswith("Leader findings")
+    assert team.levels[3:] == [["auditor", "engineer"], ["coordinator", "liaison"]]
+    liaison_message = members["liaison"].messages[0]
+    assert "Findings from Engineer" in liaison_message and "Findings from Auditor" in liaison_message
+    assert "Findings from Sentinel" not in liaison_message
+    assert "[truncated]" in liaison_message
+    # The leader gets every member's full findings
+    assert all(f"Findings from {agent.name}" in leader.messages[0] for agent in members.values())
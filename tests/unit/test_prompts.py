@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+from app.utils.prompts import PromptRegistry, LocalPrompt, _CachedPrompt
+
+
+def _write_prompt(path, text):
+    path.write_text(
+        "slug: demo\n"
+        "messages:\n"
+        "  - role: system\n"
+        f"    content: {text}\n"
+        "  - role: user\n"
+        "    content: 'Scan {{ query }}'\n"
+    )
+
+
+def test_registry_caches_and_counts(tmp_path):
+    _write_prompt(tmp_path / "demo.yaml", "v1")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), ttl=0)
+
+    first = registry.get("demo")
+    second = registry.get("demo")
+
+    assert isinstance(first, LocalPrompt)
+    assert first is second
+    assert registry.stats()["hits"] == 1
+    assert registry.stats()["misses"] == 1
+
+
+def test_registry_reloads_when_yaml_changes(tmp_path):
+    path = tmp_path / "demo.yaml"
+    _write_prompt(path, "v1")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), ttl=0)
+    first = registry.get("demo")
+
+    _write_prompt(path, "v2")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    second = registry.get("demo")
+    assert second is not first
+    assert second.messages[0]["content"] == "v2"
+
+
+def test_warm_skips_unknown_slugs(tmp_path):
+    _write_prompt(tmp_path / "demo.yaml", "v1")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), ttl=0)
+
+    assert registry.warm(["demo", "missing"]) == ["demo"]
+    assert registry.stats()["slugs"] == ["demo"]
+
+
+def test_a_slow_load_holds_up_only_its_own_slug(tmp_path):
+    _write_prompt(tmp_path / "demo.yaml", "v1")
+    registry = PromptRegistry(prompts_dir=str(tmp_path), ttl=0)
+    registry.get("demo")
+    load = registry._load
+    started, release = threading.Event(), threading.Event()
+    fetches = []
+
+    def slow_load(slug, previous=None):
+        if slug != "remote":
+            return load(slug, previous)
+        fetches.append(slug)
+        started.set()
+        release.wait(5)
+        return _CachedPrompt(LocalPrompt(slug, []), "langwatch", version=1)
+
+    registry._load = slow_load
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(registry.get("remote"))) for _ in range(3)]
+    for caller in callers:
+        caller.start()
+    assert started.wait(5)
+    while registry.stats()["misses"] < 4:
+        time.sleep(0.01)
+
+    # Other slugs are served while the fetch is in flight
+    assert registry.get("demo").messages[0]["content"] == "v1"
+    release.set()
+    for caller in callers:
+        caller.join(5)
+
+    assert fetches == ["remote"]
+    assert len(results) == 3 and all(prompt is results[0] for prompt in results)
+
+
+def test_format_renders_placeholders_in_one_pass():
+    prompt = LocalPrompt("demo", [
+        {"role": "system", "content": "You scan {{query}}."},
+        {"role": "user", "content": "Scan {{ query }} with {{ context }} and {{ missing }}"},
+    ])
+
+    system, user = prompt.format(query="Bihar", context={"stage": 2})
+
+    assert system.role == "system"
+    assert system.content == "You scan Bihar."
+    assert user.content == 'Scan Bihar with {\n  "stage": 2\n} and {{ missing }}'
+
+
+def test_format_serializes_pydantic_models():
+    from app.models import SelectedDepartment
+
+    department = SelectedDepartment(
+        name="NMCG",
+        department_type="govt",
+        jurisdiction="central",
+        why_responsible="Nodal agency",
+    )
+    prompt = LocalPrompt("demo", [{"role": "user", "content": "Context: {{ investigation_json }}"}])
+
+    (message,) = prompt.format(investigation_json=department)
+
+    assert message.content == f"Context: {department.model_dump_json(indent=2)}"
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+import app.utils.ratelimit as ratelimit
+from app.utils.ratelimit import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    MemoryBuckets,
+    RateLimiter,
+    RateLimitTimeout,
+    SQLiteBuckets,
+    rate_limit_tool_hook,
+    rate_limited,
+    request_priority,
+)
+
+
+def test_burst_then_refill_rate():
+    limiter = RateLimiter("api", rate=20, burst=3)
+
+    waits = [limiter.acquire() for _ in range(5)]
+
+    assert waits[:3] == pytest.approx([0, 0, 0], abs=0.01)
+    # The 4th and 5th calls wait for tokens at 20/s
+    assert sum(waits[3:]) == pytest.approx(0.1, abs=0.04)
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_timeout_when_no_token_arrives():
+    limiter = RateLimiter("api", rate=1, burst=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0.05)
+
+
+def test_waiters_are_served_by_priority():
+    limiter = RateLimiter("api", rate=20, burst=1)
+    limiter.acquire()  # Empty the bucket so everyone below queues
+    order = []
+
+    def call(priority, label):
+        limiter.acquire(priority=priority)
+        order.append(label)
+
+    threads = [threading.Thread(target=call, args=(PRIORITY_LOW, f"low-{i}")) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    urgent = threading.Thread(target=call, args=(PRIORITY_HIGH, "high"))
+    urgent.start()
+    for thread in threads + [urgent]:
+        thread.join()
+
+    # The high-priority caller overtakes the low-priority ones still queued
+    assert order.index("high") < 2
+
+
+def test_priority_comes_from_context():
+    limiter = RateLimiter("api", rate=100, burst=1)
+    seen = []
+    limiter.store.take = lambda *args: seen.append(limiter._waiters[0][0]) or 0.0
+
+    with request_priority(PRIORITY_LOW):
+        limiter.acquire()
+    limiter.acquire()
+
+    assert seen == [PRIORITY_LOW, ratelimit.PRIORITY_NORMAL]
+
+
+def test_sqlite_bucket_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    # Two stores on one file stand in for two processes
+    first = RateLimiter("api", rate=0.5, burst=2, store=SQLiteBuckets(path))
+    second = RateLimiter("api", rate=0.5, burst=2, store=SQLiteBuckets(path))
+
+    first.acquire()
+    second.acquire()
+
+    with pytest.raises(RateLimitTimeout):
+        first.acquire(timeout=0.1)
+
+
+def test_penalty_pauses_every_sharer(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    first = RateLimiter("api", rate=100, burst=10, store=SQLiteBuckets(path))
+    second = RateLimiter("api", rate=100, burst=10, store=SQLiteBuckets(path))
+
+    first.penalize(0.1)
+
+    assert second.acquire() == pytest.approx(0.11, abs=0.05)
+
+
+def test_concurrency_cap():
+    limiter = RateLimiter("api", rate=1000, burst=100, max_concurrent=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    monkeypatch.setattr(ratelimit, "_store", MemoryBuckets())
+    monkeypatch.setenv("RATE_LIMIT_PARALLEL_SEARCH", "50,1")
+    return ratelimit
+
+
+def test_429_drains_the_bucket_for_retry_after(limiters):
+    response = httpx.Response(429, headers={"retry-after": "0.2"}, request=httpx.Request("POST", "http://test"))
+
+    with pytest.raises(RateLimitError):
+        with rate_limited("pollinations"):
+            raise RateLimitError("slow down", response=response, body=None)
+
+    limiter = limiters.rate_limiter("pollinations")
+    assert limiter.stats()["penalties"] == 1
+    assert limiter.acquire() == pytest.approx(0.2, abs=0.05)
+
+
+def test_tool_hook_limits_known_tools_only(limiters):
+    calls = []
+
+    def tool(**kwargs):
+        calls.append(kwargs)
+        return "ok"
+
+    assert rate_limit_tool_hook("parallel_search", tool, {"objective": "x"}) == "ok"
+    assert rate_limit_tool_hook("think", tool, {}) == "ok"
+
+    assert limiters.rate_limiter("think") is None
+    search = limiters.rate_limiter("parallel_search")
+    assert (search.rate, search.burst) == (50.0, 1.0)
+    assert set(limiters.rate_limit_stats()) == {"parallel_search"}
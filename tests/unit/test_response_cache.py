@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+
+import app.llm.model as llm_model
+from app.llm import CivicModel, no_response_cache
+from app.llm.cache import response_cache_key
+from app.utils.cache import TieredCache
+
+
+@dataclass
+class CountingModel(CivicModel):
+    calls: int = 0
+
+    def invoke(self, *args, **kwargs) -> ModelResponse:
+        self.calls += 1
+        return ModelResponse(role="assistant", content=f"answer {self.calls}")
+
+
+def _messages(time="2026-10-17 09:15:02.123456+00:00"):
+    return [
+        Message(role="system", content=f"You are the Sentinel.\nThe current time is {time}."),
+        Message(role="user", content="Scan Bihar"),
+    ]
+
+
+def test_repeated_call_is_served_from_cache(monkeypatch):
+    monkeypatch.setattr(llm_model, "response_cache", TieredCache("test", directory=None))
+    model = CountingModel(id="test-model", stage="sentinel", cache_response=True)
+
+    first = model.response(messages=_messages())
+    second = model.response(messages=_messages(time="2026-10-17 18:40:00.000001+00:00"))
+
+    assert model.calls == 1
+    assert first.content == second.content == "answer 1"
+
+
+def test_bypass_skips_lookup_but_refreshes(monkeypatch):
+    monkeypatch.setattr(llm_model, "response_cache", TieredCache("test", directory=None))
+    model = CountingModel(id="test-model", stage="sentinel", cache_response=True)
+
+    model.response(messages=_messages())
+    with no_response_cache():
+        refreshed = model.response(messages=_messages())
+    cached = model.response(messages=_messages())
+
+    assert model.calls == 2
+    assert refreshed.content == cached.content == "answer 2"
+
+
+def test_key_depends_on_model_schema_and_tools():
+    messages = _messages()
+    base = response_cache_key("m1", messages)
+
+    assert response_cache_key("m2", messages) != base
+    assert response_cache_key("m1", messages, response_format={"type": "json_object"}) != base
+    assert response_cache_key("m1", messages, tools=[{"type": "function", "function": {"name": "search"}}]) != base
+    assert response_cache_key("m1", _messages(time="2026-10-18 00:00:00+00:00")) != base
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app.workflow as workflow
+from app.checkpoints import CheckpointStore
+from app.models import RemediationBlueprint
+from app.utils.cache import TieredCache
+
+
+class FakeAgent:
+    def __init__(self, slug, calls, selections):
+        self.slug = slug
+        self.calls = calls
+        self.selections = selections
+
+    def run(self, message, **kwargs):
+        self.calls.append(self.slug)
+        return SimpleNamespace(content=self.selections[self.slug])
+
+
+@pytest.fixture
+def pipeline(monkeypatch, selections):
+    calls = []
+    monkeypatch.setattr(workflow, "get_pooled_agent", lambda name, slug, **kw: FakeAgent(slug, calls, selections))
+    monkeypatch.setattr(workflow, "checkpoints", CheckpointStore(TieredCache("test", directory=None)))
+    pipeline = workflow.create_singleton_pipeline()
+    monkeypatch.setattr(workflow, "get_singleton_pipeline", lambda: pipeline)
+    return pipeline, calls
+
+
+def test_stages_are_checkpointed_and_synthesized(pipeline, selections):
+    pipeline, calls = pipeline
+
+    response = pipeline.run("Ganga pollution", run_id="run-1", session_id="s-1")
+
+    assert calls[:2] == ["sentinel", "investigator"]
+    assert sorted(calls[2:4]) == ["bureaucrat", "engineer"]
+    assert calls[4] == "liaison"
+    assert isinstance(response.content, RemediationBlueprint)
+    context = workflow.checkpoints.load("run-1")
+    assert context.original_query == "Ganga pollution"
+    assert context.funding == selections["liaison"]
+
+
+def test_resume_only_reruns_later_stages(pipeline, selections):
+    pipeline, calls = pipeline
+    pipeline.run("Ganga pollution", run_id="run-1", session_id="s-1")
+    calls.clear()
+
+    response = workflow.resume("run-1", from_stage=5)
+
+    assert calls == ["liaison"]
+    assert isinstance(response.content, RemediationBlueprint)
+    assert response.content.problem == selections["sentinel"]
+
+
+def test_resume_requires_earlier_checkpoints(pipeline):
+    with pytest.raises(KeyError):
+        workflow.resume("unknown", from_stage=2)
+    with pytest.raises(ValueError):
+        workflow.resume("unknown", from_stage=9)
@@ -0,0 +1,40 @@
+import threading
+from types import SimpleNamespace
+
+import app.workflow as workflow
+from app.checkpoints import CheckpointStore
+from app.models import PipelineContext, RemediationBlueprint
+from app.utils.cache import TieredCache
+
+
+def test_department_and_solution_share_a_level():
+    levels = [[stage[2] for stage in level] for level in workflow.stage_levels()]
+
+    assert levels == [["sentinel"], ["investigator"], ["bureaucrat", "engineer"], ["liaison"]]
+
+
+def test_independent_stages_run_concurrently(monkeypatch, selections):
+    # Both parallel stages must be inside agent.run at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    inputs = {}
+
+    class Agent:
+        def __init__(self, slug):
+            self.slug = slug
+
+        def run(self, message, **kwargs):
+            inputs[self.slug] = message
+            if self.slug in ("bureaucrat", "engineer"):
+                barrier.wait()
+            return SimpleNamespace(content=selections[self.slug])
+
+    monkeypatch.setattr(workflow, "get_pooled_agent", lambda name, slug, **kw: Agent(slug))
+    monkeypatch.setattr(workflow, "checkpoints", CheckpointStore(TieredCache("test", directory=None)))
+
+    response = workflow.create_singleton_pipeline().run("Ganga pollution", session_id="s-1")
+
+    assert isinstance(response.content, RemediationBlueprint)
+    assert inputs["investigator"] == selections["sentinel"]
+    assert isinstance(inputs["engineer"], PipelineContext)
+    assert inputs["engineer"].cause == selections["investigator"]
+    assert inputs["liaison"] == selections["engineer"]
@@ -0,0 +1,125 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from agno.exceptions import ModelProviderError
+from agno.models.openai import OpenAIChat
+from openai import RateLimitError
+from openai.types.chat import ChatCompletionChunk
+
+import app.workflow as workflow
+from app.checkpoints import CheckpointStore
+from app.llm import create_model, listen_tokens, token_listener
+from app.models import RemediationBlueprint
+from app.streaming import ndjson_format, stream_pipeline
+from app.utils.cache import TieredCache
+
+
+class TokenAgent:
+    """Fake agent that 'generates' its selection's title token by token."""
+
+    def __init__(self, selection):
+        self.selection = selection
+        self.streamed = []
+
+    def run(self, message, **kwargs):
+        listener = token_listener()
+        self.streamed.append(listener is not None)
+        if listener:
+            for word in ("thinking", "about", "it"):
+                listener(word + " ")
+        return SimpleNamespace(content=self.selection)
+
+
+@pytest.fixture
+def pipeline(monkeypatch, selections):
+    agents = {slug: TokenAgent(selection) for slug, selection in selections.items()}
+    monkeypatch.setattr(workflow, "get_pooled_agent", lambda name, slug, **kw: agents[slug])
+    monkeypatch.setattr(workflow, "checkpoints", CheckpointStore(TieredCache("test", directory=None)))
+    pipeline = workflow.create_singleton_pipeline()
+    monkeypatch.setattr(workflow, "get_singleton_pipeline", lambda: pipeline)
+    pipeline.test_agents = agents
+    return pipeline
+
+
+def test_stream_emits_each_selection_then_the_blueprint(pipeline, selections):
+    events = list(stream_pipeline("Ganga pollution", run_id="run-s"))
+
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "run_started" and kinds[-1] == "run_completed"
+    completed = [event for event in events if event["event"] == "stage_completed"]
+    assert [event["field"] for event in completed][:2] == ["problem", "cause"]
+    assert completed[0]["selection"] == selections["sentinel"]
+    assert isinstance(events[-1]["result"], RemediationBlueprint)
+
+    # Tokens of a stage arrive between its start and its selection
+    problem = [event for event in events if event.get("field") == "problem"]
+    assert [event["event"] for event in problem] == ["stage_started", "token", "token", "token", "stage_completed"]
+    assert json.loads(ndjson_format(completed[0]))["selection"]["title"] == "Polluted Ganga"
+
+
+def test_stream_without_tokens_and_resume(pipeline):
+    list(stream_pipeline("Ganga pollution", run_id="run-r"))
+
+    events = list(stream_pipeline("", run_id="run-r", from_stage=5, tokens=False))
+
+    assert not any(event["event"] == "token" for event in events)
+    # Without a token consumer the model calls are not streamed at all
+    assert pipeline.test_agents["liaison"].streamed == [True, False]
+    replayed = {event["field"]: event["replayed"] for event in events if event["event"] == "stage_completed"}
+    assert replayed == {"problem": True, "cause": True, "department": True, "solution": True, "funding": False}
+
+
+def test_stream_reports_failures(pipeline):
+    events = list(stream_pipeline("", run_id="missing", from_stage=2))
+    assert events[-1]["event"] == "run_failed"
+
+
+def test_model_streams_to_listener_and_returns_full_response(monkeypatch):
+    def chunk(delta, finish=None, usage=None):
+        return ChatCompletionChunk.model_validate({
+            "id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish}],
+            "usage": usage,
+        })
+
+    chunks = [
+        chunk({"role": "assistant", "content": '{"title": '}),
+        chunk({"content": '"Ganga"}'}, finish="stop"),
+        chunk(None, usage={"prompt_tokens": 5, "completion_tokens": 4, "total_tokens": 9}),
+    ]
+    requests = []
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: requests.append(kwargs) or (chunk for chunk in chunks)
+    )))
+    client.with_options = lambda **options: requests.append(options) or client
+    monkeypatch.setattr(OpenAIChat, "get_client", lambda self: client)
+    model = create_model("test-model", cache=False)
+    assistant = SimpleNamespace(metrics=SimpleNamespace(start_timer=lambda: None, stop_timer=lambda: None))
+
+    deltas = []
+    with listen_tokens(deltas.append):
+        response = model.invoke([], assistant)
+
+    assert 0 < requests[0]["timeout"] <= 300
+    assert requests[1]["stream"] is True
+    assert deltas == ['{"title": ', '"Ganga"}']
+    assert response.content == '{"title": "Ganga"}'
+    assert response.response_usage.total_tokens == 9
+
+
+def test_streamed_errors_are_mapped_like_plain_calls(monkeypatch):
+    def rate_limited(**kwargs):
+        response = httpx.Response(429, json={"error": {"message": "slow down"}}, request=httpx.Request("POST", "http://test"))
+        raise RateLimitError("429", response=response, body=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=rate_limited)))
+    monkeypatch.setattr(OpenAIChat, "get_client", lambda self: client)
+    model = create_model("test-model", cache=False)
+    assistant = SimpleNamespace(metrics=SimpleNamespace(start_timer=lambda: None, stop_timer=lambda: None))
+
+    with listen_tokens(lambda delta: None), pytest.raises(ModelProviderError) as error:
+        model._request([], assistant)
+
+    assert (error.value.status_code, error.value.message) == (429, "slow down")
@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app.telemetry as telemetry
+import app.workflow as workflow
+from app.checkpoints import CheckpointStore
+from app.telemetry import record_llm_usage, span, telemetry_tool_hook, traced
+from app.utils.cache import TieredCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", True)
+    monkeypatch.setattr(telemetry, "metrics", telemetry.Metrics())
+
+
+@pytest.fixture
+def exported(monkeypatch, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(telemetry, "TELEMETRY_JSONL", str(path))
+    monkeypatch.setattr(telemetry, "_export_file", None)
+
+    def records():
+        telemetry._export_file.flush()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    return records
+
+
+def test_spans_nest_and_export_as_jsonl(exported):
+    with span("stage", "Sentinel", trace_id="run-1"):
+        with span("llm", "openai", stage="sentinel"):
+            record_llm_usage("openai", "sentinel", 120, 30)
+        telemetry_tool_hook("parallel_search", lambda **kw: "results", {"objective": "x"})
+
+    llm, tool, stage = exported()
+    assert [r["kind"] for r in (llm, tool, stage)] == ["llm", "tool", "stage"]
+    assert {llm["trace_id"], tool["trace_id"], stage["trace_id"]} == {"run-1"}
+    assert llm["parent_id"] == stage["span_id"] == tool["parent_id"]
+    assert stage["parent_id"] is None
+    assert llm["attributes"] == {"stage": "sentinel", "input_tokens": 120, "output_tokens": 30}
+
+
+def test_errors_are_recorded_and_reraised():
+    @traced("kb")
+    def persist():
+        raise ValueError("db down")
+
+    with pytest.raises(ValueError):
+        persist()
+
+    assert telemetry.telemetry_stats()["spans"]["kb/persist"]["errors"] == 1
+
+
+def test_stats_and_prometheus_output(monkeypatch):
+    monkeypatch.setenv("LLM_PRICE_OPENAI_FAST", "1,2")
+    for _ in range(3):
+        with span("stage", "Bureaucrat"):
+            pass
+    record_llm_usage("openai-fast", "bureaucrat", 1_000_000, 500_000)
+
+    stats = telemetry.telemetry_stats()
+    assert stats["spans"]["stage/Bureaucrat"]["count"] == 3
+    assert stats["spans"]["stage/Bureaucrat"]["p95"] <= 0.005
+    assert stats["llm_usage"]["openai-fast/bureaucrat"] == {"input_tokens": 1_000_000, "output_tokens": 500_000, "cost_usd": 2.0}
+
+    text = telemetry.prometheus_metrics()
+    assert 'civic_span_duration_seconds_bucket{kind="stage",name="Bureaucrat",le="+Inf"} 3' in text
+    assert 'civic_span_duration_seconds_count{kind="stage",name="Bureaucrat"} 3' in text
+    assert 'civic_spans_total{kind="stage",name="Bureaucrat",status="ok"} 3' in text
+    assert 'civic_llm_tokens_total{model="openai-fast",stage="bureaucrat",direction="output"} 500000' in text
+    assert 'civic_llm_cost_usd_total{model="openai-fast",stage="bureaucrat"} 2.000000' in text
+
+
+def test_disabled_telemetry_records_nothing(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", False)
+
+    with span("stage", "Sentinel") as opened:
+        opened.set(replayed=True)
+        record_llm_usage("openai", "sentinel", 1, 1)
+    assert traced("kb")(lambda: "ok")() == "ok"
+
+    assert telemetry.telemetry_stats()["spans"] == {}
+    assert telemetry.telemetry_stats()["llm_usage"] == {}
+
+
+def test_pipeline_records_a_span_per_stage(monkeypatch, selections):
+    monkeypatch.setattr(
+        workflow, "get_pooled_agent",
+        lambda name, slug, **kw: SimpleNamespace(run=lambda message, **kwargs: SimpleNamespace(content=selections[slug])),
+    )
+    monkeypatch.setattr(workflow, "checkpoints", CheckpointStore(TieredCache("test", directory=None)))
+
+    workflow.create_singleton_pipeline().run("Ganga pollution", user_id="u", session_id="s")
+
+    spans = telemetry.telemetry_stats()["spans"]
+    stages = {name.split("/", 1)[1] for name in spans if name.startswith("stage/")}
+    assert len(stages) == len(workflow.STAGES)
@@ -0,0 +1,187 @@
+import json
+import threading
+
+import pytest
+from agno.db.in_memory import InMemoryDb
+from agno.db.schemas import UserMemory
+from agno.db.sqlite import SqliteDb
+
+from app.batch import run_batch
+from app.knowledge.memory import CivicMemoryManager, apply_memory_retention, memory_owners, migrate_legacy_owners
+from app.tenancy import Scope, parse_scope, tenant_prefix
+
+OWNER = "acme:ganga:asha"
+
+
+def seed(db, count, owner=OWNER, start=1_000):
+    """`count` memories for `owner`, one second apart (m0 oldest)."""
+    for i in range(count):
+        db.upsert_user_memory(UserMemory(memory=f"m{i}", memory_id=f"{owner}-{i}", user_id=owner))
+    for row in db._memories:
+        if row["user_id"] == owner:
+            row["updated_at"] = start + int(row["memory"][1:])
+
+
+def stored(db, owner=OWNER):
+    return sorted(m.memory for m in db.get_user_memories(user_id=owner))
+
+
+def test_scope_owner_and_sessions():
+    scope = Scope("acme", "ganga", "asha")
+
+    assert scope.user_id == OWNER
+    assert scope.session_id("job-1") == "acme:ganga:job-1"
+    assert scope.session_id(scope.session_id("job-1")) == "acme:ganga:job-1"
+    assert scope.session_id().startswith("acme:ganga:")
+    assert Scope.from_user_id(OWNER) == scope
+    assert Scope.from_user_id("civic-system").user_id == "default:default:civic-system"
+    assert tenant_prefix("acme") == "acme:"
+    with pytest.raises(ValueError):
+        Scope("acme", "ganga:other", "asha")
+
+
+def test_cli_scope_options_leave_positional_arguments():
+    scope, rest = parse_scope(["Ganga pollution", "--tenant", "acme", "stream", "--user", "asha"])
+
+    assert rest == ["Ganga pollution", "stream"]
+    assert scope.user_id == "acme:default:asha"
+
+
+def test_memory_reads_are_capped_to_the_most_recent():
+    db = InMemoryDb()
+    seed(db, 30)
+    seed(db, 5, owner="other:ganga:asha")
+    manager = CivicMemoryManager(db=db)
+    manager.context_limit = 10
+
+    memories = manager.get_user_memories(OWNER)
+
+    assert [m.memory for m in memories] == [f"m{i}" for i in range(20, 30)]
+
+
+def test_retention_folds_the_oldest_into_a_summary():
+    db = InMemoryDb()
+    seed(db, 12)
+    folded = []
+
+    def summarize(memories):
+        folded.extend(m.memory for m in memories)
+        return UserMemory(memory="summary", memory_id="summary", user_id=OWNER)
+
+    counts = apply_memory_retention(db, OWNER, keep=5, max_memories=10, max_age_days=0, summarize=summarize)
+
+    assert counts == {"expired": 0, "summarized": 8, "written": 1}
+    assert folded == [f"m{i}" for i in range(8)]
+    assert stored(db) == ["m10", "m11", "m8", "m9", "summary"]
+
+
+def test_retention_expires_stale_memories_and_supports_dry_runs():
+    db = InMemoryDb()
+    seed(db, 4)
+    db.upsert_user_memory(UserMemory(memory="fresh", memory_id="fresh", user_id=OWNER))
+
+    assert apply_memory_retention(db, OWNER, max_age_days=30, dry_run=True)["expired"] == 4
+    assert len(stored(db)) == 5
+    apply_memory_retention(db, OWNER, max_age_days=30)
+    assert stored(db) == ["fresh"]
+
+
+def test_memory_updates_enforce_the_owner_cap(monkeypatch):
+    db = InMemoryDb()
+    seed(db, 6)
+    manager = CivicMemoryManager(db=db)
+    manager.context_limit, manager.max_memories = 3, 5
+    monkeypatch.setattr(manager, "create_or_update_memories", lambda **kwargs: "ok")
+    monkeypatch.setattr(manager, "summarize", lambda memories: UserMemory(memory="summary", user_id=OWNER))
+
+    manager.create_user_memories(message="I work on the Ganga", user_id=OWNER)
+
+    assert len(stored(db)) == 3
+    assert "summary" in stored(db)
+
+
+def test_owners_are_listed_by_tenant_prefix(tmp_path):
+    db = SqliteDb(db_file=str(tmp_path / "memories.db"), memory_table="civic_memories")
+    for owner in (OWNER, OWNER, "acme:yamuna:ravi", "acme_corp:x:y"):
+        db.upsert_user_memory(UserMemory(memory=owner, user_id=owner))
+
+    assert memory_owners(tenant_prefix("acme"), db=db) == {OWNER: 2, "acme:yamuna:ravi": 1}
+    assert memory_owners(tenant_prefix("acme", "ganga"), min_count=1, db=db) == {OWNER: 2}
+
+
+def test_batch_rows_inherit_the_default_scope(tmp_path):
+    source = tmp_path / "queries.jsonl"
+    source.write_text("\n".join(json.dumps(row) for row in [
+        {"id": "1", "query": "Ganga pollution"},
+        {"id": "2", "query": "Yamuna foam", "tenant": "other", "user_id": "ravi"},
+    ]))
+    seen = {}
+
+    def runner(row):
+        seen[row["id"]] = Scope(row["tenant"], row["project"], row["user_id"]).user_id
+        return {"id": row["id"], "query": row["query"], "status": "ok"}
+
+    run_batch(str(source), str(tmp_path / "out.jsonl"), runner=runner, scope=Scope("acme", "ganga", "asha"))
+
+    assert seen == {"1": OWNER, "2": "other:ganga:ravi"}
+
+
+def test_team_runs_share_one_team_and_pass_the_owner(monkeypatch):
+    import app.team.builder as builder
+    from app.main import run_team
+
+    built, runs = [], []
+
+    class FakeTeam:
+        def run(self, query, user_id, session_id):
+            runs.append(user_id)
+            return type("Response", (), {"content": query})()
+
+    monkeypatch.setattr(builder, "_team", None)
+    monkeypatch.setattr(builder, "create_civic_team", lambda: built.append(1) or FakeTeam())
+    for user in ("asha", "ravi", "meera"):
+        run_team("Ganga", user_id=Scope("acme", "ganga", user).user_id, team_mode="delegate")
+
+    assert len(built) == 1
+    assert runs == ["acme:ganga:asha", "acme:ganga:ravi", "acme:ganga:meera"]
+
+
+def test_one_owners_summary_does_not_hold_up_other_owners(monkeypatch):
+    db = InMemoryDb()
+    seed(db, 6)
+    seed(db, 6, owner="acme:ganga:ravi")
+    summarizing, release = threading.Event(), threading.Event()
+
+    def slow_summary(memories):
+        summarizing.set()
+        release.wait(5)
+        return UserMemory(memory="summary", user_id=memories[0].user_id)
+
+    managers = []
+    for summarize in (slow_summary, lambda memories: UserMemory(memory="summary", user_id=memories[0].user_id)):
+        manager = CivicMemoryManager(db=db)
+        manager.context_limit, manager.max_memories = 3, 5
+        monkeypatch.setattr(manager, "create_or_update_memories", lambda **kwargs: "ok")
+        monkeypatch.setattr(manager, "summarize", summarize)
+        managers.append(manager)
+    slow = threading.Thread(target=managers[0].create_user_memories, kwargs={"message": "m", "user_id": OWNER})
+    slow.start()
+    summarizing.wait(5)
+
+    managers[1].create_user_memories(message="m", user_id="acme:ganga:ravi")
+
+    assert len(stored(db, "acme:ganga:ravi")) == 3
+    release.set()
+    slow.join(5)
+    assert len(stored(db)) == 3
+
+
+def test_unscoped_owners_move_to_the_default_scope(tmp_path):
+    db = SqliteDb(db_file=str(tmp_path / "memories.db"), memory_table="civic_memories")
+    for owner in ("civic-system", "civic-system", OWNER):
+        db.upsert_user_memory(UserMemory(memory=owner, user_id=owner))
+
+    assert migrate_legacy_owners(dry_run=True, db=db)["memories"] == 2
+    assert migrate_legacy_owners(db=db)["memories"] == 2
+    assert memory_owners(db=db) == {OWNER: 1, "default:default:civic-system": 2}
+    assert migrate_legacy_owners(db=db)["memories"] == 0
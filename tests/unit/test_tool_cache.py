@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+
+import pytest
+
+import app.utils.tool_cache as tool_cache
+from app.llm import no_response_cache
+from app.utils.cache import TieredCache
+from app.utils.tool_cache import tool_cache_hook, tool_cache_key, tool_cache_ttl
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(tool_cache, "tool_cache", TieredCache("test-tools", directory=None))
+    monkeypatch.setattr(tool_cache, "_counts", {})
+
+
+class FakeSearch:
+    """Stands in for ParallelTools.parallel_search, counting real calls."""
+
+    def __init__(self, result='{"results": []}', delay=0.0):
+        self.calls = 0
+        self.result = result
+        self.delay = delay
+
+    def __call__(self, **arguments):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.result
+
+
+def test_repeated_calls_are_served_from_cache():
+    search = FakeSearch()
+    arguments = {"objective": "Ganga pollution Kanpur", "search_queries": ["tanneries", "STP"]}
+
+    first = tool_cache_hook("parallel_search", search, arguments)
+    # Same call modulo whitespace, case and query order
+    second = tool_cache_hook(
+        "parallel_search", search,
+        {"objective": "  ganga  pollution kanpur", "search_queries": ["STP", "tanneries"], "max_results": None},
+    )
+
+    assert first == second
+    assert search.calls == 1
+    assert tool_cache.tool_cache_stats()["tools"]["parallel_search"] == {"hits": 1, "shared": 0, "misses": 1}
+
+
+def test_key_keeps_meaningful_differences():
+    base = tool_cache_key("parallel_search", {"objective": "x", "max_results": 5})
+    assert base != tool_cache_key("parallel_search", {"objective": "x", "max_results": 10})
+    assert base != tool_cache_key("parallel_extract", {"objective": "x", "max_results": 5})
+    # URLs are case-sensitive
+    assert tool_cache_key("parallel_extract", {"urls": ["https://a.in/Doc"]}) != tool_cache_key(
+        "parallel_extract", {"urls": ["https://a.in/doc"]}
+    )
+
+
+def test_errors_and_uncached_tools_are_not_stored():
+    failing = FakeSearch(json.dumps({"error": "Search failed: 429"}))
+    tool_cache_hook("parallel_search", failing, {"objective": "x"})
+    tool_cache_hook("parallel_search", failing, {"objective": "x"})
+    assert failing.calls == 2
+
+    think = FakeSearch("thought")
+    tool_cache_hook("think", think, {"thought": "x"})
+    tool_cache_hook("think", think, {"thought": "x"})
+    assert think.calls == 2
+
+
+def test_ttl_per_tool(monkeypatch):
+    assert tool_cache_ttl("parallel_search") < tool_cache_ttl("parallel_extract")
+    monkeypatch.setenv("TOOL_CACHE_TTL_PARALLEL_SEARCH", "0")
+    assert tool_cache_ttl("parallel_search") is None
+    assert tool_cache_ttl("think") is None
+
+
+def test_bypass_refreshes_the_entry():
+    search = FakeSearch("old")
+    tool_cache_hook("parallel_search", search, {"objective": "x"})
+
+    search.result = "new"
+    with no_response_cache():
+        assert tool_cache_hook("parallel_search", search, {"objective": "x"}) == "new"
+    assert tool_cache_hook("parallel_search", search, {"objective": "x"}) == "new"
+    assert search.calls == 2
+
+
+def test_concurrent_identical_calls_share_one_request():
+    search = FakeSearch(delay=0.1)
+    results = []
+
+    def call():
+        results.append(tool_cache_hook("parallel_search", search, {"objective": "x"}))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert search.calls == 1
+    assert len(results) == 4 and len(set(results)) == 1
@@ -0,0 +1,71 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from agno.knowledge.document import Document
+
+from app.knowledge.writer import WriteBehindQueue, embed_documents
+
+
+def test_batches_by_size_then_by_delay():
+    batches = []
+    writer = WriteBehindQueue(batches.append, batch_size=3, max_delay=0.2)
+
+    for i in range(4):
+        writer.submit(i)
+    time.sleep(0.5)
+
+    assert batches == [[0, 1, 2], [3]]
+    assert writer.stats()["pending"] == 0
+    writer.close()
+
+
+def test_flush_and_close_write_pending_items():
+    batches = []
+    writer = WriteBehindQueue(batches.append, batch_size=100, max_delay=60)
+
+    writer.submit("a")
+    writer.submit("b")
+    assert writer.flush(timeout=5)
+    writer.submit("c")
+    writer.close(timeout=5)
+
+    assert [item for batch in batches for item in batch] == ["a", "b", "c"]
+
+
+def test_failed_batch_is_dropped_not_retried_forever():
+    calls = []
+
+    def sink(batch):
+        calls.append(batch)
+        raise RuntimeError("db down")
+
+    writer = WriteBehindQueue(sink, batch_size=2, max_delay=0.05)
+    writer.submit(1)
+    assert writer.flush(timeout=5)
+
+    assert calls == [[1]]
+    assert writer.stats()["items_failed"] == 1
+    writer.close()
+
+
+@dataclass
+class CountingEmbedder:
+    batch_calls: int = 0
+
+    async def async_get_embeddings_batch_and_usage(self, texts):
+        self.batch_calls += 1
+        return [[float(len(t))] for t in texts], [None for _ in texts]
+
+
+def test_documents_are_embedded_with_one_batch_call():
+    embedder = CountingEmbedder()
+    docs = [Document(content="one"), Document(content="three")]
+
+    # Runs on a plain thread, like the writer
+    thread = threading.Thread(target=embed_documents, args=(embedder, docs))
+    thread.start()
+    thread.join()
+
+    assert embedder.batch_calls == 1
+    assert [doc.embedding for doc in docs] == [[3.0], [5.0]]